@@ -4,33 +4,102 @@ from contextlib import contextmanager
 from typing import Any
 from urllib.request import Request
 
-from django.core.files.base import ContentFile
+from django.conf import settings
 from django.core.files.storage import default_storage
+from django.db.models import QuerySet
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from rest_framework import views, status
 from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework import generics
 from rest_framework.views import APIView
 
-from movies.models import Movie, Book
+from movies.models import Movie, Book, IngestionJob
+from movies.pagination import MovieKeysetPagination
 from movies.serializers import (
     MovieSerializer,
+    MovieFilterSerializer,
+    MovieSearchSerializer,
+    MovieAutocompleteSerializer,
     BookSerializer,
     AddPreferenceSerializer,
     AddToWatchHistorySerializer,
-    GeneralFileUploadSerializer
+    WatchHistoryRangeSerializer,
+    GeneralFileUploadSerializer,
+    UploadSessionSerializer
 )
-from movies.services import add_preference, user_preferences, user_watch_history, add_watch_history, FileProcessor
-from movies.tasks import process_file
+from movies.services import (
+    add_preference,
+    user_preferences,
+    user_watch_history,
+    add_watch_history,
+    admit_ingestion,
+    autocomplete_titles,
+    create_ingestion_job,
+    export_movies_ndjson,
+    fail_ingestion_job,
+    fail_upload_session,
+    filter_movies,
+    ingestion_job_status,
+    link_movie_catalog,
+    search_movies,
+    create_upload_session,
+    save_upload_part,
+    upload_session_status,
+    complete_upload_session,
+    abort_upload_session,
+    FileProcessor
+)
+from movies.tasks import process_file, assemble_upload_task
 
 class MovieListCreateAPIView(generics.ListCreateAPIView):
     queryset = Movie.objects.all().order_by("id")
     serializer_class = MovieSerializer
+    pagination_class = MovieKeysetPagination
+
+    def get_queryset(self) -> QuerySet:
+        filters = MovieFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        return filter_movies(super().get_queryset(), filters.validated_data)
+
+    def perform_create(self, serializer: MovieSerializer) -> None:
+        movie = serializer.save()
+        link_movie_catalog([(movie.id, movie.__dict__)], created=True)
+
+class MovieExportView(APIView):
+    """Stream the whole catalog as JSON Lines, the format recommended for
+    large imports, so an export can be uploaded again as is."""
+    def get(self, request: Request) -> StreamingHttpResponse:
+        response = StreamingHttpResponse(export_movies_ndjson(),
+                                         content_type="application/x-ndjson")
+        response["Content-Disposition"] = 'attachment; filename="movies.ndjson"'
+        return response
+
+class MovieSearchView(APIView):
+    """Full-text search over titles and directors, best matches first."""
+    def get(self, request: Request) -> Response:
+        params = MovieSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        movies = search_movies(params.validated_data["q"], params.validated_data["limit"])
+        return Response({"results": MovieSerializer(movies, many=True).data})
+
+class MovieAutocompleteView(APIView):
+    """Titles completing a prefix, for search-as-you-type."""
+    def get(self, request: Request) -> Response:
+        params = MovieAutocompleteSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response({
+            "results": autocomplete_titles(params.validated_data["prefix"], params.validated_data["limit"])
+        })
 
 class MovieDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Movie.objects.all()
     serializer_class = MovieSerializer
 
+    def perform_update(self, serializer: MovieSerializer) -> None:
+        movie = serializer.save()
+        link_movie_catalog([(movie.id, movie.__dict__)])
+
 class UserPreferencesView(APIView):
     def post(self, request: Request, user_id: int) -> Response | None:
         serializer = AddPreferenceSerializer(data=request.data)
@@ -46,7 +115,9 @@ class UserPreferencesView(APIView):
 
 class WatchHistoryView(APIView):
     def get(self, request: Request, user_id: int) -> Response:
-        data = user_watch_history(user_id)
+        period = WatchHistoryRangeSerializer(data=request.query_params)
+        period.is_valid(raise_exception=True)
+        data = user_watch_history(user_id, **period.validated_data)
         return Response(data)
 
     def post(self, request: Request, user_id: int) -> Response:
@@ -76,24 +147,104 @@ class GeneralUploadView(APIView):
         serializer = GeneralFileUploadSerializer(data=request.data)
         if serializer.is_valid():
             uploaded_file = serializer.validated_data["file"]
-            file_type = uploaded_file.content_type
+            file_type = serializer.validated_data["file_type"]
+            admit_ingestion(uploaded_file.size)
 
-            # Extract the file extension
-            file_extension = os.path.splitext(uploaded_file.name)[1]
+            # Extract the file extension, both of them for a compressed file
+            name, file_extension = os.path.splitext(uploaded_file.name)
+            if uploaded_file.content_type != file_type:
+                file_extension = os.path.splitext(name)[1] + file_extension
             # Generate a unique file name using UUID
             unique_file_name = f"{uuid.uuid4()}{file_extension}"
-            # Save the file directly to the default storage
-            file_name = default_storage.save(unique_file_name,
-                                             ContentFile(uploaded_file.read()))
-            process_file.delay(file_name, file_type)
+            # Hand the upload itself to the storage, which copies it in
+            # blocks (a move for uploads Django spooled to disk, a multipart
+            # upload on S3) instead of holding the whole file in memory
+            file_name = default_storage.save(unique_file_name, uploaded_file)
+            job = create_ingestion_job(file_name, file_type,
+                                       serializer.validated_data["mode"], uploaded_file.size)
+            try:
+                process_file.delay(file_name, file_type, job.id,
+                                   serializer.validated_data.get("rows_per_chunk"))
+            except Exception as e:
+                # Otherwise the job would hold an admission slot while never running
+                fail_ingestion_job(job.id, f"Could not be queued: {e}")
+                raise
             return Response(
-                {"message": "Job enqueued for processing."},
+                {"message": "Job enqueued for processing.", "job_id": job.id},
                 status=status.HTTP_202_ACCEPTED,
             )
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class IngestionJobStatusView(APIView):
+    def get(self, request: Request, job_id: int) -> Response:
+        data = ingestion_job_status(job_id)
+        return Response(data)
+
+
+class IngestionJobRejectsView(APIView):
+    """Download the JSON Lines report of the rows a job rejected."""
+    def get(self, request: Request, job_id: int) -> FileResponse:
+        job = get_object_or_404(IngestionJob, id=job_id)
+        if not job.rejects_file:
+            raise Http404("The job rejected no rows.")
+        return FileResponse(default_storage.open(job.rejects_file, "rb"),
+                            content_type="application/x-ndjson",
+                            as_attachment=True,
+                            filename=f"job-{job.id}-rejects.ndjson")
+
+
+class UploadSessionCreateView(APIView):
+    """Start a resumable upload, for files too large for a single POST."""
+    def post(self, request: Request) -> Response:
+        serializer = UploadSessionSerializer(data=request.data)
+        if serializer.is_valid():
+            session = create_upload_session(serializer.validated_data)
+            return Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class UploadSessionView(APIView):
+    def get(self, request: Request, upload_id: int) -> Response:
+        data = upload_session_status(upload_id)
+        return Response(data)
+
+    def delete(self, request: Request, upload_id: int) -> Response:
+        abort_upload_session(upload_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadPartView(APIView):
+    def put(self, request: Request, upload_id: int, number: int) -> Response:
+        # The raw body is the part; it is streamed from the request to the
+        # storage, never parsed into request.data
+        content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+        if not content_length:
+            return Response({"detail": "The part is empty."}, status=status.HTTP_400_BAD_REQUEST)
+        if content_length > settings.MOVIE_UPLOAD_PART_MAX_SIZE:
+            return Response(
+                {"detail": f"Parts are limited to {settings.MOVIE_UPLOAD_PART_MAX_SIZE} bytes."},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        part = save_upload_part(upload_id, number, request.stream, content_length)
+        return Response({"number": part.number, "size": part.size})
+
+
+class UploadSessionCompleteView(APIView):
+    def post(self, request: Request, upload_id: int) -> Response:
+        session = complete_upload_session(upload_id)
+        try:
+            assemble_upload_task.delay(session.id)
+        except Exception as e:
+            fail_upload_session(session, f"Could not be queued: {e}")
+            raise
+        return Response(
+            {"message": "Job enqueued for processing.", "job_id": session.job_id},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
 class BookListCreateAPIView(generics.ListCreateAPIView):
     queryset = Book.objects.all().order_by("id")
     serializer_class = BookSerializer
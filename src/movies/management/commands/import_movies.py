@@ -0,0 +1,115 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+
+from movies.services import ChunkRejects, ImportStats, post_process_ingestion, resolve_reject_lines
+from movies.tasks import FileChunk, delete_chunk_files, import_chunk, lookup_cache, split_file
+
+FILE_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "jsonl": "application/x-ndjson",
+    "ndjson": "application/x-ndjson",
+    "xml": "application/xml",
+}
+# Compressed files are recognised by their contents; these extensions are
+# only skipped when guessing the format from the file name
+COMPRESSED_EXTENSIONS = (".gz", ".zst")
+
+
+def _init_worker() -> None:
+    # Forked workers must not share the parent's database connection;
+    # spawned ones have to set Django up first.
+    django.setup()
+    connections.close_all()
+
+
+def _import_chunk(directory: str, chunk: FileChunk, file_type: str) -> tuple[dict[str, int], ChunkRejects]:
+    # Retried whole on locking errors with backoff, like process_chunk
+    for retries in range(settings.MOVIE_CHUNK_MAX_RETRIES + 1):
+        rejects = ChunkRejects()
+        try:
+            stats = import_chunk(chunk, file_type, lookup_cache(), FileSystemStorage(location=directory),
+                                 rejects=rejects)
+        except OperationalError:
+            if retries == settings.MOVIE_CHUNK_MAX_RETRIES:
+                raise
+            time.sleep(2 ** retries)
+        else:
+            return stats.as_dict(), rejects
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a movie catalog from a local file without Celery. The file is "
+        "split like an upload and its chunks are processed by a pool of "
+        "worker processes, each with its own database connection."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path of the CSV, JSON, JSON Lines or XML file to import, "
+                                         "optionally gzip or zstd compressed.")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Number of worker processes (default: CPU count).")
+        parser.add_argument("--format", choices=sorted(FILE_TYPES),
+                            help="File format; guessed from the extension when omitted.")
+        parser.add_argument("--rows-per-chunk", type=int,
+                            help="Records per chunk; planned from the file and worker count when omitted.")
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options["path"])
+        if not os.path.isfile(path):
+            raise CommandError(f"File not found: {path}")
+        name, extension = os.path.splitext(path)
+        if extension.lower() in COMPRESSED_EXTENSIONS:
+            extension = os.path.splitext(name)[1]
+        file_format = options["format"] or extension.lstrip(".").lower()
+        if file_format not in FILE_TYPES:
+            raise CommandError(f"Cannot tell the file format, pass --format {'|'.join(sorted(FILE_TYPES))}.")
+        if options["workers"] < 1:
+            raise CommandError("--workers must be at least 1.")
+        file_type = FILE_TYPES[file_format]
+        directory, file_name = os.path.split(path)
+
+        started = time.monotonic()
+        chunks = split_file(file_name, file_type, FileSystemStorage(location=directory),
+                            options["rows_per_chunk"], options["workers"])
+        if options["workers"] == 1:
+            results = [_import_chunk(directory, chunk, file_type) for chunk in chunks]
+        else:
+            # The parent's connection would be inherited by forked workers
+            connections.close_all()
+            with ProcessPoolExecutor(options["workers"], initializer=_init_worker) as executor:
+                results = list(executor.map(
+                    _import_chunk,
+                    [directory] * len(chunks),
+                    chunks,
+                    [file_type] * len(chunks),
+                ))
+        stats = sum((ImportStats(**result) for result, _ in results), ImportStats())
+        delete_chunk_files([chunk.file_name for chunk in chunks if chunk.is_chunk_file],
+                           FileSystemStorage(location=directory))
+        post_process_ingestion(stats)
+        elapsed = time.monotonic() - started
+
+        rate = stats.processed / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats.processed} rows from {len(chunks)} chunks in {elapsed:.1f}s "
+            f"({rate:.0f} rows/s): {stats.created} created, {stats.updated} updated, "
+            f"{stats.unchanged} unchanged."
+        ))
+        if stats.rejected:
+            rejects_path = f"{path}.rejects.ndjson"
+            with open(rejects_path, "w", encoding="utf-8") as file:
+                for row in resolve_reject_lines(rejects for _, rejects in results):
+                    file.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+            self.stdout.write(self.style.WARNING(
+                f"{stats.rejected} rows failed validation, see {rejects_path}."
+            ))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-16 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0008_ingestionjob_ingestionchunk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestionchunk',
+            name='rows_unchanged',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Fingerprint of the ingested fields, see movie_fingerprint.', max_length=32),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-16 23:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0009_movie_content_hash_ingestionchunk_rows_unchanged'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieStaging',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.BigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('genres', models.JSONField(default=list)),
+                ('country', models.CharField(max_length=100, null=True)),
+                ('extra_data', models.JSONField(default=dict)),
+                ('release_year', models.IntegerField(null=True)),
+                ('content_hash', models.CharField(max_length=32)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ingestionchunk',
+            name='rows_staged',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='mode',
+            field=models.CharField(choices=[('direct', 'Chunks upsert into Movie'), ('staged', 'Chunks load MovieStaging, merged into Movie at the end')], default='direct', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='rows_created',
+            field=models.PositiveIntegerField(default=0, help_text='Set by the merge of a staged job.'),
+        ),
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='rows_unchanged',
+            field=models.PositiveIntegerField(default=0, help_text='Set by the merge of a staged job.'),
+        ),
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='rows_updated',
+            field=models.PositiveIntegerField(default=0, help_text='Set by the merge of a staged job.'),
+        ),
+        migrations.AlterField(
+            model_name='ingestionjob',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('splitting', 'Splitting'), ('processing', 'Processing'), ('merging', 'Merging'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+    ]
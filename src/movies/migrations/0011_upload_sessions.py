@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-16 23:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0010_staged_ingestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(help_text='Name of the file on the client.', max_length=255)),
+                ('file_type', models.CharField(max_length=100)),
+                ('size', models.BigIntegerField(help_text='Total size announced by the client, checked on completion.', null=True)),
+                ('mode', models.CharField(choices=[('direct', 'Chunks upsert into Movie'), ('staged', 'Chunks load MovieStaging, merged into Movie at the end')], default='direct', max_length=20)),
+                ('rows_per_chunk', models.PositiveIntegerField(null=True)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('assembling', 'Assembling'), ('completed', 'Completed'), ('failed', 'Failed')], default='open', max_length=20)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(null=True)),
+                ('job', models.OneToOneField(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload', to='movies.ingestionjob')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UploadPart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('file_name', models.CharField(help_text='Name of the part in storage.', max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('received_at', models.DateTimeField(auto_now=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parts', to='movies.uploadsession')),
+            ],
+            options={
+                'ordering': ['number'],
+                'unique_together': {('session', 'number')},
+            },
+        ),
+    ]
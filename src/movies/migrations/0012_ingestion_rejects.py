@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-16 23:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0011_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestionchunk',
+            name='line',
+            field=models.PositiveIntegerField(help_text="Line of the chunk's first byte, when the splitter counted lines.", null=True),
+        ),
+        migrations.AddField(
+            model_name='ingestionchunk',
+            name='lines',
+            field=models.PositiveIntegerField(default=0, help_text='Number of newlines in the chunk.'),
+        ),
+        migrations.AddField(
+            model_name='ingestionchunk',
+            name='rows_rejected',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='rejects_file',
+            field=models.CharField(blank=True, help_text='JSON Lines report of the rows that failed validation, in storage.', max_length=255),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-16 23:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0012_ingestion_rejects'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='rows_rejected',
+            field=models.PositiveIntegerField(default=0, help_text='Totals, set when the job completes.'),
+        ),
+        migrations.AlterField(
+            model_name='ingestionjob',
+            name='rows_created',
+            field=models.PositiveIntegerField(default=0, help_text='Totals, set when the job completes.'),
+        ),
+        migrations.AlterField(
+            model_name='ingestionjob',
+            name='rows_unchanged',
+            field=models.PositiveIntegerField(default=0, help_text='Totals, set when the job completes.'),
+        ),
+        migrations.AlterField(
+            model_name='ingestionjob',
+            name='rows_updated',
+            field=models.PositiveIntegerField(default=0, help_text='Totals, set when the job completes.'),
+        ),
+        migrations.AlterField(
+            model_name='ingestionjob',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('splitting', 'Splitting'), ('processing', 'Processing'), ('merging', 'Merging'), ('finalising', 'Finalising'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-16 23:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0013_ingestion_job_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='size',
+            field=models.BigIntegerField(help_text='Size of the uploaded file in bytes, as stored.', null=True),
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 5.2.4 on 2026-10-16 23:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0014_ingestion_job_size'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Country',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'countries',
+            },
+        ),
+        migrations.CreateModel(
+            name='Genre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Person',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MovieCountry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movie_links', to='movies.country')),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='country_links', to='movies.movie')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='countries',
+            field=models.ManyToManyField(related_name='movies', through='movies.MovieCountry', to='movies.country'),
+        ),
+        migrations.CreateModel(
+            name='MovieGenre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('genre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movie_links', to='movies.genre')),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='genre_links', to='movies.movie')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='tagged_genres',
+            field=models.ManyToManyField(related_name='movies', through='movies.MovieGenre', to='movies.genre'),
+        ),
+        migrations.CreateModel(
+            name='MovieCredit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('director', 'Director')], default='director', max_length=20)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credits', to='movies.movie')),
+                ('person', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credits', to='movies.person')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='people',
+            field=models.ManyToManyField(related_name='movies', through='movies.MovieCredit', to='movies.person'),
+        ),
+        migrations.AddIndex(
+            model_name='moviecountry',
+            index=models.Index(fields=['country', 'movie'], name='movies_movi_country_e93ac9_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='moviecountry',
+            unique_together={('movie', 'country')},
+        ),
+        migrations.AddIndex(
+            model_name='moviegenre',
+            index=models.Index(fields=['genre', 'movie'], name='movies_movi_genre_i_decaf6_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='moviegenre',
+            unique_together={('movie', 'genre')},
+        ),
+        migrations.AddIndex(
+            model_name='moviecredit',
+            index=models.Index(fields=['person', 'role', 'movie'], name='movies_movi_person__b65c21_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='moviecredit',
+            unique_together={('movie', 'person', 'role')},
+        ),
+    ]
@@ -0,0 +1,71 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def _names(value, max_length=255):
+    # As movies.services.catalog_names: strings are comma-separated names
+    if isinstance(value, str):
+        value = value.split(",")
+    names = []
+    for item in value if isinstance(value, list) else [value]:
+        if item is None or isinstance(item, (list, dict)):
+            continue
+        name = str(item).strip()
+        if name and len(name) <= max_length and name not in names:
+            names.append(name)
+    return names
+
+
+def _directors(extra_data):
+    if not isinstance(extra_data, dict):
+        return []
+    names = _names(extra_data.get("director"))
+    return names + [name for name in _names(extra_data.get("directors")) if name not in names]
+
+
+def _intern(model, names, cache):
+    missing = [name for name in set(names) if name not in cache]
+    if missing:
+        model.objects.bulk_create([model(name=name) for name in missing], ignore_conflicts=True)
+        cache.update(model.objects.filter(name__in=missing).values_list("name", "id"))
+
+
+def backfill_catalog(apps, schema_editor):
+    """Intern the genres, directors and countries of every existing movie
+    and link them, a batch of movies at a time."""
+    Movie = apps.get_model("movies", "Movie")
+    tables = [
+        (apps.get_model("movies", "MovieGenre"), apps.get_model("movies", "Genre"), "genre_id",
+         lambda movie: _names(movie["genres"])),
+        (apps.get_model("movies", "MovieCredit"), apps.get_model("movies", "Person"), "person_id",
+         lambda movie: _directors(movie["extra_data"])),
+        (apps.get_model("movies", "MovieCountry"), apps.get_model("movies", "Country"), "country_id",
+         lambda movie: _names(movie["country"], max_length=100)),
+    ]
+    ids = {model: {} for _, model, _, _ in tables}
+    movies = Movie.objects.order_by("id").values("id", "genres", "country", "extra_data")
+    last_id = 0
+    while batch := list(movies.filter(id__gt=last_id)[:BATCH_SIZE]):
+        last_id = batch[-1]["id"]
+        for link_model, model, column, names_of in tables:
+            names = {movie["id"]: names_of(movie) for movie in batch}
+            _intern(model, (name for movie_names in names.values() for name in movie_names), ids[model])
+            link_model.objects.bulk_create(
+                [link_model(movie_id=movie_id, **{column: ids[model][name]})
+                 for movie_id, movie_names in names.items()
+                 for name in movie_names
+                 if name in ids[model]],
+                ignore_conflicts=True,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0015_catalog_tables'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_catalog, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-16 23:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0016_backfill_catalog_tables'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['release_year', 'id'], name='movies_movi_release_fc5620_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations
+
+# An FTS5 index of titles and directors, kept in step with movies_movie by
+# triggers so that every write path (bulk inserts, the staged merge's SQL)
+# maintains it. Titles are weighted over directors when ranking; prefixes of
+# two and three characters are indexed for autocompletion.
+DIRECTORS = "coalesce(json_extract({row}.extra_data, '$.director'), '')"
+CREATE_SEARCH_INDEX = [
+    "CREATE VIRTUAL TABLE movies_movie_search USING fts5("
+    "title, directors, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    "CREATE TRIGGER movies_movie_search_insert AFTER INSERT ON movies_movie BEGIN"
+    " INSERT INTO movies_movie_search (rowid, title, directors)"
+    f" VALUES (new.id, new.title, {DIRECTORS.format(row='new')}); END",
+    "CREATE TRIGGER movies_movie_search_update AFTER UPDATE OF title, extra_data ON movies_movie BEGIN"
+    f" UPDATE movies_movie_search SET title = new.title, directors = {DIRECTORS.format(row='new')}"
+    " WHERE rowid = new.id; END",
+    "CREATE TRIGGER movies_movie_search_delete AFTER DELETE ON movies_movie BEGIN"
+    " DELETE FROM movies_movie_search WHERE rowid = old.id; END",
+    "INSERT INTO movies_movie_search (rowid, title, directors)"
+    f" SELECT id, title, {DIRECTORS.format(row='movies_movie')} FROM movies_movie",
+]
+DROP_SEARCH_INDEX = [
+    "DROP TRIGGER movies_movie_search_insert",
+    "DROP TRIGGER movies_movie_search_update",
+    "DROP TRIGGER movies_movie_search_delete",
+    "DROP TABLE movies_movie_search",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # Other backends search with plain queries, see search_movies
+        if schema_editor.connection.vendor == "sqlite":
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0017_movie_year_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(CREATE_SEARCH_INDEX), _run(DROP_SEARCH_INDEX)),
+    ]
@@ -0,0 +1,78 @@
+from django.db import migrations
+from django.utils import timezone
+
+BATCH_SIZE = 500
+
+
+def _is_entry(entry):
+    return isinstance(entry, dict) and isinstance(entry.get("title"), str)
+
+
+def _movie_ids(Movie, entries):
+    """Movies by (title, release_year). The history never recorded a movie's
+    id, nor its country, so among namesakes of a year the first one wins."""
+    titles = sorted({entry["title"] for entry in entries})
+    ids = {}
+    for start in range(0, len(titles), BATCH_SIZE):
+        movies = Movie.objects.filter(title__in=titles[start:start + BATCH_SIZE]).order_by("-id")
+        for movie_id, title, year in movies.values_list("id", "title", "release_year"):
+            ids[title, year] = movie_id
+    return ids
+
+
+def move_watch_history(apps, schema_editor):
+    """Turn every JSON watch history into WatchEvent rows, in their order.
+    Entries naming a movie that is not in the catalog stay in the JSON."""
+    Movie = apps.get_model("movies", "Movie")
+    WatchEvent = apps.get_model("movies", "WatchEvent")
+    UserMoviePreferences = apps.get_model("movies", "UserMoviePreferences")
+    # The history kept no times; ids keep the order of views moved at once
+    watched_at = timezone.now()
+    preferences = UserMoviePreferences.objects.order_by("id")
+    last_id = 0
+    while batch := list(preferences.filter(id__gt=last_id)[:BATCH_SIZE]):
+        last_id = batch[-1].id
+        batch = [row for row in batch if isinstance(row.watch_history, list) and row.watch_history]
+        ids = _movie_ids(Movie, [entry for row in batch for entry in row.watch_history if _is_entry(entry)])
+        events = []
+        for row in batch:
+            unmatched = []
+            for entry in row.watch_history:
+                movie_id = ids.get((entry["title"], entry.get("year"))) if _is_entry(entry) else None
+                if movie_id is None:
+                    unmatched.append(entry)
+                else:
+                    events.append(WatchEvent(user_id=row.user_id, movie_id=movie_id, watched_at=watched_at))
+            row.watch_history = unmatched
+        WatchEvent.objects.bulk_create(events, batch_size=BATCH_SIZE)
+        UserMoviePreferences.objects.bulk_update(batch, ["watch_history"])
+
+
+def restore_watch_history(apps, schema_editor):
+    """Append the WatchEvent rows of each user back to their JSON history."""
+    WatchEvent = apps.get_model("movies", "WatchEvent")
+    UserMoviePreferences = apps.get_model("movies", "UserMoviePreferences")
+    histories = {}
+    for event in WatchEvent.objects.select_related("movie").order_by("user_id", "watched_at", "id").iterator():
+        histories.setdefault(event.user_id, []).append({
+            "title": event.movie.title,
+            "year": event.movie.release_year,
+            "director": event.movie.extra_data.get("director", []),
+            "genres": event.movie.genres,
+        })
+    for row in UserMoviePreferences.objects.filter(user_id__in=histories):
+        legacy = row.watch_history if isinstance(row.watch_history, list) else []
+        row.watch_history = legacy + histories[row.user_id]
+        row.save(update_fields=["watch_history"])
+    WatchEvent.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0019_watch_event'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_watch_history, restore_watch_history),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+# Indexes the directors of extra_data["directors"] too, where the exports of
+# data/download_movies.py keep them, next to extra_data["director"] (see
+# director_names). Lists are indexed as their JSON text, whose quotes and
+# commas the tokenizer skips. The table is made anew rather than emptied:
+# FTS5 keeps the entries of deleted rows until its segments are merged,
+# which would leave every query reading the index twice over.
+DIRECTOR = "coalesce(json_extract({row}.extra_data, '$.director'), '')"
+DIRECTORS = f"{DIRECTOR} || ' ' || coalesce(json_extract({{row}}.extra_data, '$.directors'), '')"
+
+
+def _search_index(directors):
+    return [
+        "DROP TRIGGER movies_movie_search_insert",
+        "DROP TRIGGER movies_movie_search_update",
+        "CREATE TRIGGER movies_movie_search_insert AFTER INSERT ON movies_movie BEGIN"
+        " INSERT INTO movies_movie_search (rowid, title, directors)"
+        f" VALUES (new.id, new.title, {directors.format(row='new')}); END",
+        "CREATE TRIGGER movies_movie_search_update AFTER UPDATE OF title, extra_data ON movies_movie BEGIN"
+        f" UPDATE movies_movie_search SET title = new.title, directors = {directors.format(row='new')}"
+        " WHERE rowid = new.id; END",
+        "DROP TABLE movies_movie_search",
+        "CREATE VIRTUAL TABLE movies_movie_search USING fts5("
+        "title, directors, tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3 4')",
+        "INSERT INTO movies_movie_search (rowid, title, directors)"
+        f" SELECT id, title, {directors.format(row='movies_movie')} FROM movies_movie",
+    ]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # Other backends search with plain queries, see search_movies
+        if schema_editor.connection.vendor == "sqlite":
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0021_search_index_prefixes'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(_search_index(DIRECTORS)), _run(_search_index(DIRECTOR))),
+    ]
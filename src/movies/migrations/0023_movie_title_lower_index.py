@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:19
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0022_search_index_directors'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(django.db.models.functions.text.Lower('title'), name='movie_title_lower_idx'),
+        ),
+    ]
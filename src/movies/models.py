@@ -1,9 +1,29 @@
 import datetime
+import hashlib
+import json
+from typing import Any
 
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 from django.conf import settings
 from django.db.models import JSONField
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+
+FINGERPRINT_FIELDS = ("title", "country", "release_year", "genres", "extra_data")
+
+
+def movie_fingerprint(values: dict[str, Any]) -> str:
+    """Digest of the ingested fields of a movie, used to skip unchanged rows on re-import."""
+    content = json.dumps(
+        [values[name] for name in FINGERPRINT_FIELDS],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
 
 
 class Movie(models.Model):
@@ -17,13 +37,91 @@ class Movie(models.Model):
             MaxValueValidator(datetime.datetime.now().year)
         ],
         null=True)
+    content_hash = models.CharField(max_length=32, blank=True, default="", editable=False,
+                                    help_text="Fingerprint of the ingested fields, see movie_fingerprint.")
+    # Interned copies of genres, extra_data's directors and country for
+    # filtering through indexes; the fields above stay what the API returns.
+    tagged_genres = models.ManyToManyField("Genre", through="MovieGenre", related_name="movies")
+    people = models.ManyToManyField("Person", through="MovieCredit", related_name="movies")
+    countries = models.ManyToManyField("Country", through="MovieCountry", related_name="movies")
 
     class Meta:
         unique_together = ("title", "country", "release_year")
+        indexes = [
+            # Year ranges, read in id order by the paginated movie list
+            models.Index(fields=["release_year", "id"]),
+            # Exact and leading title matches of search and autocompletion
+            models.Index(Lower("title"), name="movie_title_lower_idx"),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or not set(FINGERPRINT_FIELDS).isdisjoint(update_fields):
+            # getattr rather than __dict__, which lacks the deferred fields
+            self.content_hash = movie_fingerprint({name: getattr(self, name) for name in FINGERPRINT_FIELDS})
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "content_hash"}
+        super().save(*args, **kwargs)
+
+
+class Genre(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Person(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Country(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        verbose_name_plural = "countries"
+
+    def __str__(self):
+        return self.name
+
+
+class MovieGenre(models.Model):
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="genre_links")
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE, related_name="movie_links")
+
+    class Meta:
+        unique_together = ("movie", "genre")
+        # Covers "movies of a genre" without touching the movie rows
+        indexes = [models.Index(fields=["genre", "movie"])]
+
+
+class MovieCredit(models.Model):
+    class Role(models.TextChoices):
+        DIRECTOR = "director"
+
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="credits")
+    person = models.ForeignKey(Person, on_delete=models.CASCADE, related_name="credits")
+    role = models.CharField(max_length=20, choices=Role.choices, default=Role.DIRECTOR)
+
+    class Meta:
+        unique_together = ("movie", "person", "role")
+        indexes = [models.Index(fields=["person", "role", "movie"])]
+
+
+class MovieCountry(models.Model):
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="country_links")
+    country = models.ForeignKey(Country, on_delete=models.CASCADE, related_name="movie_links")
+
+    class Meta:
+        unique_together = ("movie", "country")
+        indexes = [models.Index(fields=["country", "movie"])]
+
 
 class UserMoviePreferences(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL,
@@ -32,12 +130,34 @@ class UserMoviePreferences(models.Model):
     preferences = JSONField(default=dict,
                             help_text="Stores user preferences for movies like genres, directors, etc.")
     watch_history = JSONField(default=dict,
-                              help_text="Stores information about movies the user has watched.")
+                              help_text="No longer written, see WatchEvent. Holds the entries that "
+                                        "migration 0020 could not match to a movie.")
 
     def __str__(self):
         return f"{self.user.username}'s Movie Preferences"
 
 
+class WatchEvent(models.Model):
+    """
+    One movie watched by a user. Rows are only ever inserted, so recording
+    a view does not touch the rest of the user's history, and a user's
+    history is read as a range of the (user, watched_at) index.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             on_delete=models.CASCADE,
+                             related_name="watch_events",
+                             db_index=False)
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="watch_events")
+    watched_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        # Also serves the user foreign key, hence db_index=False above
+        indexes = [models.Index(fields=["user", "watched_at", "id"])]
+
+    def __str__(self):
+        return f"{self.user_id} watched {self.movie_id} at {self.watched_at}"
+
+
 
 class Book(models.Model):
     title = models.CharField(max_length=255)
@@ -46,4 +166,133 @@ class Book(models.Model):
     publication_year = models.IntegerField()
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+
+class IngestionJob(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        SPLITTING = "splitting"
+        PROCESSING = "processing"
+        MERGING = "merging"
+        FINALISING = "finalising"
+        COMPLETED = "completed"
+        FAILED = "failed"
+
+    class Mode(models.TextChoices):
+        DIRECT = "direct", "Chunks upsert into Movie"
+        STAGED = "staged", "Chunks load MovieStaging, merged into Movie at the end"
+
+    file_name = models.CharField(max_length=255)
+    file_type = models.CharField(max_length=100)
+    mode = models.CharField(max_length=20, choices=Mode.choices, default=Mode.DIRECT)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    size = models.BigIntegerField(null=True, help_text="Size of the uploaded file in bytes, as stored.")
+    rows_created = models.PositiveIntegerField(default=0, help_text="Totals, set when the job completes.")
+    rows_updated = models.PositiveIntegerField(default=0, help_text="Totals, set when the job completes.")
+    rows_unchanged = models.PositiveIntegerField(default=0, help_text="Totals, set when the job completes.")
+    rows_rejected = models.PositiveIntegerField(default=0, help_text="Totals, set when the job completes.")
+    rejects_file = models.CharField(max_length=255, blank=True,
+                                    help_text="JSON Lines report of the rows that failed validation, in storage.")
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return f"{self.file_name} ({self.status})"
+
+
+class IngestionChunk(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        RUNNING = "running"
+        COMPLETED = "completed"
+        FAILED = "failed"
+
+    job = models.ForeignKey(IngestionJob,
+                            on_delete=models.CASCADE,
+                            related_name="chunks")
+    index = models.PositiveIntegerField()
+    start = models.BigIntegerField(help_text="Offset of the chunk's first byte in the uploaded file.")
+    end = models.BigIntegerField(help_text="Offset just past the chunk's last byte.")
+    line = models.PositiveIntegerField(null=True, help_text="Line of the chunk's first byte, when the splitter counted lines.")
+    lines = models.PositiveIntegerField(default=0, help_text="Number of newlines in the chunk.")
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    rows_created = models.PositiveIntegerField(default=0)
+    rows_updated = models.PositiveIntegerField(default=0)
+    rows_unchanged = models.PositiveIntegerField(default=0)
+    rows_staged = models.PositiveIntegerField(default=0)
+    rows_rejected = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    class Meta:
+        unique_together = ("job", "index")
+        ordering = ["index"]
+
+    def __str__(self):
+        return f"{self.job_id}#{self.index} ({self.status})"
+
+
+class MovieStaging(models.Model):
+    """
+    Validated rows of a staged ingestion job waiting for the final merge
+    into Movie. Deliberately without indexes or constraints so that chunk
+    workers only ever append; rows are deleted once merged.
+    """
+    job_id = models.BigIntegerField()
+    title = models.CharField(max_length=255)
+    genres = models.JSONField(default=list)
+    country = models.CharField(max_length=100, null=True)
+    extra_data = models.JSONField(default=dict)
+    release_year = models.IntegerField(null=True)
+    content_hash = models.CharField(max_length=32)
+
+
+class UploadSession(models.Model):
+    """
+    A resumable upload: the client PUTs numbered parts, which are stored
+    separately until the session is completed and they are assembled into
+    a single file for an IngestionJob.
+    """
+    class Status(models.TextChoices):
+        OPEN = "open"
+        ASSEMBLING = "assembling"
+        COMPLETED = "completed"
+        FAILED = "failed"
+
+    file_name = models.CharField(max_length=255, help_text="Name of the file on the client.")
+    file_type = models.CharField(max_length=100)
+    size = models.BigIntegerField(null=True, help_text="Total size announced by the client, checked on completion.")
+    mode = models.CharField(max_length=20, choices=IngestionJob.Mode.choices, default=IngestionJob.Mode.DIRECT)
+    rows_per_chunk = models.PositiveIntegerField(null=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.OPEN)
+    job = models.OneToOneField(IngestionJob,
+                               on_delete=models.SET_NULL,
+                               null=True,
+                               related_name="upload")
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return f"{self.file_name} ({self.status})"
+
+
+class UploadPart(models.Model):
+    session = models.ForeignKey(UploadSession,
+                                on_delete=models.CASCADE,
+                                related_name="parts")
+    number = models.PositiveIntegerField()
+    file_name = models.CharField(max_length=255, help_text="Name of the part in storage.")
+    size = models.BigIntegerField()
+    received_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("session", "number")
+        ordering = ["number"]
+
+    def __str__(self):
+        return f"{self.session_id}#{self.number}"
@@ -0,0 +1,149 @@
+import base64
+import binascii
+import json
+from typing import Any, Sequence
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections
+from django.db.models import F, Model, Q, QuerySet
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def keyset_after(keys: Sequence[tuple[str, bool]], values: Sequence[Any], nulls_largest: bool) -> list[Q]:
+    """
+    Filters selecting, in turn, the rows sorting after `values` in the order
+    of `keys`, pairs of a field and whether it is descending. Each one is a
+    single range of an index on the keys, so that it is seeked rather than
+    scanned; an OR of the NULL rows would have the index walked from its
+    start. NULLs sort where the backend puts them (see
+    DatabaseFeatures.nulls_order_largest).
+    """
+    (field, descending), value = keys[0], values[0]
+    after = "lt" if descending else "gt"
+    if len(keys) == 1:
+        return [Q(**{f"{field}__{after}": value})]
+    rest = keyset_after(keys[1:], values[1:], nulls_largest)
+    nulls_last = nulls_largest != descending
+    if value is None:
+        ties = [Q(**{f"{field}__isnull": True}) & segment for segment in rest]
+        return ties if nulls_last else ties + [Q(**{f"{field}__isnull": False})]
+    if len(rest) == 1:
+        segments = [Q(**{f"{field}__{after}e": value}) & (Q(**{f"{field}__{after}": value}) | rest[0])]
+    else:
+        segments = [Q(**{field: value}) & segment for segment in rest] + [Q(**{f"{field}__{after}": value})]
+    return segments + [Q(**{f"{field}__isnull": True})] if nulls_last else segments
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a unique sort key, ending with the primary key:
+    a page is read with `WHERE key > last key seen ORDER BY key LIMIT n`,
+    so it costs the same however deep it is, and no COUNT(*) is run. Pages
+    crossing from a NULL to a non-NULL key take a second such query.
+    The `ordering` query parameter picks one of `orderings`.
+
+    Clients still sending `?page=` get PageNumberPagination's pages and count.
+    """
+    cursor_query_param = "cursor"
+    ordering_query_param = "ordering"
+    orderings = {"id": ("id",), "-id": ("-id",)}
+    default_ordering = "id"
+    legacy_pagination_class = PageNumberPagination
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view: Any = None) -> list[Model] | None:
+        self.request = request
+        self.legacy = None
+        self.page_size = api_settings.PAGE_SIZE
+        if self.page_size is None:
+            return None
+        if self.legacy_pagination_class.page_query_param in request.query_params:
+            self.legacy = self.legacy_pagination_class()
+            return self.legacy.paginate_queryset(queryset, request, view)
+
+        name = request.query_params.get(self.ordering_query_param, self.default_ordering)
+        if name not in self.orderings:
+            raise ValidationError({self.ordering_query_param: [f"Choose one of {', '.join(self.orderings)}."]})
+        self.keys = [(key.lstrip("-"), key.startswith("-")) for key in self.orderings[name]]
+        position, self.reverse = self.decode_cursor(request, queryset.model)
+
+        keys = [(field, descending != self.reverse) for field, descending in self.keys]
+        queryset = queryset.order_by(*[F(field).desc() if descending else F(field).asc()
+                                       for field, descending in keys])
+        segments = [Q()]
+        if position is not None:
+            segments = keyset_after(keys, position, connections[queryset.db].features.nulls_order_largest)
+        page = []
+        for segment in segments:
+            page += queryset.filter(segment)[:self.page_size + 1 - len(page)]
+            if len(page) > self.page_size:
+                break
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        if self.reverse:
+            # Read backwards from the cursor, towards the first page
+            page.reverse()
+            self.next_position = self.key_of(page[-1]) if page else None
+            self.previous_position = self.key_of(page[0]) if has_more else None
+        else:
+            self.next_position = self.key_of(page[-1]) if has_more else None
+            self.previous_position = self.key_of(page[0]) if page and position is not None else None
+        return page
+
+    def key_of(self, item: Model) -> list[Any]:
+        return [getattr(item, field) for field, _ in self.keys]
+
+    def decode_cursor(self, request: Request, model: type[Model]) -> tuple[list[Any] | None, bool]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            position, reverse = cursor["p"], bool(cursor.get("r"))
+            if not isinstance(position, list) or len(position) != len(self.keys):
+                raise ValueError(position)
+            position = [model._meta.get_field(field).to_python(value)
+                        for (field, _), value in zip(self.keys, position)]
+            if position[-1] is None:
+                raise ValueError(position)
+        except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError, DjangoValidationError):
+            raise NotFound("Invalid cursor")
+        return position, reverse
+
+    def encode_cursor(self, position: list[Any] | None, reverse: bool) -> str | None:
+        if position is None:
+            return None
+        cursor = {"p": position, "r": 1} if reverse else {"p": position}
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor, separators=(",", ":")).encode()).decode("ascii")
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self) -> str | None:
+        if self.legacy:
+            return self.legacy.get_next_link()
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self) -> str | None:
+        if self.legacy:
+            return self.legacy.get_previous_link()
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data: list[Any]) -> Response:
+        if self.legacy:
+            return self.legacy.get_paginated_response(data)
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+
+class MovieKeysetPagination(KeysetPagination):
+    orderings = {
+        **KeysetPagination.orderings,
+        "release_year": ("release_year", "id"),
+        "-release_year": ("-release_year", "-id"),
+    }
@@ -1,8 +1,36 @@
+import os
 from typing import Any
 
+from django.conf import settings
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from rest_framework import serializers
-from movies.models import Movie, Book
+from movies.models import Movie, Book, IngestionJob, IngestionChunk, UploadSession
+
+try:
+    import zstandard
+except ImportError:  # zstd-compressed uploads need the optional zstandard package
+    zstandard = None
+
+UPLOAD_FILE_TYPES = ["text/csv", "application/json", "application/x-ndjson", "application/xml"]
+# Content types of compressed uploads; the format of the records inside is
+# told by the extension under the compression one, as in catalog.csv.gz
+ZSTD_FILE_TYPE = "application/zstd"
+COMPRESSED_FILE_TYPES = ["application/gzip", "application/x-gzip", ZSTD_FILE_TYPE]
+FILE_TYPE_EXTENSIONS = {
+    ".csv": "text/csv",
+    ".json": "application/json",
+    ".jsonl": "application/x-ndjson",
+    ".ndjson": "application/x-ndjson",
+    ".xml": "application/xml",
+}
+
+
+def upload_file_type(uploaded_file: Any) -> str | None:
+    """The record format of an uploaded file, looking through compression."""
+    if uploaded_file.content_type not in COMPRESSED_FILE_TYPES:
+        return uploaded_file.content_type
+    inner_name = os.path.splitext(uploaded_file.name)[0]
+    return FILE_TYPE_EXTENSIONS.get(os.path.splitext(inner_name)[1].lower())
 
 
 class MovieSerializer(serializers.ModelSerializer):
@@ -11,6 +39,35 @@ class MovieSerializer(serializers.ModelSerializer):
         fields = ["id", "title", "genres", "release_year", "country", "extra_data"]
 
 
+class MovieFilterSerializer(serializers.Serializer):
+    """
+    Query parameters of the movie list. A parameter given several times
+    matches any of its values; different parameters must all match.
+    """
+    genre = serializers.ListField(child=serializers.CharField(max_length=255), required=False)
+    director = serializers.ListField(child=serializers.CharField(max_length=255), required=False)
+    country = serializers.ListField(child=serializers.CharField(max_length=100), required=False)
+    release_year = serializers.IntegerField(required=False)
+    release_year_min = serializers.IntegerField(required=False)
+    release_year_max = serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        low, high = data.get("release_year_min"), data.get("release_year_max")
+        if low is not None and high is not None and low > high:
+            raise serializers.ValidationError("release_year_min is greater than release_year_max.")
+        return data
+
+
+class MovieSearchSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+class MovieAutocompleteSerializer(serializers.Serializer):
+    prefix = serializers.CharField(max_length=200)
+    limit = serializers.IntegerField(min_value=1, max_value=20, default=10)
+
+
 class BookSerializer(serializers.ModelSerializer):
     class Meta:
         model = Book
@@ -41,6 +98,17 @@ class AddToWatchHistorySerializer(serializers.Serializer):
             raise serializers.ValidationError("Movie with given id does not exist.")
         return value
 
+
+class WatchHistoryRangeSerializer(serializers.Serializer):
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+
+    def validate(self, data: dict[str, Any]) -> dict[str, Any]:
+        if "since" in data and "until" in data and data["since"] > data["until"]:
+            raise serializers.ValidationError("since must not be after until.")
+        return data
+
+
 class PreferencesSerializer(serializers.Serializer):
     genre = serializers.ListField(child=serializers.CharField(),
                                   required=False)
@@ -61,12 +129,49 @@ class WatchHistorySerializer(serializers.Serializer):
 
 class GeneralFileUploadSerializer(serializers.Serializer):
     file = serializers.FileField()
+    rows_per_chunk = serializers.IntegerField(min_value=1, required=False)
+    mode = serializers.ChoiceField(choices=IngestionJob.Mode.choices,
+                                   default=IngestionJob.Mode.DIRECT)
 
     def validate_file(self, value: InMemoryUploadedFile) -> InMemoryUploadedFile:
-        # if value.size > 10 * 1024 * 1024:
-        #     raise serializers.ValidationError("File size exceeds the limit of 10MB")
-        allowed_types = ["text/csv", "application/json", "application/xml"]
-        if value.content_type not in allowed_types:
+        if value.size > settings.MOVIE_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"File size exceeds the limit of {settings.MOVIE_UPLOAD_MAX_SIZE // (1024 * 1024)}MB, "
+                "use the resumable upload API for larger files."
+            )
+        if upload_file_type(value) not in UPLOAD_FILE_TYPES:
             raise serializers.ValidationError("Unsupported file type.")
+        if value.content_type == ZSTD_FILE_TYPE and zstandard is None:
+            raise serializers.ValidationError("zstd-compressed files are not supported by this server.")
         return value
 
+    def validate(self, data: dict[str, Any]) -> dict[str, Any]:
+        data["file_type"] = upload_file_type(data["file"])
+        return data
+
+
+class IngestionChunkSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = IngestionChunk
+        fields = ["index", "start", "end", "status", "rows_created",
+                  "rows_updated", "rows_unchanged", "rows_staged", "rows_rejected", "error",
+                  "started_at", "finished_at"]
+
+
+class IngestionJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = IngestionJob
+        fields = ["id", "file_name", "file_type", "size", "mode", "status", "rejects_file", "error",
+                  "created_at", "started_at", "finished_at"]
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    file_type = serializers.ChoiceField(choices=UPLOAD_FILE_TYPES)
+    size = serializers.IntegerField(min_value=1, required=False)
+    rows_per_chunk = serializers.IntegerField(min_value=1, required=False)
+
+    class Meta:
+        model = UploadSession
+        fields = ["id", "file_name", "file_type", "size", "mode", "rows_per_chunk",
+                  "status", "job", "error", "created_at", "completed_at"]
+        read_only_fields = ["status", "job", "error", "created_at", "completed_at"]
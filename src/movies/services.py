@@ -1,18 +1,61 @@
+import ast
 import csv
+import gzip
+import io
 import json
+import math
+import os
+import re
+import struct
 import sys
-from collections import defaultdict
-from datetime import datetime
-from typing import Any, Tuple, IO
+import uuid
+import xml.etree.ElementTree as ET
+import zlib
+from collections import defaultdict, OrderedDict
+from dataclasses import dataclass, asdict, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Tuple, IO, Iterable, Iterator
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.files.storage import default_storage
-from django.db import transaction, IntegrityError
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage, default_storage
+from django.db import connection, transaction, DataError, IntegrityError
+from django.db.models import Count, Max, Model, Q, QuerySet
+from django.db.models.functions import Coalesce, Greatest
 from django.shortcuts import get_object_or_404
-from rest_framework.exceptions import ValidationError
+from django.utils import timezone
+from rest_framework.exceptions import Throttled, ValidationError
 
-from movies.models import UserMoviePreferences, Movie
-from movies.serializers import PreferencesSerializer
+try:
+    import zstandard
+except ImportError:  # zstd-compressed uploads need the optional zstandard package
+    zstandard = None
+
+from movies.models import (
+    UserMoviePreferences,
+    WatchEvent,
+    Movie,
+    Genre,
+    Person,
+    Country,
+    MovieGenre,
+    MovieCredit,
+    MovieCountry,
+    MovieStaging,
+    IngestionJob,
+    IngestionChunk,
+    UploadSession,
+    UploadPart,
+    movie_fingerprint,
+)
+from movies.serializers import (
+    PreferencesSerializer,
+    IngestionJobSerializer,
+    IngestionChunkSerializer,
+    UploadSessionSerializer,
+)
 
 
 def add_preference(user_id: int, new_preferences: dict[str,  Any]) -> None:
@@ -30,30 +73,12 @@ def add_preference(user_id: int, new_preferences: dict[str,  Any]) -> None:
         user_preferences.preferences = dict(current_preferences)
         user_preferences.save()
 
-def add_watch_history(user_id: int, movie_id: int) -> None:
+def add_watch_history(user_id: int, movie_id: int) -> WatchEvent:
+    """Record that the user watched the movie: a single insert, whatever the
+    length of their history."""
     user = get_user_model().objects.get(id=user_id)
     movie = get_object_or_404(Movie, id=movie_id)
-    movie_info = {
-        "title": movie.title,
-        "year": movie.release_year,
-        "director": movie.extra_data.get("director", []),
-        "genres": movie.genres,
-    }
-
-    try:
-        with transaction.atomic():
-            user_preferences, created = UserMoviePreferences.objects.get_or_create(
-                user_id=user_id, defaults={"watch_history": [movie_info]}
-            )
-    except IntegrityError:
-        user_preferences = UserMoviePreferences.objects.get(user_id=user_id)
-        created = False
-
-    if not created:
-        current_watch_history = user_preferences.watch_history
-        current_watch_history.append(movie_info)
-        user_preferences.watch_history = current_watch_history
-        user_preferences.save()
+    return WatchEvent.objects.create(user=user, movie=movie)
 
 
 def user_preferences(user_id: int) -> Any:
@@ -61,79 +86,1648 @@ def user_preferences(user_id: int) -> Any:
     serializer = PreferencesSerializer(user_preferences.preferences)
     return serializer.data
 
-def user_watch_history(user_id: int) -> dict[str, Any]:
-    user_preferences = get_object_or_404(UserMoviePreferences, user_id=user_id)
-    return {"watch_history": user_preferences.watch_history}
+def user_watch_history(user_id: int,
+                       since: datetime | None = None,
+                       until: datetime | None = None) -> dict[str, Any]:
+    """The movies the user watched, oldest first, optionally only those
+    watched in [since, until): a range read of the WatchEvent index."""
+    get_object_or_404(get_user_model(), id=user_id)
+    events = WatchEvent.objects.filter(user_id=user_id).select_related("movie").order_by("watched_at", "id")
+    if since is not None:
+        events = events.filter(watched_at__gte=since)
+    if until is not None:
+        events = events.filter(watched_at__lt=until)
+    return {"watch_history": [
+        {
+            "movie_id": event.movie_id,
+            "title": event.movie.title,
+            "year": event.movie.release_year,
+            "director": event.movie.extra_data.get("director", []),
+            "genres": event.movie.genres,
+            "watched_at": event.watched_at,
+        }
+        for event in events
+    ]}
 
-def create_or_update_movie(
-    title: str,
-    genres: list[str],
-    country: str | None = None,
-    extra_data: dict[Any, Any] | None = None,
-    release_year: int | None = None,
-) -> Tuple[Movie, bool]:
+MOVIE_FIELDS = ("title", "genres", "country", "extra_data", "release_year")
+MOVIE_UPDATE_FIELDS = ["genres", "extra_data", "content_hash"]
+# The first films were shot in 1888
+MIN_RELEASE_YEAR = 1888
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_LOOKUP_CACHE_SIZE = 10000
+# Titles per lookup query on backends without a bound parameter limit
+LOOKUP_QUERY_SIZE = 5000
+
+MovieKey = Tuple[str, str | None, int | None]
+
+
+@dataclass
+class ImportStats:
+    """Counts collected while writing movie rows to the database."""
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    staged: int = 0
+    rejected: int = 0
+
+    @property
+    def processed(self) -> int:
+        """Rows that passed validation and were stored."""
+        return self.created + self.updated + self.unchanged + self.staged
+
+    def __add__(self, other: "ImportStats") -> "ImportStats":
+        return ImportStats(**{
+            field: getattr(self, field) + getattr(other, field)
+            for field in self.as_dict()
+        })
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+def _parse_structured(value: Any) -> Any:
+    """CSV cells carry lists and dicts as text, either JSON or a Python repr."""
+    if not isinstance(value, str):
+        return value
+    try:
+        return json.loads(value)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+
+
+def clean_movie_row(row: dict[str, Any]) -> dict[str, Any]:
     """
-    Service function to create or update a Movie instance.
+    Coerce a raw CSV/JSON row into Movie field values, raising
+    ValidationError when the row cannot be stored.
     """
-    # Ensure the release_year is within an acceptable range
-    current_year = datetime.datetime.now().year
-    if release_year is not None and (
-        release_year < 1888 or release_year > current_year
-    ):
-        raise ValidationError(
-            "The release year must be between 1888 and the current year."
-        )
+    if not isinstance(row, dict):
+        raise ValidationError("A movie record must be an object.")
+    title = row.get("title")
+    if not title:
+        raise ValidationError("A movie title is required.")
+    if len(str(title)) > 255:
+        raise ValidationError("The title is longer than 255 characters.")
+    country = row.get("country") or None
+    if country is not None and len(str(country)) > 100:
+        raise ValidationError("The country is longer than 100 characters.")
 
-    # Attempt to update an existing movie or create a new one
-    movie, created = Movie.objects.update_or_create(
-        title=title,
-        defaults={
-            "genres": genres,
-            "country": country,
-            "extra_data": extra_data,
-            "release_year": release_year,
-        },
+    release_year = row.get("release_year")
+    if release_year in (None, ""):
+        release_year = None
+    else:
+        try:
+            release_year = int(release_year)
+        except (TypeError, ValueError):
+            raise ValidationError(f"Invalid release year: {release_year!r}.")
+        current_year = datetime.now().year
+        if release_year < MIN_RELEASE_YEAR or release_year > current_year:
+            raise ValidationError("The release year must be between 1888 and the current year.")
+
+    genres = _parse_structured(row.get("genres") or [])
+    if isinstance(genres, str):
+        genres = [genre.strip() for genre in genres.split(",") if genre.strip()]
+    if not isinstance(genres, list) or any(isinstance(genre, (list, dict)) for genre in genres):
+        raise ValidationError("Genres must be a list of names.")
+
+    extra_data = _parse_structured(row.get("extra_data") or {})
+    if not isinstance(extra_data, dict):
+        raise ValidationError("Extra data must be an object.")
+
+    return {
+        "title": str(title),
+        "genres": genres,
+        "country": str(country) if country is not None else None,
+        "extra_data": extra_data,
+        "release_year": release_year,
+    }
+
+
+def movie_key(values: dict[str, Any]) -> MovieKey:
+    return values["title"], values["country"], values["release_year"]
+
+
+@dataclass
+class ChunkRejects:
+    """
+    Rows of one chunk that failed validation or were refused by the
+    database, as {"line", "reason", "record"} with lines counted from the
+    chunk's start. `first_line` places the chunk in the file (0 when the
+    splitter did not count lines) and `lines` is the number of newlines in
+    the chunk. `valid_lines` holds the line of every row that passed
+    validation, in the order the writers receive them.
+    """
+    first_line: int = 0
+    lines: int = 0
+    rows: list[dict[str, Any]] = field(default_factory=list)
+    valid_lines: list[int] = field(default_factory=list)
+
+    def quarantine(self, position: int, values: dict[str, Any], error: Exception) -> None:
+        """Set aside the valid row at `position` that could not be written."""
+        line = self.valid_lines[position] if position < len(self.valid_lines) else 0
+        record = {name: value for name, value in values.items() if name != "content_hash"}
+        self.rows.append({"line": line, "reason": f"Could not be stored: {error}", "record": record})
+
+
+def _error_message(error: ValidationError) -> str:
+    detail = error.detail
+    if isinstance(detail, dict):
+        detail = [message for messages in detail.values() for message in messages]
+    return "; ".join(str(message) for message in detail)
+
+
+def validate_movie_rows(
+        records: Iterable[Tuple[int, Any]],
+        rejects: ChunkRejects
+) -> Iterator[dict[str, Any]]:
+    """
+    The validation stage between a chunk's parser and the write path:
+    clean (line, row) records with clean_movie_row and yield the valid
+    rows, setting the others aside in `rejects` with the reason instead of
+    failing the chunk. A parser passes a record it could not decode as a
+    ValidationError in place of the row.
+    """
+    for line, row in records:
+        try:
+            if isinstance(row, ValidationError):
+                raise row
+            values = clean_movie_row(row)
+        except ValidationError as e:
+            record = None if isinstance(row, ValidationError) else row
+            rejects.rows.append({"line": line, "reason": _error_message(e), "record": record})
+            continue
+        rejects.valid_lines.append(line)
+        yield values
+
+
+def resolve_reject_lines(chunks: Iterable[ChunkRejects]) -> Iterator[dict[str, Any]]:
+    """
+    Rejected rows of consecutive chunks with lines counted from the start
+    of the file. A chunk whose first line is unknown follows on from the
+    previous one, which holds for the only splitter that does not count
+    lines, split_ndjson_file, whose chunks are contiguous from offset 0.
+    """
+    next_line = 1
+    for chunk in chunks:
+        first_line = chunk.first_line or next_line
+        for row in chunk.rows:
+            yield {**row, "line": first_line + row["line"] - 1}
+        next_line = first_line + chunk.lines
+
+
+class MovieLookupCache:
+    """
+    LRU-bounded map of natural keys to the (id, content_hash) of stored
+    movies. Keys are resolved with set-based queries ahead of the writes,
+    and the writer records what it creates or updates, so keys repeated
+    across batches or chunks are never looked up again.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_LOOKUP_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: OrderedDict[MovieKey, Tuple[int, str]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: MovieKey) -> bool:
+        return key in self._entries
+
+    def get(self, key: MovieKey) -> Tuple[int, str] | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: MovieKey, movie_id: int, content_hash: str) -> None:
+        self._entries[key] = (movie_id, content_hash)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def prefetch(self, keys: Iterable[MovieKey]) -> None:
+        """
+        Load every key that is not cached yet. Filtering on title alone keeps
+        the statement small; NULL country / release_year parts of the
+        natural key are then matched in Python.
+        """
+        missing = set()
+        for key in keys:
+            if self.get(key) is None:
+                missing.add(key)
+        titles = list({title for title, _, _ in missing})
+        query_size = connection.features.max_query_params or LOOKUP_QUERY_SIZE
+        for i in range(0, len(titles), query_size):
+            existing = Movie.objects.filter(title__in=titles[i:i + query_size]).values_list(
+                "id", "title", "country", "release_year", "content_hash"
+            )
+            for movie_id, title, country, release_year, content_hash in existing:
+                if (title, country, release_year) in missing:
+                    self.put((title, country, release_year), movie_id, content_hash)
+
+    def refresh(self, keys: Iterable[MovieKey]) -> None:
+        """Forget and reload `keys`, e.g. after another writer created some of them."""
+        keys = list(keys)
+        for key in keys:
+            self._entries.pop(key, None)
+        self.prefetch(keys)
+
+
+def catalog_names(value: Any, max_length: int = 255) -> list[str]:
+    """The distinct names in a genres list, directors entry or country, as
+    they are interned in the Genre, Person and Country tables. A string is
+    a comma-separated list of names, as genres are parsed in clean_movie_row
+    and as data/download_movies.py writes directors and countries."""
+    if isinstance(value, str):
+        value = value.split(",")
+    names = []
+    for item in value if isinstance(value, list) else [value]:
+        if item is None or isinstance(item, (list, dict)):
+            continue
+        name = str(item).strip()
+        if name and len(name) <= max_length and name not in names:
+            names.append(name)
+    return names
+
+
+def director_names(extra_data: Any) -> list[str]:
+    """The names in extra_data["director"] and extra_data["directors"]; the
+    downloader writes the latter, movies entered through the API mostly the former."""
+    if not isinstance(extra_data, dict):
+        return []
+    names = catalog_names(extra_data.get("director"))
+    return names + [name for name in catalog_names(extra_data.get("directors")) if name not in names]
+
+
+def intern_names(model: type[Genre | Person | Country], names: Iterable[str]) -> dict[str, int]:
+    """Ids of `names` in one of the catalog tables, inserting those missing."""
+    names = list(set(names))
+    query_size = connection.features.max_query_params or LOOKUP_QUERY_SIZE
+    ids = {}
+    for i in range(0, len(names), query_size):
+        batch = names[i:i + query_size]
+        ids.update(model.objects.filter(name__in=batch).values_list("name", "id"))
+        missing = [name for name in batch if name not in ids]
+        if missing:
+            # Concurrent chunks may intern the same names
+            model.objects.bulk_create([model(name=name) for name in missing], ignore_conflicts=True)
+            ids.update(model.objects.filter(name__in=missing).values_list("name", "id"))
+    return ids
+
+
+CATALOG_LINKS = {
+    MovieGenre: (Genre, "genre_id"),
+    MovieCredit: (Person, "person_id"),
+    MovieCountry: (Country, "country_id"),
+}
+
+
+def _catalog_link_names(values: dict[str, Any]) -> dict[type[Model], list[str]]:
+    return {
+        Genre: catalog_names(values.get("genres")),
+        Person: director_names(values.get("extra_data")),
+        Country: catalog_names(values.get("country"), max_length=100),
+    }
+
+
+def intern_catalog(rows: Iterable[dict[str, Any]]) -> dict[type[Model], dict[str, int]]:
+    """Ids of the genre, director and country names of `rows`, interning new
+    ones. Each table is written in its own short transaction, so this runs
+    ahead of the transaction writing the movies, see _write_batch."""
+    names: dict[type[Model], set[str]] = defaultdict(set)
+    for values in rows:
+        for model, row_names in _catalog_link_names(values).items():
+            names[model].update(row_names)
+    return {model: intern_names(model, names[model]) for model, _ in CATALOG_LINKS.values()}
+
+
+def link_movie_catalog(
+        movies: Iterable[Tuple[int, dict[str, Any]]],
+        created: bool = False,
+        interned: dict[type[Model], dict[str, int]] | None = None
+) -> None:
+    """
+    Replace the genre, director and country links of the (movie id, field
+    values) pairs with the names in their genres, directors (see
+    director_names) and country, with one insert per link table. Names are
+    interned unless `interned` already holds them. Movies just `created`
+    have no links to remove.
+    """
+    movies = [(movie_id, _catalog_link_names(values)) for movie_id, values in movies]
+    if not movies or created and not any(names for _, by_model in movies for names in by_model.values()):
+        return
+    if interned is None:
+        interned = {model: intern_names(model, (name for _, by_model in movies for name in by_model[model]))
+                    for model, _ in CATALOG_LINKS.values()}
+    movie_ids = [movie_id for movie_id, _ in movies]
+    with transaction.atomic():
+        for link_model, (model, column) in CATALOG_LINKS.items():
+            if not created:
+                link_model.objects.filter(movie_id__in=movie_ids).delete()
+            ids = interned[model]
+            link_model.objects.bulk_create(
+                link_model(movie_id=movie_id, **{column: ids[name]})
+                for movie_id, by_model in movies
+                for name in by_model[model]
+                if name in ids
+            )
+
+
+def _write_batch(rows: list[dict[str, Any]], cache: MovieLookupCache) -> ImportStats:
+    """
+    Insert new and update changed movies of one batch of cleaned rows, and
+    their catalog links, inside a single transaction. Rows whose
+    fingerprint matches the stored one are not written at all. Keys must
+    have been prefetched into `cache`.
+    """
+    stats = ImportStats()
+    # The last occurrence of a key wins, exactly like sequential upserts;
+    # earlier duplicates count against the row they created.
+    by_key: dict[MovieKey, dict[str, Any]] = {}
+    for values in rows:
+        values["content_hash"] = movie_fingerprint(values)
+        key = movie_key(values)
+        if key in by_key:
+            if by_key[key]["content_hash"] == values["content_hash"]:
+                stats.unchanged += 1
+            else:
+                stats.updated += 1
+        by_key[key] = values
+
+    to_create = {}
+    to_update = {}
+    for key, values in by_key.items():
+        entry = cache.get(key)
+        if entry is None:
+            to_create[key] = Movie(**values)
+        elif entry[1] == values["content_hash"]:
+            stats.unchanged += 1
+        else:
+            to_update[key] = Movie(id=entry[0], **values)
+
+    # Interning commits names of its own; the batch's transaction then
+    # only holds the write lock for the movies and their links
+    interned = intern_catalog(by_key[key] for key in [*to_create, *to_update])
+    with transaction.atomic():
+        Movie.objects.bulk_create(to_create.values())
+        if to_update:
+            Movie.objects.bulk_update(to_update.values(), MOVIE_UPDATE_FIELDS)
+        unnumbered = [key for key, movie in to_create.items() if movie.pk is None]
+        if unnumbered:  # not every backend returns ids from bulk inserts
+            cache.refresh(unnumbered)
+            for key in unnumbered:
+                to_create[key].pk = cache.get(key)[0]
+        link_movie_catalog(((movie.pk, by_key[key]) for key, movie in to_create.items()), True, interned)
+        link_movie_catalog(((movie.pk, by_key[key]) for key, movie in to_update.items()), False, interned)
+
+    for key, movie in [*to_create.items(), *to_update.items()]:
+        cache.put(key, movie.pk, movie.content_hash)
+    stats.created += len(to_create)
+    stats.updated += len(to_update)
+    return stats
+
+
+# Errors the database raises for the data of a row, as opposed to
+# connection or locking problems that are worth retrying as they are
+ROW_WRITE_ERRORS = (DataError, IntegrityError)
+
+
+def _write_isolating(
+        rows: list[dict[str, Any]],
+        position: int,
+        write: Callable[[list[dict[str, Any]]], ImportStats],
+        rejects: ChunkRejects | None,
+        refresh: Callable[[list[dict[str, Any]]], None] | None = None
+) -> ImportStats:
+    """
+    Write a batch with `write`. When the database refuses it, the batch's
+    transaction has rolled back and it is bisected: each half is written
+    on its own, recursively, until the rows the database refuses are
+    isolated and quarantined in `rejects`, so one poison row costs
+    O(log batch size) extra statements instead of the chunk. `position`
+    is the index of the batch's first row among the chunk's valid rows
+    and `refresh` is called before a refused batch is retried. Without
+    `rejects` the error is raised as is.
+    """
+    try:
+        return write(rows)
+    except ROW_WRITE_ERRORS as e:
+        if rejects is None:
+            raise
+        if refresh is not None:
+            refresh(rows)
+        if len(rows) > 1:
+            middle = len(rows) // 2
+            return (_write_isolating(rows[:middle], position, write, rejects, refresh)
+                    + _write_isolating(rows[middle:], position + middle, write, rejects, refresh))
+        error = e
+    if refresh is not None:
+        # A single row may only have lost a race for its key: try it once more
+        try:
+            return write(rows)
+        except ROW_WRITE_ERRORS as e:
+            error = e
+    rejects.quarantine(position, rows[0], error)
+    return ImportStats()
+
+
+def bulk_upsert_movies(
+        rows: Iterable[dict[str, Any]],
+        batch_size: int | None = None,
+        cache: MovieLookupCache | None = None,
+        validated: bool = False,
+        rejects: ChunkRejects | None = None
+) -> ImportStats:
+    """
+    Create or update movies keyed on (title, country, release_year),
+    validating rows in memory (unless they come out of
+    validate_movie_rows) and writing them batch by batch. Keys are
+    prefetched into `cache` one window of `cache.max_size` rows at a time,
+    so a chunk that fits the cache is resolved before its first write.
+    With `rejects`, rows the database refuses are quarantined there
+    instead of failing the chunk (see _write_isolating).
+    """
+    batch_size = batch_size or getattr(settings, "MOVIE_IMPORT_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+    if cache is None:
+        cache = MovieLookupCache(max(batch_size, DEFAULT_LOOKUP_CACHE_SIZE))
+    # Every key of a window has to stay cached until its batch is written
+    batch_size = min(batch_size, cache.max_size)
+
+    stats = ImportStats()
+    position = 0
+    window = []
+    for row in rows:
+        window.append(row if validated else clean_movie_row(row))
+        if len(window) >= cache.max_size:
+            stats += _write_window(window, position, batch_size, cache, rejects)
+            position += len(window)
+            window = []
+    if window:
+        stats += _write_window(window, position, batch_size, cache, rejects)
+    return stats
+
+
+def _write_window(
+        rows: list[dict[str, Any]],
+        position: int,
+        batch_size: int,
+        cache: MovieLookupCache,
+        rejects: ChunkRejects | None
+) -> ImportStats:
+    cache.prefetch(movie_key(values) for values in rows)
+
+    def write(batch: list[dict[str, Any]]) -> ImportStats:
+        return _write_batch(batch, cache)
+
+    def refresh(batch: list[dict[str, Any]]) -> None:
+        # A concurrent chunk may have inserted keys this batch meant to create
+        cache.refresh(movie_key(values) for values in batch)
+
+    stats = ImportStats()
+    for i in range(0, len(rows), batch_size):
+        stats += _write_isolating(rows[i:i + batch_size], position + i, write, rejects, refresh)
+    return stats
+
+
+def stage_movies(
+        rows: Iterable[dict[str, Any]],
+        job_id: int,
+        batch_size: int | None = None,
+        validated: bool = False,
+        rejects: ChunkRejects | None = None
+) -> ImportStats:
+    """
+    Validate rows and append them to MovieStaging for the staged job
+    `job_id`, one transaction per batch. Nothing is looked up;
+    merge_staged_movies resolves the natural keys once all chunks are
+    loaded. With `rejects`, rows the database refuses are quarantined
+    there instead of failing the chunk.
+    """
+    batch_size = batch_size or getattr(settings, "MOVIE_IMPORT_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+
+    def write(batch: list[dict[str, Any]]) -> ImportStats:
+        with transaction.atomic():
+            MovieStaging.objects.bulk_create(
+                MovieStaging(job_id=job_id, content_hash=movie_fingerprint(values), **values)
+                for values in batch
+            )
+        return ImportStats(staged=len(batch))
+
+    stats = ImportStats()
+    position = 0
+    batch = []
+    for row in rows:
+        batch.append(row if validated else clean_movie_row(row))
+        if len(batch) >= batch_size:
+            stats += _write_isolating(batch, position, write, rejects)
+            position += len(batch)
+            batch = []
+    if batch:
+        stats += _write_isolating(batch, position, write, rejects)
+    return stats
+
+
+def merge_staged_movies(job_id: int) -> ImportStats:
+    """
+    Merge the staged rows of a job into Movie with a handful of set-based
+    statements, then drop them. Later rows win over earlier ones with the
+    same natural key, and count as updates of them unless identical, as in
+    bulk_upsert_movies. The SQL sticks to what SQLite (3.33+), PostgreSQL
+    and MySQL (8.0+) have in common apart from the joined UPDATE.
+    """
+    qn = connection.ops.quote_name
+    movie = qn(Movie._meta.db_table)
+    staging = qn(MovieStaging._meta.db_table)
+    # NULL-safe comparison of the natural key of s (staging) and m (movie)
+    key_match = (
+        "m.title = s.title"
+        " AND (m.country = s.country OR (m.country IS NULL AND s.country IS NULL))"
+        " AND (m.release_year = s.release_year OR (m.release_year IS NULL AND s.release_year IS NULL))"
     )
-    return movie, created
+    columns = "title, genres, country, extra_data, release_year, content_hash"
+    stats = ImportStats()
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Each duplicate against the row staged before it, as a direct
+        # import would have written them one after the other
+        cursor.execute(
+            f"SELECT COUNT(*) FROM (SELECT content_hash, LAG(content_hash) OVER ("
+            f" PARTITION BY title, country, release_year ORDER BY id) AS previous_hash"
+            f" FROM {staging} WHERE job_id = %s) AS duplicates WHERE previous_hash <> content_hash",
+            [job_id],
+        )
+        (changed,) = cursor.fetchone()
+        cursor.execute(
+            f"DELETE FROM {staging} WHERE job_id = %s AND id NOT IN ("
+            f" SELECT id FROM (SELECT MAX(id) AS id FROM {staging} WHERE job_id = %s"
+            f" GROUP BY title, country, release_year) AS latest)",
+            [job_id, job_id],
+        )
+        stats.updated += changed
+        stats.unchanged += cursor.rowcount - changed
 
+        # Unchanged rows need neither writing nor relinking
+        cursor.execute(
+            f"DELETE FROM {staging} AS s WHERE s.job_id = %s AND EXISTS ("
+            f" SELECT 1 FROM {movie} m WHERE {key_match} AND s.content_hash = m.content_hash)",
+            [job_id],
+        )
+        stats.unchanged += cursor.rowcount
 
-def parse_csv(file: IO[Any]) -> int | None:
-    movies_processed = 0
-    reader = csv.DictReader(file)
+        if connection.vendor == "mysql":
+            update = (
+                f"UPDATE {movie} m JOIN {staging} s ON {key_match}"
+                f" SET m.genres = s.genres, m.extra_data = s.extra_data, m.content_hash = s.content_hash"
+                f" WHERE s.job_id = %s AND s.content_hash <> m.content_hash"
+            )
+        else:
+            update = (
+                f"UPDATE {movie} AS m"
+                f" SET genres = s.genres, extra_data = s.extra_data, content_hash = s.content_hash"
+                f" FROM {staging} AS s WHERE s.job_id = %s AND {key_match}"
+                f" AND s.content_hash <> m.content_hash"
+            )
+        cursor.execute(update, [job_id])
+        stats.updated += cursor.rowcount
+
+        cursor.execute(
+            f"INSERT INTO {movie} ({columns}) SELECT {columns} FROM {staging} s"
+            f" WHERE s.job_id = %s AND NOT EXISTS (SELECT 1 FROM {movie} m WHERE {key_match})",
+            [job_id],
+        )
+        stats.created += cursor.rowcount
+
+        # The staged rows left are the movies just inserted or updated
+        cursor.execute(
+            f"SELECT m.id FROM {movie} m JOIN {staging} s ON {key_match} WHERE s.job_id = %s",
+            [job_id],
+        )
+        while movie_ids := [movie_id for movie_id, in cursor.fetchmany(DEFAULT_BATCH_SIZE)]:
+            merged = Movie.objects.filter(id__in=movie_ids).values("id", *MOVIE_FIELDS)
+            link_movie_catalog((values["id"], values) for values in merged)
+
+        cursor.execute(f"DELETE FROM {staging} WHERE job_id = %s", [job_id])
+    return stats
+
+
+JSON_READ_BLOCK_SIZE = 64 * 1024
+# A complete string literal, a lone quote (string cut off by the end of the
+# buffer) or a structural character. Everything else is skipped in C.
+JSON_SEPARATOR = re.compile(r"[\s,]*")
+JSON_TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|["\[\]{},]', re.S)
+
+
+def iter_json_array(file: IO[bytes], block_size: int = JSON_READ_BLOCK_SIZE) -> Iterator[bytes]:
+    """
+    Stream the raw bytes of each element of a top-level JSON array of
+    objects, reading `block_size` bytes at a time. Only the element being
+    scanned is kept in memory and elements are never decoded.
+    """
+    for _, obj in iter_json_array_spans(file, block_size):
+        yield obj
+
+
+def iter_json_array_spans(
+        file: IO[bytes],
+        block_size: int = JSON_READ_BLOCK_SIZE
+) -> Iterator[Tuple[int, bytes]]:
+    """Like iter_json_array, also yielding each element's offset in the file."""
+    buffer = b""
+    consumed = 0  # bytes of the file dropped from the front of the buffer
+    pos = 0  # offset of the next byte to scan
+    start = None  # offset where the current element began
+    depth = 0
+    eof = False
+    while True:
+        match = JSON_TOKEN.search(buffer, pos)
+        if match is None or match.group() == b'"':
+            if eof:
+                if depth == 0 and not buffer[pos:].strip():
+                    raise ValidationError("Expected a JSON array.")
+                raise ValidationError("Truncated JSON array.")
+            keep = pos if start is None else start
+            buffer = buffer[keep:]
+            consumed += keep
+            pos -= keep
+            if start is not None:
+                start = 0
+            block = file.read(block_size)
+            if not block:
+                eof = True
+            buffer += block
+            continue
+
+        token = match.group()
+        if depth <= 1 and buffer[pos:match.start()].strip(b" \t\r\n\xef\xbb\xbf"):
+            raise ValidationError("Expected a JSON array of objects.")
+        if depth == 0 and token != b"[":
+            raise ValidationError("Expected a JSON array.")
+        if depth == 1 and token[:1] == b'"':
+            raise ValidationError("Expected a JSON array of objects.")
+
+        if token in (b"[", b"{"):
+            if depth == 1:
+                start = match.start()
+            depth += 1
+        elif token in (b"]", b"}"):
+            depth -= 1
+            if depth == 1:
+                yield consumed + start, buffer[start:match.end()]
+                start = None
+            elif depth == 0:
+                return
+        pos = match.end()
+
+
+def iter_csv_records(data: bytes, header: str = "") -> Iterator[Tuple[int, Any]]:
+    """(line, row) for the records of a CSV chunk, `header` being the
+    file's header record when the chunk does not start with it."""
+    reader = csv.DictReader(io.StringIO(header + data.decode("utf-8")))
+    reader.fieldnames  # reads the header record
+    header_lines = header.count("\n")
+    line = reader.line_num  # lines read before the next record
     for row in reader:
-        create_or_update_movie(**row)
-        movies_processed += 1
-        return movies_processed
+        yield line - header_lines + 1, row
+        line = reader.line_num
+
+def iter_json_records(data: bytes) -> Iterator[Tuple[int, Any]]:
+    """(line, object) for the comma-separated objects of a JSON chunk,
+    decoded one by one to know their lines. When one cannot be decoded,
+    the chunk is decoded again span by span so that only that object is
+    rejected."""
+    text = data.decode("utf-8")
+    decoder = json.JSONDecoder()
+    records = []
+    line = 1
+    position = index = 0
+    try:
+        while (index := JSON_SEPARATOR.match(text, index).end()) < len(text):
+            line += text.count("\n", position, index)
+            position = index
+            obj, index = decoder.raw_decode(text, index)
+            records.append((line, obj))
+    except ValueError:
+        return _json_span_records(data)
+    return iter(records)
 
-def parse_json(file: IO[Any]) -> int | None:
-    movies_processed = 0
+def _json_span_records(data: bytes) -> Iterator[Tuple[int, Any]]:
+    padded = b"[" + data + b"]"
+    line = 1
+    position = 0
+    for offset, obj in iter_json_array_spans(io.BytesIO(padded)):
+        line += padded.count(b"\n", position, offset)
+        position = offset
+        try:
+            yield line, json.loads(obj)
+        except ValueError as e:
+            yield line, ValidationError(f"Invalid JSON: {e}")
+
+def parse_csv(
+        file: IO[Any],
+        batch_size: int | None = None,
+        cache: MovieLookupCache | None = None
+) -> ImportStats:
+    reader = csv.DictReader(file)
+    return bulk_upsert_movies(reader, batch_size, cache)
+
+def parse_json(
+        file: IO[Any],
+        batch_size: int | None = None,
+        cache: MovieLookupCache | None = None
+) -> ImportStats:
     data = json.load(file)
-    for item in data:
-        create_or_update_movie(**item)
-        movies_processed += 1
-        return movies_processed
+    return bulk_upsert_movies(data, batch_size, cache)
 
-def parse_xml(file_path: str) -> int:
-    movies_processed = 0
+def iter_ndjson(file: IO[Any]) -> Iterator[dict[str, Any]]:
+    """Decode one JSON object per line, skipping blank lines."""
+    for line_number, row in iter_ndjson_records(file):
+        if isinstance(row, ValidationError):
+            raise ValidationError(f"Invalid JSON on line {line_number}: {_error_message(row)}")
+        yield row
 
+def iter_ndjson_records(file: IO[Any]) -> Iterator[Tuple[int, Any]]:
+    """(line number, object) for every non-blank line; a line that is not
+    valid JSON comes with a ValidationError in place of the object."""
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, ValidationError(str(e))
+
+def parse_ndjson(
+        file: IO[Any],
+        batch_size: int | None = None,
+        cache: MovieLookupCache | None = None
+) -> ImportStats:
+    return bulk_upsert_movies(iter_ndjson(file), batch_size, cache)
+
+def filter_movies(movies: QuerySet, filters: dict[str, Any]) -> QuerySet:
+    """
+    Narrow a Movie queryset with the validated MovieFilterSerializer
+    parameters. Names are matched exactly through the unique name indexes
+    and the (name id, movie) indexes of the link tables, years through the
+    (release_year, id) index, so none of the filters scans the movie table.
+    """
+    for parameter, link_model, column in (
+            ("genre", MovieGenre, "genre"),
+            ("director", MovieCredit, "person"),
+            ("country", MovieCountry, "country"),
+    ):
+        if filters.get(parameter):
+            links = link_model.objects.filter(**{f"{column}__name__in": filters[parameter]})
+            movies = movies.filter(id__in=links.values("movie_id"))
+    if filters.get("release_year") is not None:
+        movies = movies.filter(release_year=filters["release_year"])
+    low, high = filters.get("release_year_min"), filters.get("release_year_max")
+    if low is not None or high is not None:
+        # An open range is closed with the years a movie can have: the
+        # planner takes a bounded range to the index, where it would rather
+        # walk the whole table in id order for a page of an open one
+        movies = movies.filter(release_year__range=(
+            MIN_RELEASE_YEAR if low is None else low,
+            datetime.now().year if high is None else high,
+        ))
+    return movies
+
+
+SEARCH_TABLE = "movies_movie_search"
+SEARCH_TERM = re.compile(r"\w+")
+# bm25 weights of the title and directors columns
+SEARCH_WEIGHTS = (10.0, 1.0)
+# Matches scored per tier of candidates. A word found in most titles would
+# otherwise have every one of them scored, which over a million titles
+# takes several times the 50 ms target (see
+# test_search_latency_over_a_million_titles); beyond this many only the
+# oldest matches of a tier are.
+SEARCH_CANDIDATES = 1000
+AUTOCOMPLETE_CANDIDATES = 1000
+
+
+def _match_expression(text: str, prefix: bool = False, anchored: bool = False) -> str | None:
+    """An FTS5 query requiring every word of `text`, the last one as a prefix
+    when `prefix`; when `anchored`, as a phrase starting the title. Words are
+    quoted, so nothing is read as FTS5 syntax."""
+    terms = [f'"{term}"' for term in SEARCH_TERM.findall(text)]
+    if not terms:
+        return None
+    if prefix:
+        terms[-1] += "*"
+    if anchored:
+        return f"title : ^{' + '.join(terms)}"
+    # A word required twice matches the same rows, and bm25 would count it twice
+    return " ".join(dict.fromkeys(terms))
+
+
+def _title_key(text: str) -> str:
+    """`text` as compared with lower(title), the expression of Movie's title
+    index. SQLite's lower() folds ASCII letters only, and so does this."""
+    return "".join(char.lower() if char.isascii() else char for char in " ".join(text.split()))
+
+
+def search_movies(query: str, limit: int = 20) -> list[Movie]:
+    """
+    The movies whose title or director contains every word of `query`,
+    best first: titles equal to the query, then titles starting with its
+    words, shortest first, then the other matches ranked by bm25 over the
+    FTS5 index of migration 0018, with matches in the title weighing most.
+    Exact titles are read from the title index, so that they are found
+    however many matches there are; of the other two tiers only the first
+    SEARCH_CANDIDATES matches are ranked. bm25 reads every match of each
+    word to weigh it, so it is computed once.
+    Backends other than SQLite have no such index and fall back to a
+    case-insensitive title scan.
+    """
+    expression = _match_expression(query)
+    if expression is None:
+        return []
+    if connection.vendor != "sqlite":
+        movies = Movie.objects.order_by("title")
+        for term in SEARCH_TERM.findall(query):
+            movies = movies.filter(title__icontains=term)
+        return list(movies[:limit])
+    movie = connection.ops.quote_name(Movie._meta.db_table)
+    with connection.cursor() as cursor:
+        # A movie in several tiers is ranked in the first: SQLite takes the
+        # bare columns of a group from the row holding its MIN()
+        cursor.execute(
+            f"SELECT id, MIN(tier) AS tier, score FROM ("
+            f" SELECT * FROM (SELECT id, 0 AS tier, 0.0 AS score FROM {movie} WHERE lower(title) = %s LIMIT %s)"
+            f" UNION ALL SELECT * FROM (SELECT rowid, 1, length(title) FROM {SEARCH_TABLE}"
+            f" WHERE {SEARCH_TABLE} MATCH %s LIMIT %s)"
+            f" UNION ALL SELECT * FROM (SELECT rowid, 2, bm25({SEARCH_TABLE}, %s, %s) FROM {SEARCH_TABLE}"
+            f" WHERE {SEARCH_TABLE} MATCH %s LIMIT %s)"
+            f") GROUP BY id ORDER BY tier, score, id LIMIT %s",
+            [_title_key(query), limit,
+             _match_expression(query, anchored=True), SEARCH_CANDIDATES,
+             *SEARCH_WEIGHTS, expression, SEARCH_CANDIDATES,
+             limit],
+        )
+        ids = [movie_id for movie_id, _, _ in cursor.fetchall()]
+    movies = Movie.objects.in_bulk(ids)
+    return [movies[movie_id] for movie_id in ids if movie_id in movies]
+
+
+def autocomplete_titles(prefix: str, limit: int = 10) -> list[dict[str, Any]]:
+    """
+    Titles completing what has been typed so far: every word of `prefix`,
+    the last one possibly unfinished, must start a word of the title.
+    Titles starting with the typed text come first, read from the title
+    index in alphabetical order, where a title precedes the longer ones it
+    starts; then the other matches. Shorter titles, which match the typed
+    words more closely, come first among the first AUTOCOMPLETE_CANDIDATES
+    of each.
+    """
+    expression = _match_expression(prefix, prefix=True)
+    if expression is None:
+        return []
+    if connection.vendor != "sqlite":
+        movies = Movie.objects.filter(title__istartswith=prefix.strip())
+        return list(movies.order_by("title").values("id", "title")[:limit])
+    movie = connection.ops.quote_name(Movie._meta.db_table)
+    # Titles starting with `typed` sort from it up to the string past it
+    typed = _title_key(prefix)
+    after = typed[:-1] + chr(ord(typed[-1]) + 1)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT id, title, MIN(tier) AS tier FROM ("
+            f" SELECT * FROM (SELECT id, title, 0 AS tier FROM {movie}"
+            f" WHERE lower(title) >= %s AND lower(title) < %s ORDER BY lower(title) LIMIT %s)"
+            f" UNION ALL SELECT * FROM (SELECT rowid, title, 1 FROM {SEARCH_TABLE}"
+            f" WHERE {SEARCH_TABLE} MATCH %s LIMIT %s)"
+            f") GROUP BY id ORDER BY tier, length(title), title LIMIT %s",
+            [typed, after, AUTOCOMPLETE_CANDIDATES,
+             f"title : ({expression})", AUTOCOMPLETE_CANDIDATES, limit],
+        )
+        return [{"id": movie_id, "title": title} for movie_id, title, _ in cursor.fetchall()]
+
+
+def export_movies_ndjson(chunk_size: int = 2000) -> Iterator[bytes]:
+    """Stream the catalog as JSON Lines in the shape the importers read."""
+    for movie in Movie.objects.order_by("id").values(*MOVIE_FIELDS).iterator(chunk_size=chunk_size):
+        yield json.dumps(movie, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+XML_RECORD_TAG = "movie"
+XML_RECORD_START = re.compile(rb"<%s[\s>/]" % XML_RECORD_TAG.encode())
+# Element names used by data/download_movies.py for Movie fields
+XML_FIELD_ALIASES = {"countries": "country", "year": "release_year"}
+
+
+def _xml_movie_row(elem: ET.Element) -> dict[str, Any]:
+    """Flatten a <movie> element; children that are not Movie fields end up in extra_data."""
+    row: dict[str, Any] = {}
+    extra_data: dict[str, Any] = {}
+    for child in elem:
+        if len(child):
+            value = [(item.text or "").strip() for item in child]
+        else:
+            value = (child.text or "").strip()
+        field = XML_FIELD_ALIASES.get(child.tag, child.tag)
+        if field in MOVIE_FIELDS:
+            row[field] = value
+        else:
+            extra_data[field] = value
+    if extra_data:
+        stored = _parse_structured(row.get("extra_data") or {})
+        row["extra_data"] = {**stored, **extra_data} if isinstance(stored, dict) else stored
+    return row
+
+
+def iter_xml_movies(file: IO[bytes]) -> Iterator[dict[str, Any]]:
+    """
+    Stream <movie> records with iterparse, clearing every element once it
+    has been read so memory stays constant however large the document is.
+    """
+    root = None
+    try:
+        for event, elem in ET.iterparse(file, events=("start", "end")):
+            if root is None:
+                root = elem
+            elif event == "end" and elem.tag == XML_RECORD_TAG:
+                yield _xml_movie_row(elem)
+                root.clear()
+    except ET.ParseError as e:
+        raise ValidationError(f"Invalid XML: {e}")
+
+
+def iter_xml_records(data: bytes) -> Iterator[Tuple[int, Any]]:
+    """<movie> records of an XML chunk with the line each one starts on;
+    records are the root's children, so no other <movie> tag occurs."""
+    lines = []
+    line = 1
+    position = 0
+    for match in XML_RECORD_START.finditer(data):
+        line += data.count(b"\n", position, match.start())
+        position = match.start()
+        lines.append(line)
+    return zip(lines, iter_xml_movies(io.BytesIO(b"<movies>" + data + b"</movies>")))
+
+
+def parse_xml(
+        file: IO[bytes],
+        batch_size: int | None = None,
+        cache: MovieLookupCache | None = None
+) -> ImportStats:
+    return bulk_upsert_movies(iter_xml_movies(file), batch_size, cache)
+
+
+# Leading bytes of the compressed formats accepted for uploads
+COMPRESSION_MAGIC = {"gzip": b"\x1f\x8b", "zstd": b"\x28\xb5\x2f\xfd"}
+# Chunks only live until they are imported, so they favour speed over ratio
+CHUNK_COMPRESSION_LEVEL = {"gzip": 1, "zstd": 3}
+
+
+def detect_compression(head: bytes) -> str:
+    """The compression of data starting with `head`, "" when it is not compressed."""
+    for compression, magic in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return compression
+    return ""
+
+
+def _zstandard() -> Any:
+    if zstandard is None:
+        raise ValidationError("zstd-compressed files need the zstandard package.")
+    return zstandard
+
+
+def open_decompressed(file: IO[bytes]) -> IO[bytes]:
+    """
+    The contents of a seekable binary file, decompressed as they are read
+    when the file is gzip or zstd compressed (told apart by their magic
+    bytes, not by name), the file itself otherwise.
+    """
+    compression = detect_compression(file.read(4))
+    file.seek(0)
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=file, mode="rb")
+    if compression == "zstd":
+        reader = _zstandard().ZstdDecompressor().stream_reader(file, read_across_frames=True)
+        return io.BufferedReader(reader)
+    return file
+
+
+def decompressobj(compression: str) -> Any:
+    """An incremental decompressor: `decompress(data)` returns the output so far."""
+    if compression == "gzip":
+        return zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    return _zstandard().ZstdDecompressor().decompressobj()
+
+
+def compress(data: bytes, compression: str) -> bytes:
+    level = CHUNK_COMPRESSION_LEVEL[compression]
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    return _zstandard().ZstdCompressor(level=level).compress(data)
+
+
+def decompress(data: bytes, compression: str) -> bytes:
+    if compression == "gzip":
+        return gzip.decompress(data)
+    return _zstandard().ZstdDecompressor().decompress(data)
+
+
+# Binary movie chunks, written by the splitter out of validated rows so that
+# chunk workers neither parse text nor validate again. Little-endian:
+#   chunk:  magic, lines (uint32), genre count (uint32), genres, records
+#   genre:  length (uint16) + JSON of the name, referenced by position
+#   record: RECORD_HEADER, then title, country, genre ids (uint32 each)
+#           and extra_data as JSON; a rejected row keeps {"reason",
+#           "record"} in place of extra_data.
+BINARY_CHUNK_MAGIC = b"MVC1"
+BINARY_CHUNK_HEADER = struct.Struct("<4sII")
+GENRE_HEADER = struct.Struct("<H")
+# line, flags, release_year, title length, country length, genre count, extra length
+RECORD_HEADER = struct.Struct("<IBhHHHI")
+HAS_COUNTRY = 1
+HAS_RELEASE_YEAR = 2
+REJECTED = 4
+# Largest genre name, and genre count, the uint16 fields can hold
+MAX_PACKED_LENGTH = 0xFFFF
+
+
+def encode_movie_chunk(records: Iterable[Tuple[int, Any]], lines: int = 0) -> bytes:
+    """
+    Validate a chunk's (line, row) records with validate_movie_rows and
+    encode them as a binary movie chunk; `lines` is the number of lines
+    of the source text the chunk was cut from.
+    """
+    genre_ids: dict[str, int] = {}
+    body = []
+    rejects = ChunkRejects()
+    rows = validate_movie_rows(records, rejects)
+    while True:
+        reject_count = len(rejects.rows)
+        values = next(rows, None)
+        # Rows rejected on the way to this one, in line order
+        for reject in rejects.rows[reject_count:]:
+            body.append(_encode_reject(reject))
+        if values is None:
+            break
+        try:
+            extra = json.dumps(values["extra_data"], separators=(",", ":")).encode() if values["extra_data"] else b""
+            genre_names = [json.dumps(genre) for genre in values["genres"]]
+        except (TypeError, ValueError):
+            body.append(_encode_reject({"line": rejects.valid_lines[-1],
+                                        "reason": "Extra data and genres must be JSON values.",
+                                        "record": None}))
+            continue
+        # The lengths are packed as uint16, which struct would refuse with an error
+        if len(genre_names) > MAX_PACKED_LENGTH or any(
+                len(name.encode()) > MAX_PACKED_LENGTH for name in genre_names):
+            body.append(_encode_reject({"line": rejects.valid_lines[-1],
+                                        "reason": f"Too many genres, or a genre longer than "
+                                                  f"{MAX_PACKED_LENGTH} bytes.",
+                                        "record": None}))
+            continue
+        genres = [genre_ids.setdefault(name, len(genre_ids)) for name in genre_names]
+        title = values["title"].encode()
+        country = values["country"].encode() if values["country"] is not None else b""
+        flags = (HAS_COUNTRY if values["country"] is not None else 0) | (
+            HAS_RELEASE_YEAR if values["release_year"] is not None else 0)
+        body.append(RECORD_HEADER.pack(
+            rejects.valid_lines[-1], flags, values["release_year"] or 0,
+            len(title), len(country), len(genres), len(extra),
+        ))
+        body.extend((title, country, struct.pack(f"<{len(genres)}I", *genres), extra))
+
+    table = []
+    for genre in genre_ids:
+        encoded = genre.encode()
+        table.extend((GENRE_HEADER.pack(len(encoded)), encoded))
+    return b"".join([BINARY_CHUNK_HEADER.pack(BINARY_CHUNK_MAGIC, lines, len(genre_ids)), *table, *body])
+
+
+def _encode_reject(reject: dict[str, Any]) -> bytes:
+    detail = json.dumps({"reason": reject["reason"], "record": reject["record"]}, default=str).encode()
+    return RECORD_HEADER.pack(reject["line"], REJECTED, 0, 0, 0, 0, len(detail)) + detail
+
+
+def decode_movie_chunk(data: bytes, rejects: ChunkRejects) -> Iterator[dict[str, Any]]:
+    """
+    The cleaned rows of a binary movie chunk, ready for the writers;
+    rejected rows go to `rejects` as validate_movie_rows would set them
+    aside.
+    """
+    magic, rejects.lines, genre_count = BINARY_CHUNK_HEADER.unpack_from(data)
+    if magic != BINARY_CHUNK_MAGIC:
+        raise ValidationError("Not a binary movie chunk.")
+    offset = BINARY_CHUNK_HEADER.size
+    genres = []
+    for _ in range(genre_count):
+        (size,) = GENRE_HEADER.unpack_from(data, offset)
+        offset += GENRE_HEADER.size
+        genres.append(json.loads(data[offset:offset + size]))
+        offset += size
+
+    # json.loads would sniff the encoding of every value's bytes first
+    decode_json = json.JSONDecoder().raw_decode
+    unpack_record = RECORD_HEADER.unpack_from
+    record_size = RECORD_HEADER.size
+    end = len(data)
+    while offset < end:
+        line, flags, release_year, title_size, country_size, genre_size, extra_size = unpack_record(data, offset)
+        offset += record_size
+        if flags & REJECTED:
+            detail = json.loads(data[offset:offset + extra_size])
+            rejects.rows.append({"line": line, **detail})
+            offset += extra_size
+            continue
+        title = data[offset:offset + title_size].decode()
+        offset += title_size
+        country = data[offset:offset + country_size].decode() if flags & HAS_COUNTRY else None
+        offset += country_size
+        genre_ids = struct.unpack_from(f"<{genre_size}I", data, offset)
+        offset += 4 * genre_size
+        extra_data = decode_json(data[offset:offset + extra_size].decode())[0] if extra_size else {}
+        offset += extra_size
+        rejects.valid_lines.append(line)
+        yield {
+            "title": title,
+            "genres": [genres[i] for i in genre_ids],
+            "country": country,
+            "extra_data": extra_data,
+            "release_year": release_year if flags & HAS_RELEASE_YEAR else None,
+        }
 
 
 class FileProcessor:
-    def process(self, file_name: str, file_type: str) -> int:
+    def process(self, file_name: str, file_type: str) -> ImportStats:
         # Check if the file exists in the default storage
         if default_storage.exists(file_name):
             # Open the file directly from storage
-            with default_storage.open(file_name, "r") as file:
+            with default_storage.open(file_name, "rb") as stored_file:
+                file = open_decompressed(stored_file)
                 if file_type == "text/csv":
-                    movies_processed = parse_csv(file)
+                    stats = parse_csv(io.TextIOWrapper(file, encoding="utf-8", newline=""))
                 elif file_type == "application/json":
-                    movies_processed = parse_json(file)
+                    stats = parse_json(file)
+                elif file_type == "application/x-ndjson":
+                    stats = parse_ndjson(file)
+                elif file_type == "application/xml":
+                    stats = parse_xml(file)
                 else:
                     raise ValidationError("Invalid file type")
-                return movies_processed
+                return stats
         else:
             raise ValidationError("File does not exist in storage.")
 
+def create_ingestion_job(
+        file_name: str,
+        file_type: str,
+        mode: str = IngestionJob.Mode.DIRECT,
+        size: int | None = None
+) -> IngestionJob:
+    return IngestionJob.objects.create(file_name=file_name, file_type=file_type, mode=mode, size=size)
+
+def is_staged_job(job_id: int) -> bool:
+    return IngestionJob.objects.filter(id=job_id, mode=IngestionJob.Mode.STAGED).exists()
+
+def start_ingestion_job(job_id: int) -> None:
+    IngestionJob.objects.filter(id=job_id).update(
+        status=IngestionJob.Status.SPLITTING, started_at=timezone.now()
+    )
+
+def record_ingestion_chunks(job_id: int, ranges: list[Tuple[int, int, int]]) -> None:
+    """Store the (start, end, first line) of the chunks a job was split
+    into and move it on to processing. A first line of 0 is unknown."""
+    IngestionChunk.objects.bulk_create(
+        IngestionChunk(job_id=job_id, index=index, start=start, end=end, line=line or None)
+        for index, (start, end, line) in enumerate(ranges)
+    )
+    IngestionJob.objects.filter(id=job_id).update(status=IngestionJob.Status.PROCESSING)
+
+def start_ingestion_chunk(job_id: int, index: int) -> None:
+    IngestionChunk.objects.filter(job_id=job_id, index=index).update(
+        status=IngestionChunk.Status.RUNNING, started_at=timezone.now()
+    )
+
+def finish_ingestion_chunk(
+        job_id: int,
+        index: int,
+        stats: ImportStats,
+        rejects: ChunkRejects | None = None
+) -> None:
+    rejects = rejects or ChunkRejects()
+    if rejects.rows:
+        name = _chunk_rejects_name(job_id, index)
+        if default_storage.exists(name):  # left by an earlier attempt
+            default_storage.delete(name)
+        default_storage.save(name, ContentFile(b"".join(_ndjson_line(row) for row in rejects.rows)))
+    IngestionChunk.objects.filter(job_id=job_id, index=index).update(
+        status=IngestionChunk.Status.COMPLETED,
+        rows_created=stats.created,
+        rows_updated=stats.updated,
+        rows_unchanged=stats.unchanged,
+        rows_staged=stats.staged,
+        rows_rejected=stats.rejected,
+        lines=rejects.lines,
+        finished_at=timezone.now(),
+    )
+
+def fail_ingestion_chunk(job_id: int, index: int, error: str) -> None:
+    IngestionChunk.objects.filter(job_id=job_id, index=index).update(
+        status=IngestionChunk.Status.FAILED, error=error, finished_at=timezone.now()
+    )
+    fail_ingestion_job(job_id, f"Chunk {index} failed: {error}")
+
+def fail_ingestion_job(job_id: int, error: str) -> None:
+    IngestionJob.objects.filter(id=job_id).exclude(status=IngestionJob.Status.FAILED).update(
+        status=IngestionJob.Status.FAILED, error=error, finished_at=timezone.now()
+    )
+
+def finish_ingestion_job(job_id: int, stats: ImportStats) -> dict[str, Any]:
+    """
+    Wrap up a job once all of its chunks have been processed: merge a
+    staged job, collect the rejected rows, run post_process_ingestion and
+    record the totals. Returns the job's counts and timings.
+    """
+    # The status filters make every transition happen exactly once
+    jobs = IngestionJob.objects.filter(id=job_id, status=IngestionJob.Status.PROCESSING)
+    if jobs.filter(mode=IngestionJob.Mode.STAGED).update(status=IngestionJob.Status.MERGING):
+        try:
+            merged = merge_staged_movies(job_id)
+        except Exception as e:
+            discard_staged_movies(job_id)
+            fail_ingestion_job(job_id, f"Merge failed: {e}")
+            raise
+        stats = ImportStats(created=merged.created, updated=merged.updated,
+                            unchanged=merged.unchanged, rejected=stats.rejected)
+    elif not jobs.update(status=IngestionJob.Status.FINALISING):
+        return ingestion_job_summary(job_id)
+
+    collect_rejects(job_id)
+    post_process_ingestion(stats)
+    IngestionJob.objects.filter(id=job_id).update(
+        status=IngestionJob.Status.COMPLETED,
+        finished_at=timezone.now(),
+        rows_created=stats.created,
+        rows_updated=stats.updated,
+        rows_unchanged=stats.unchanged,
+        rows_rejected=stats.rejected,
+    )
+    return ingestion_job_summary(job_id)
+
+def discard_staged_movies(job_id: int) -> None:
+    MovieStaging.objects.filter(job_id=job_id).delete()
+
+def ingestion_job_summary(job_id: int) -> dict[str, Any]:
+    """Totals and timings of a finished job, including its chunks' durations."""
+    job = IngestionJob.objects.get(id=job_id)
+    durations = [
+        (chunk.finished_at - chunk.started_at).total_seconds()
+        for chunk in job.chunks.all()
+        if chunk.started_at and chunk.finished_at
+    ]
+    elapsed = 0.0
+    if job.started_at and job.finished_at:
+        elapsed = (job.finished_at - job.started_at).total_seconds()
+    rows = job.rows_created + job.rows_updated + job.rows_unchanged
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "rows_created": job.rows_created,
+        "rows_updated": job.rows_updated,
+        "rows_unchanged": job.rows_unchanged,
+        "rows_rejected": job.rows_rejected,
+        "elapsed_seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed else 0.0,
+        "chunk_seconds_mean": sum(durations) / len(durations) if durations else 0.0,
+        "chunk_seconds_max": max(durations, default=0.0),
+    }
+
+def post_process_ingestion(stats: ImportStats) -> None:
+    """
+    Work done once per import rather than per chunk. Worker lookup caches
+    need no call: lookup_cache drops a shared cache whenever another job
+    has finished since it was filled. After a large import the planner
+    statistics of the movie table are refreshed, so that queries use its
+    indexes the way its new size calls for.
+    """
+    if stats.created + stats.updated >= settings.MOVIE_ANALYZE_AFTER_ROWS:
+        analyze_movie_table()
+
+def analyze_movie_table() -> None:
+    table = connection.ops.quote_name(Movie._meta.db_table)
+    statement = "ANALYZE TABLE %s" if connection.vendor == "mysql" else "ANALYZE %s"
+    with connection.cursor() as cursor:
+        cursor.execute(statement % table)
+
+def last_ingestion_finished_at() -> datetime | None:
+    """When the most recent job finished; shared lookup caches older than that may be stale."""
+    return IngestionJob.objects.aggregate(last=Max("finished_at"))["last"]
+
+REJECTS_DIR = "rejects"
+
+def _chunk_rejects_name(job_id: int, index: int) -> str:
+    return f"{REJECTS_DIR}/{job_id}/{index:05d}.ndjson"
+
+def _ndjson_line(row: dict[str, Any]) -> bytes:
+    return json.dumps(row, ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+
+def collect_rejects(job_id: int) -> str:
+    """
+    Join the rejected rows the chunks of a finished job set aside into one
+    JSON Lines report, numbered by line in the uploaded file, and record
+    it on the job. Returns the report's name, "" when every row was valid.
+    """
+    chunks = list(IngestionChunk.objects.filter(job_id=job_id))
+    names = [_chunk_rejects_name(job_id, chunk.index) for chunk in chunks if chunk.rows_rejected]
+    if not names:
+        return ""
+
+    def chunk_rejects() -> Iterator[ChunkRejects]:
+        for chunk in chunks:
+            rows = []
+            if chunk.rows_rejected:
+                with default_storage.open(_chunk_rejects_name(job_id, chunk.index), "rb") as file:
+                    rows = [json.loads(line) for line in file]
+            yield ChunkRejects(chunk.line or 0, chunk.lines, rows)
+
+    report = (_ndjson_line(row) for row in resolve_reject_lines(chunk_rejects()))
+    file_name = f"{REJECTS_DIR}/{job_id}.ndjson"
+    with IterableReader(report) as reader:
+        file_name = default_storage.save(file_name, File(reader, name=file_name))
+    for name in names:
+        default_storage.delete(name)
+    IngestionJob.objects.filter(id=job_id).update(rejects_file=file_name)
+    return file_name
+
+def measured_row_cost(sample_size: int = 100) -> float | None:
+    """Average seconds per row over the most recently completed chunks."""
+    chunks = IngestionChunk.objects.filter(
+        status=IngestionChunk.Status.COMPLETED, started_at__isnull=False
+    ).order_by("-finished_at")[:sample_size]
+    seconds = 0.0
+    rows = 0
+    for chunk in chunks:
+        seconds += (chunk.finished_at - chunk.started_at).total_seconds()
+        rows += chunk.rows_created + chunk.rows_updated + chunk.rows_unchanged + chunk.rows_staged
+    if not rows or not seconds:
+        return None
+    return seconds / rows
+
+ACTIVE_JOB_STATUSES = (
+    IngestionJob.Status.PENDING,
+    IngestionJob.Status.SPLITTING,
+    IngestionJob.Status.PROCESSING,
+    IngestionJob.Status.MERGING,
+    IngestionJob.Status.FINALISING,
+)
+
+def pending_ingestion_work() -> list[int]:
+    """
+    Bytes still to be ingested by each unfinished job: its size, less the
+    share of its chunks that are done. Jobs showing no progress for
+    MOVIE_INGEST_STALE_SECONDS, whose enqueueing or worker was lost, no
+    longer count.
+    """
+    stale_before = timezone.now() - timedelta(seconds=settings.MOVIE_INGEST_STALE_SECONDS)
+    jobs = IngestionJob.objects.filter(status__in=ACTIVE_JOB_STATUSES).annotate(
+        chunk_count=Count("chunks"),
+        chunks_done=Count("chunks", filter=Q(chunks__status=IngestionChunk.Status.COMPLETED)),
+        last_activity=Greatest(
+            "created_at",
+            Coalesce("started_at", "created_at"),
+            Coalesce(Max("chunks__started_at"), "created_at"),
+            Coalesce(Max("chunks__finished_at"), "created_at"),
+        ),
+    ).filter(last_activity__gte=stale_before).values_list("size", "chunk_count", "chunks_done")
+    pending = []
+    for size, chunk_count, chunks_done in jobs:
+        size = size or 0
+        if chunk_count:
+            size -= size * chunks_done // chunk_count
+        pending.append(size)
+    return pending
+
+def measured_ingestion_throughput(sample_size: int = 20) -> float:
+    """
+    Bytes per second over the most recently completed jobs, from their
+    start to their end, or MOVIE_INGEST_BYTES_PER_SECOND before any job
+    has been measured. Jobs that overlapped make it an underestimate.
+    """
+    jobs = IngestionJob.objects.filter(
+        status=IngestionJob.Status.COMPLETED, size__isnull=False, started_at__isnull=False
+    ).order_by("-finished_at").values_list("size", "started_at", "finished_at")[:sample_size]
+    size = 0
+    seconds = 0.0
+    for job_size, started_at, finished_at in jobs:
+        size += job_size
+        seconds += (finished_at - started_at).total_seconds()
+    if not size or not seconds:
+        return settings.MOVIE_INGEST_BYTES_PER_SECOND
+    return size / seconds
+
+def admit_ingestion(size: int) -> None:
+    """
+    Admission control for a new ingestion job of `size` bytes: refuse it
+    with Throttled (429 and a Retry-After estimate) while the unfinished
+    jobs already hold MOVIE_INGEST_MAX_PENDING_JOBS slots or would exceed
+    MOVIE_INGEST_MAX_PENDING_BYTES with it. A job is always admitted when
+    nothing else is pending, however large.
+    """
+    pending = pending_ingestion_work()
+    if not pending:
+        return
+    excess = sum(pending) + size - settings.MOVIE_INGEST_MAX_PENDING_BYTES
+    if len(pending) >= settings.MOVIE_INGEST_MAX_PENDING_JOBS:
+        # A slot frees up once the job closest to the end is done
+        excess = max(excess, min(pending))
+    if excess <= 0:
+        return
+    wait = max(1, math.ceil(excess / measured_ingestion_throughput()))
+    raise Throttled(wait, f"Too much ingestion work is pending, retry in {wait} seconds.")
+
+def ingestion_job_status(job_id: int) -> dict[str, Any]:
+    """
+    Job state plus throughput figures. Progress is measured in bytes, the
+    only total known before every chunk has been parsed, so the ETA
+    extrapolates the byte rate of the completed chunks.
+    """
+    job = get_object_or_404(IngestionJob, id=job_id)
+    chunks = list(job.chunks.all())
+    completed = [chunk for chunk in chunks if chunk.status == IngestionChunk.Status.COMPLETED]
+    fields = ("rows_created", "rows_updated", "rows_unchanged", "rows_rejected")
+    if job.status == IngestionJob.Status.COMPLETED:
+        # The totals recorded by finish_ingestion_job
+        totals = {field: getattr(job, field) for field in fields}
+        staged = 0
+    else:
+        totals = {field: sum(getattr(chunk, field) for chunk in completed) for field in fields}
+        staged = sum(chunk.rows_staged for chunk in completed)
+    rows_processed = totals["rows_created"] + totals["rows_updated"] + totals["rows_unchanged"] + staged
+    total_bytes = sum(chunk.end - chunk.start for chunk in chunks)
+    processed_bytes = sum(chunk.end - chunk.start for chunk in completed)
+
+    elapsed = 0.0
+    if job.started_at:
+        elapsed = ((job.finished_at or timezone.now()) - job.started_at).total_seconds()
+    eta = None
+    if job.status == IngestionJob.Status.COMPLETED:
+        eta = 0.0
+    elif job.status == IngestionJob.Status.PROCESSING and processed_bytes:
+        eta = elapsed * (total_bytes - processed_bytes) / processed_bytes
+
+    return {
+        **IngestionJobSerializer(job).data,
+        "chunks_total": len(chunks),
+        "chunks_completed": len(completed),
+        "rows_processed": rows_processed,
+        **totals,
+        "rows_per_second": rows_processed / elapsed if elapsed else 0.0,
+        "bytes_total": total_bytes,
+        "bytes_processed": processed_bytes,
+        "elapsed_seconds": elapsed,
+        "eta_seconds": eta,
+        "chunks": IngestionChunkSerializer(chunks, many=True).data,
+    }
+
+UPLOAD_PARTS_DIR = "upload-parts"
+
+
+class IterableReader(io.RawIOBase):
+    """A readable stream over an iterable of byte strings, so generated or
+    concatenated content can be handed to Storage.save without being
+    joined in memory first."""
+
+    def __init__(self, blocks: Iterable[bytes]) -> None:
+        super().__init__()
+        self._blocks = iter(blocks)
+        self._block = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        while not self._block:
+            block = next(self._blocks, None)
+            if block is None:
+                return 0
+            self._block = memoryview(block)
+        size = min(len(buffer), len(self._block))
+        buffer[:size] = self._block[:size]
+        self._block = self._block[size:]
+        return size
+
+STORAGE_READ_SIZE = 1024 * 1024
+
+def read_stored_files(names: Iterable[str], storage: Storage = default_storage) -> Iterator[bytes]:
+    """The contents of stored files one after the other, in blocks."""
+    for name in names:
+        with storage.open(name, "rb") as file:
+            while block := file.read(STORAGE_READ_SIZE):
+                yield block
+
+def create_upload_session(data: dict[str, Any]) -> UploadSession:
+    return UploadSession.objects.create(**data)
+
+def _open_upload_session(upload_id: int) -> UploadSession:
+    session = get_object_or_404(UploadSession, id=upload_id)
+    if session.status != UploadSession.Status.OPEN:
+        raise ValidationError(f"Upload is {session.status} and no longer accepts changes.")
+    return session
+
+def save_upload_part(
+        upload_id: int,
+        number: int,
+        content: IO[bytes],
+        expected_size: int | None = None
+) -> UploadPart:
+    """
+    Store part `number` of an upload, replacing any earlier copy so that
+    an interrupted PUT can simply be sent again. A part shorter than
+    `expected_size` (the request's Content-Length) is discarded.
+    """
+    if number < 1:
+        raise ValidationError("Part numbers start at 1.")
+    session = _open_upload_session(upload_id)
+    name = f"{UPLOAD_PARTS_DIR}/{session.id}/{number:05d}"
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    # The request body is not a file: storages probing it for seek() (as
+    # S3Storage does) get a reader that says it cannot seek
+    with IterableReader(iter(lambda: content.read(STORAGE_READ_SIZE), b"")) as reader:
+        name = default_storage.save(name, File(reader, name=name))
+    size = default_storage.size(name)
+    if expected_size is not None and size != expected_size:
+        default_storage.delete(name)
+        raise ValidationError(f"Received {size} of {expected_size} bytes of part {number}.")
+    part, _ = UploadPart.objects.update_or_create(
+        session=session, number=number, defaults={"file_name": name, "size": size}
+    )
+    return part
+
+def upload_session_status(upload_id: int) -> dict[str, Any]:
+    session = get_object_or_404(UploadSession, id=upload_id)
+    parts = list(session.parts.all())
+    return {
+        **UploadSessionSerializer(session).data,
+        "parts": [{"number": part.number, "size": part.size} for part in parts],
+        "bytes_received": sum(part.size for part in parts),
+    }
+
+def complete_upload_session(upload_id: int) -> UploadSession:
+    """
+    Check that parts 1..N are all present (and add up to the announced
+    size), then create the IngestionJob the assembled file will feed once
+    admit_ingestion lets it in. The caller enqueues the assembly itself.
+    """
+    session = _open_upload_session(upload_id)
+    sizes = dict(session.parts.values_list("number", "size"))
+    if not sizes:
+        raise ValidationError("Upload has no parts.")
+    missing = sorted(set(range(1, max(sizes) + 1)) - set(sizes))
+    if missing:
+        raise ValidationError({"missing_parts": missing})
+    if session.size is not None and sum(sizes.values()) != session.size:
+        raise ValidationError(f"Received {sum(sizes.values())} of {session.size} bytes.")
+
+    admit_ingestion(sum(sizes.values()))
+    session.job = create_ingestion_job(session.file_name, session.file_type, session.mode,
+                                       sum(sizes.values()))
+    session.status = UploadSession.Status.ASSEMBLING
+    session.save(update_fields=["job", "status"])
+    return session
+
+def fail_upload_session(session: UploadSession, error: str) -> None:
+    """Fail a completed upload and the job it was to feed."""
+    session.status = UploadSession.Status.FAILED
+    session.error = error
+    session.save(update_fields=["status", "error"])
+    fail_ingestion_job(session.job_id, error)
+
+def assemble_upload(upload_id: int) -> str:
+    """Concatenate the parts of a completed upload into a new file in
+    storage, delete the parts and return the file's name."""
+    session = UploadSession.objects.get(id=upload_id)
+    part_names = list(session.parts.values_list("file_name", flat=True))
+    file_name = f"{uuid.uuid4()}{os.path.splitext(session.file_name)[1]}"
+    try:
+        with IterableReader(read_stored_files(part_names)) as reader:
+            file_name = default_storage.save(file_name, File(reader, name=file_name))
+    except Exception as exc:
+        fail_upload_session(session, f"Assembling the upload failed: {exc}")
+        raise
+
+    for name in part_names:
+        default_storage.delete(name)
+    IngestionJob.objects.filter(id=session.job_id).update(file_name=file_name)
+    session.status = UploadSession.Status.COMPLETED
+    session.completed_at = timezone.now()
+    session.save(update_fields=["status", "completed_at"])
+    return file_name
+
+def abort_upload_session(upload_id: int) -> None:
+    session = _open_upload_session(upload_id)
+    for name in session.parts.values_list("file_name", flat=True):
+        default_storage.delete(name)
+    session.delete()
+
 def create_or_update_movie(
         title: str,
         genres: list,
@@ -148,14 +1742,14 @@ def create_or_update_movie(
 
         movie, created = Movie.objects.update_or_create(
                 title=title,
+                country=country,
+                release_year=release_year,
                 defaults={
                     "genres": genres,
-                    "country": country,
                     "extra_data": extra_data,
-                    "release_year": release_year
                 }
             )
+        link_movie_catalog([(movie.id, movie.__dict__)], created)
         return movie, created
     except Exception as e:
         raise ValidationError(f"Failed to create or update the movie: {str(e)}")
-
@@ -1,125 +1,681 @@
-import json
-from typing import Any
+import io
+import math
+from datetime import datetime
+from typing import Any, Callable, IO, Iterator, NamedTuple
+from xml.parsers import expat
 
-from celery import Celery, shared_task, chain, group
+from celery import Celery, shared_task, chain, chord
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
-from django.core.files.storage import default_storage
+from django.core.files.storage import Storage, default_storage
+from django.db import OperationalError
+from rest_framework import exceptions
 
-from movies.services import FileProcessor, parse_csv, parse_json
+from movies.models import UploadSession
+from movies.services import (
+    FileProcessor,
+    ImportStats,
+    MovieLookupCache,
+    XML_RECORD_START,
+    XML_RECORD_TAG,
+    ChunkRejects,
+    assemble_upload,
+    compress,
+    decode_movie_chunk,
+    decompress,
+    decompressobj,
+    detect_compression,
+    discard_staged_movies,
+    encode_movie_chunk,
+    fail_ingestion_chunk,
+    fail_ingestion_job,
+    finish_ingestion_chunk,
+    finish_ingestion_job,
+    bulk_upsert_movies,
+    is_staged_job,
+    last_ingestion_finished_at,
+    iter_csv_records,
+    iter_json_array_spans,
+    iter_json_records,
+    iter_ndjson_records,
+    iter_xml_records,
+    measured_row_cost,
+    open_decompressed,
+    post_process_ingestion,
+    record_ingestion_chunks,
+    stage_movies,
+    start_ingestion_chunk,
+    start_ingestion_job,
+    validate_movie_rows,
+)
+
+
+_worker_lookup_cache: MovieLookupCache | None = None
+# When the last ingestion job had finished as _worker_lookup_cache was created
+_worker_lookup_cache_since: datetime | None = None
+
+
+class FileChunk(NamedTuple):
+    """A byte range [start, end) of a stored upload holding whole records.
+    CSV chunks carry the file's header line so they can be parsed alone.
+    Chunks of a compressed upload are stored as objects of their own,
+    compressed with `compression`; start and end are then offsets in the
+    decompressed upload. Chunks in the "binary" `format` are objects of
+    their own as well, see encode_movie_chunk. `line` is the line the
+    chunk starts on, 0 when the splitter did not count lines."""
+    file_name: str
+    start: int
+    end: int
+    header: str = ""
+    compression: str = ""
+    line: int = 0
+    format: str = ""
+
+    @property
+    def is_chunk_file(self) -> bool:
+        """Whether the chunk is an object of its own, to delete once imported."""
+        return bool(self.compression or self.format)
 
 
 @shared_task
-def process_file(file_name: str, file_type: str) -> int:
+def process_file(
+        file_name: str,
+        file_type: str,
+        job_id: int | None = None,
+        rows_per_chunk: int | None = None
+) -> str:
     """Orchestrates the splitting and parallel processing of
-    file chunks."""
+    file chunks. Progress is recorded on the IngestionJob `job_id`.
+    Returns the id of the workflow, which ends in finalise_ingestion."""
     if not default_storage.exists(file_name):
+        if job_id is not None:
+            fail_ingestion_job(job_id, "File does not exist in storage.")
         raise ValidationError("File does not exist in storage.")
     # Chain split_file_task with the processing of chunks
     workflow = chain(
-        split_file_task.s(file_name, file_type),
-        process_chunks.s(file_type)
+        split_file_task.s(file_name, file_type, job_id, rows_per_chunk),
+        process_chunks.s(file_type, job_id)
     )
     result = workflow.apply_async()
-    return result
+    return result.id
 
 @shared_task
-def process_chunks(chunk_paths: list, file_type: str) -> int:
-    """Task to handle processing of each chunk. This is called after the file has been split."""
-    # Create a group of tasks to process each chunk
-    task_group = group(
-        process_chunk.s(chunk_path, file_type) for chunk_path in chunk_paths
-    )
-    return (
-        task_group.apply_async()
-    )  # Apply group asynchronously and return the AsyncResult of the group
+def assemble_upload_task(upload_id: int) -> str:
+    """Join the parts of a completed resumable upload, then hand the file
+    to process_file under the IngestionJob created on completion."""
+    file_name = assemble_upload(upload_id)
+    session = UploadSession.objects.get(id=upload_id)
+    process_file(file_name, session.file_type, session.job_id, session.rows_per_chunk)
+    return file_name
 
 @shared_task
-def process_chunk(chunk_path: str, file_type: str) -> int:
-    """Processes a single file chunk."""
-    with default_storage.open(chunk_path, "r") as file:
-        if file_type == "text/csv":
-            result = parse_csv(file)
-        elif file_type == "application/json":
-            result = parse_json(file)
-        else:
-            raise ValidationError("Invalid file type")
-    return result
+def process_chunks(chunks: list, file_type: str, job_id: int | None = None) -> str:
+    """
+    Fan the chunks of a split file out as a chord: finalise_ingestion is
+    called back with every chunk's counts once the last one is done, so
+    nothing waits on a result. Returns the id of the callback's result.
+    """
+    chunk_files = [chunk.file_name for chunk in (FileChunk(*chunk) for chunk in chunks) if chunk.is_chunk_file]
+    callback = finalise_ingestion.s(job_id, chunk_files).on_error(abort_ingestion.si(job_id, chunk_files))
+    if not chunks:
+        return callback.delay([]).id
+    header = [process_chunk.s(chunk, file_type, job_id, index) for index, chunk in enumerate(chunks)]
+    return chord(header)(callback).id
+
+@shared_task
+def finalise_ingestion(
+        results: list[dict[str, int]],
+        job_id: int | None = None,
+        chunk_files: list[str] | None = None
+) -> dict[str, Any]:
+    """Chord callback of process_chunks: add up the chunks' counts, finish
+    the job and remove the chunk objects of a compressed upload."""
+    stats = sum((ImportStats(**result) for result in results), ImportStats())
+    try:
+        if job_id is None:
+            post_process_ingestion(stats)
+            return stats.as_dict()
+        return finish_ingestion_job(job_id, stats)
+    finally:
+        delete_chunk_files(chunk_files or [])
 
 @shared_task
-def split_file_task(file_name: str, file_type: str) -> list[str]:
+def abort_ingestion(job_id: int | None = None, chunk_files: list[str] | None = None) -> None:
+    """Error callback of the chord: the chunk that failed has already failed
+    the job; drop whatever the chunks left behind."""
+    delete_chunk_files(chunk_files or [])
+    if job_id is not None:
+        discard_staged_movies(job_id)
+        fail_ingestion_job(job_id, "A chunk failed.")
+
+def delete_chunk_files(chunk_files: list[str], storage: Storage = default_storage) -> None:
+    for name in chunk_files:
+        storage.delete(name)
+
+@shared_task(bind=True, acks_late=True, max_retries=settings.MOVIE_CHUNK_MAX_RETRIES)
+def process_chunk(
+        self,
+        chunk: list,
+        file_type: str,
+        job_id: int | None = None,
+        index: int = 0
+) -> dict[str, int]:
+    """Processes a single file chunk, returning the created / updated counts.
+    Rows failing validation or refused by the database are counted as
+    rejected and reported on the job. A chunk hitting a connection or
+    locking error is retried whole with backoff: batches it had already
+    written come out unchanged the second time, and rows staged twice are
+    collapsed by the merge."""
+    chunk = FileChunk(*chunk)
+    if job_id is not None:
+        start_ingestion_chunk(job_id, index)
+    rejects = ChunkRejects()
+    try:
+        staging_job_id = job_id if job_id is not None and is_staged_job(job_id) else None
+        stats = import_chunk(chunk, file_type, lookup_cache(), staging_job_id=staging_job_id,
+                             rejects=rejects)
+    except OperationalError as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=2 ** self.request.retries)
+        if job_id is not None:
+            fail_ingestion_chunk(job_id, index, str(e))
+        raise
+    except Exception as e:
+        if job_id is not None:
+            fail_ingestion_chunk(job_id, index, str(e))
+        raise
+    if job_id is not None:
+        finish_ingestion_chunk(job_id, index, stats, rejects)
+    return stats.as_dict()
+
+def import_chunk(
+        chunk: FileChunk,
+        file_type: str,
+        cache: MovieLookupCache | None = None,
+        storage: Storage = default_storage,
+        staging_job_id: int | None = None,
+        rejects: ChunkRejects | None = None
+) -> ImportStats:
+    """
+    Parse a chunk's records and upsert them into Movie, or append them
+    to MovieStaging for the staged job `staging_job_id`. Rows that fail
+    validation or that the database refuses are skipped and set aside in
+    `rejects`.
+    """
+    data = read_chunk(chunk, storage)
+    if rejects is None:
+        rejects = ChunkRejects()
+    rejects.first_line = chunk.line
+    if chunk.format == BINARY_CHUNK_FORMAT:
+        rows = decode_movie_chunk(data, rejects)
+    else:
+        rejects.lines = data.count(b"\n")
+        rows = validate_movie_rows(chunk_records(data, chunk.header, file_type), rejects)
+    if staging_job_id is not None:
+        stats = stage_movies(rows, staging_job_id, validated=True, rejects=rejects)
+    else:
+        stats = bulk_upsert_movies(rows, cache=cache, validated=True, rejects=rejects)
+    stats.rejected = len(rejects.rows)
+    return stats
+
+def chunk_records(data: bytes, header: str, file_type: str) -> Iterator[tuple[int, Any]]:
+    """(line, row) records of a chunk's data, with lines counted from the
+    start of the chunk, for validate_movie_rows."""
     if file_type == "text/csv":
-        result = split_csv_file(file_name)
+        return iter_csv_records(data, header)
     elif file_type == "application/json":
-        result = split_json_file(file_name)
+        return iter_json_records(data)
+    elif file_type == "application/x-ndjson":
+        return iter_ndjson_records(io.BytesIO(data))
+    elif file_type == "application/xml":
+        return iter_xml_records(data)
+    raise ValidationError("Invalid file type")
+
+def lookup_cache() -> MovieLookupCache:
+    """The natural-key cache for the next chunk: a fresh one per chunk, or
+    one shared by every chunk this worker process handles when
+    MOVIE_LOOKUP_CACHE_PER_WORKER is set. The shared one is dropped once
+    another ingestion job has finished, as it may have changed any movie."""
+    global _worker_lookup_cache, _worker_lookup_cache_since
+    size = settings.MOVIE_LOOKUP_CACHE_SIZE
+    if not settings.MOVIE_LOOKUP_CACHE_PER_WORKER:
+        return MovieLookupCache(size)
+    last_finished = last_ingestion_finished_at()
+    if _worker_lookup_cache is None or _worker_lookup_cache_since != last_finished:
+        _worker_lookup_cache = MovieLookupCache(size)
+        _worker_lookup_cache_since = last_finished
+    return _worker_lookup_cache
+
+def read_chunk(chunk: FileChunk, storage: Storage = default_storage) -> bytes:
+    """Read only the chunk's byte range from storage: a ranged GET on
+    S3-compatible storage, a seek everywhere else. Compressed chunk objects
+    are read whole and decompressed."""
+    if chunk.is_chunk_file:
+        with storage.open(chunk.file_name, "rb") as file:
+            data = file.read()
+        return decompress(data, chunk.compression) if chunk.compression else data
+    if chunk.end <= chunk.start:
+        return b""
+    bucket = getattr(storage, "bucket", None)
+    if bucket is not None:
+        from storages.utils import clean_name
+
+        key = storage._normalize_name(clean_name(chunk.file_name))
+        response = bucket.Object(key).get(Range=f"bytes={chunk.start}-{chunk.end - 1}")
+        return response["Body"].read()
+    with storage.open(chunk.file_name, "rb") as file:
+        file.seek(chunk.start)
+        return file.read(chunk.end - chunk.start)
+
+@shared_task
+def split_file_task(
+        file_name: str,
+        file_type: str,
+        job_id: int | None = None,
+        rows_per_chunk: int | None = None
+) -> list[FileChunk]:
+    if job_id is not None:
+        start_ingestion_job(job_id)
+    try:
+        result = split_file(file_name, file_type, rows_per_chunk=rows_per_chunk)
+    except Exception as e:
+        if job_id is not None:
+            fail_ingestion_job(job_id, str(e))
+        raise
+
+    if job_id is not None:
+        record_ingestion_chunks(job_id, [(chunk.start, chunk.end, chunk.line) for chunk in result])
+    return result
+
+# Chunks each worker should get, so the last ones finish close together
+CHUNKS_PER_WORKER = 4
+RECORD_SAMPLE_SIZE = 256 * 1024
+# Small reads keep the compressed size behind a sample accurate
+COMPRESSED_SAMPLE_READ_SIZE = 4 * 1024
+
+def plan_rows_per_chunk(
+        file_name: str,
+        file_type: str,
+        storage: Storage = default_storage,
+        workers: int | None = None
+) -> int:
+    """
+    Pick the number of records per chunk. Start from MOVIE_CHUNK_TARGET_ROWS,
+    shrink it until every worker gets CHUNKS_PER_WORKER chunks of the
+    (estimated) file, then clamp it so that, at the measured per-row cost,
+    a chunk runs between MOVIE_CHUNK_MIN_SECONDS and MOVIE_CHUNK_MAX_SECONDS.
+    """
+    workers = workers or settings.MOVIE_IMPORT_WORKERS
+    compression = stored_compression(file_name, storage)
+    if compression:
+        sample, consumed = _decompressed_sample(file_name, compression, storage)
+        estimated_size = storage.size(file_name) * len(sample) / max(consumed, 1)
+        estimated_rows = estimated_size / _record_size(sample, file_type)
+    else:
+        estimated_rows = storage.size(file_name) / _sample_record_size(file_name, file_type, storage)
+    row_cost = measured_row_cost() or settings.MOVIE_ROW_COST_SECONDS
+
+    rows = min(settings.MOVIE_CHUNK_TARGET_ROWS, math.ceil(estimated_rows / (workers * CHUNKS_PER_WORKER)))
+    rows = min(rows, math.floor(settings.MOVIE_CHUNK_MAX_SECONDS / row_cost))
+    rows = max(rows, math.ceil(settings.MOVIE_CHUNK_MIN_SECONDS / row_cost))
+    return max(rows, 1)
+
+def stored_compression(file_name: str, storage: Storage = default_storage) -> str:
+    """The compression of a stored upload, "" when it is a plain file."""
+    return detect_compression(read_chunk(FileChunk(file_name, 0, 4), storage))
+
+def _decompressed_sample(file_name: str, compression: str, storage: Storage) -> tuple[bytes, int]:
+    """The first RECORD_SAMPLE_SIZE bytes of a compressed upload once
+    decompressed, and the number of compressed bytes they came from."""
+    decompressor = decompressobj(compression)
+    sample = b""
+    consumed = 0
+    with storage.open(file_name, "rb") as file:
+        while len(sample) < RECORD_SAMPLE_SIZE and (block := file.read(COMPRESSED_SAMPLE_READ_SIZE)):
+            sample += decompressor.decompress(block)
+            consumed += len(block)
+    return sample, consumed
+
+def _sample_record_size(file_name: str, file_type: str, storage: Storage) -> float:
+    """Average record size in bytes over the beginning of the file."""
+    return _record_size(read_chunk(FileChunk(file_name, 0, RECORD_SAMPLE_SIZE), storage), file_type)
+
+def _record_size(sample: bytes, file_type: str) -> float:
+    if file_type == "text/csv":
+        records = sample.count(b"\n") - 1  # the header
+    elif file_type == "application/x-ndjson":
+        records = sample.count(b"\n")
+    elif file_type == "application/json":
+        records = 0
+        try:
+            for _ in iter_json_array_spans(io.BytesIO(sample)):
+                records += 1
+        except exceptions.ValidationError:
+            pass  # the sample ends in the middle of an object
+    elif file_type == "application/xml":
+        records = len(XML_RECORD_START.findall(sample))
     else:
         raise ValidationError("Invalid file type")
+    return len(sample) / records if records > 0 else max(len(sample), 1)
 
-    return result
+def split_file(
+        file_name: str,
+        file_type: str,
+        storage: Storage = default_storage,
+        rows_per_chunk: int | None = None,
+        workers: int | None = None
+) -> list[FileChunk]:
+    """Split a stored file into chunks of `rows_per_chunk` records, planned
+    with plan_rows_per_chunk unless given."""
+    if file_type not in ("text/csv", "application/json", "application/x-ndjson", "application/xml"):
+        raise ValidationError("Invalid file type")
+    rows_per_chunk = rows_per_chunk or plan_rows_per_chunk(file_name, file_type, storage, workers)
+    if settings.MOVIE_CHUNK_FORMAT == BINARY_CHUNK_FORMAT:
+        return split_binary_file(file_name, file_type, rows_per_chunk, storage)
+    compression = stored_compression(file_name, storage)
+    if compression:
+        return split_compressed_file(file_name, file_type, rows_per_chunk, compression, storage)
+    if file_type == "text/csv":
+        return split_csv_file(file_name, rows_per_chunk, storage)
+    elif file_type == "application/x-ndjson":
+        return split_ndjson_file(file_name, rows_per_chunk, storage)
+    elif file_type == "application/json":
+        return split_json_file(file_name, rows_per_chunk, storage)
+    return split_xml_file(file_name, rows_per_chunk, storage)
+
+def split_csv_file(
+        file_path: str,
+        rows_per_chunk: int,
+        storage: Storage = default_storage
+) -> list[FileChunk]:
+    """Scan a CSV upload and describe chunks of `rows_per_chunk` records
+    that start and end on record boundaries. Nothing is written back."""
+    with storage.open(file_path, "rb") as file:
+        return _stored_chunks(file_path, file, _csv_ranges, rows_per_chunk)
+
+def _stored_chunks(
+        file_path: str,
+        file: IO[bytes],
+        ranges: Callable[[IO[bytes], int], Iterator[tuple[int, int, str]]],
+        rows_per_chunk: int
+) -> list[FileChunk]:
+    """Chunks of the ranges a scanner finds in a stored file, with the
+    line each one starts on."""
+    stream = _RetainingReader(file)
+    chunks = []
+    for start, end, header in ranges(stream, rows_per_chunk):
+        line = stream.discard(start, end)
+        chunks.append(FileChunk(file_path, start, end, header, line=line))
+    return chunks
+
+def _csv_ranges(file: IO[bytes], rows_per_chunk: int) -> Iterator[tuple[int, int, str]]:
+    """(start, end, header) of consecutive chunks of `rows_per_chunk` CSV records."""
+    header = b""
+    offset = 0
+    chunk_start = None
+    chunk_rows = 0
+    in_quotes = False  # a quoted field spans the end of the current line
+
+    for line in file:
+        offset += len(line)
+        if line.count(b'"') % 2:
+            in_quotes = not in_quotes
+        if chunk_start is None:
+            # Still reading the header record
+            header += line
+            if not in_quotes:
+                chunk_start = offset
+            continue
+        if in_quotes:
+            continue
+        chunk_rows += 1
+        if chunk_rows >= rows_per_chunk:
+            yield chunk_start, offset, header.decode("utf-8-sig")
+            chunk_start = offset
+            chunk_rows = 0
+
+    if chunk_start is not None and offset > chunk_start:  # the last chunk if there is any
+        yield chunk_start, offset, header.decode("utf-8-sig")
+
+def split_json_file(
+        file_path: str,
+        rows_per_chunk: int,
+        storage: Storage = default_storage
+) -> list[FileChunk]:
+    """Describe chunks of `rows_per_chunk` objects of a JSON array, streaming
+    the objects without decoding them. Each range holds whole,
+    comma-separated objects."""
+    with storage.open(file_path, "rb") as file:
+        return _stored_chunks(file_path, file, _json_ranges, rows_per_chunk)
+
+def _json_ranges(file: IO[bytes], rows_per_chunk: int) -> Iterator[tuple[int, int, str]]:
+    chunk_start = None
+    chunk_end = 0
+    chunk_rows = 0
+
+    for offset, obj in iter_json_array_spans(file):
+        if chunk_start is None:
+            chunk_start = offset
+        chunk_end = offset + len(obj)
+        chunk_rows += 1
+        if chunk_rows >= rows_per_chunk:
+            yield chunk_start, chunk_end, ""
+            chunk_start = None
+            chunk_rows = 0
+
+    if chunk_start is not None:  # the last chunk if there is any
+        yield chunk_start, chunk_end, ""
+
+NDJSON_BOUNDARY_READ_SIZE = 4 * 1024
+
+def split_ndjson_file(
+        file_path: str,
+        rows_per_chunk: int,
+        storage: Storage = default_storage
+) -> list[FileChunk]:
+    """Describe chunks of about `rows_per_chunk` lines of a JSON Lines file
+    without reading it: every line is a record, so a chunk boundary is the
+    first newline after the estimated offset, found with a small ranged
+    read. Parsing is left to the chunk workers."""
+    size = storage.size(file_path)
+    step = max(1, round(rows_per_chunk * _sample_record_size(file_path, "application/x-ndjson", storage)))
+    chunks = []
+    chunk_start = 0
+    while chunk_start < size:
+        chunk_end = _next_line_start(file_path, chunk_start + step, size, storage)
+        chunks.append(FileChunk(file_path, chunk_start, chunk_end))
+        chunk_start = chunk_end
+    return chunks
+
+def _next_line_start(file_path: str, offset: int, size: int, storage: Storage) -> int:
+    """Offset just past the first newline at or after `offset`, or the file size."""
+    while offset < size:
+        window = read_chunk(FileChunk(file_path, offset, offset + NDJSON_BOUNDARY_READ_SIZE), storage)
+        newline = window.find(b"\n")
+        if newline != -1:
+            return offset + newline + 1
+        offset += len(window)
+    return size
+
+def _ndjson_ranges(file: IO[bytes], rows_per_chunk: int) -> Iterator[tuple[int, int, str]]:
+    """Chunks of `rows_per_chunk` lines, for streams that cannot be probed
+    with ranged reads the way split_ndjson_file does."""
+    chunk_start = 0
+    offset = 0
+    chunk_rows = 0
+    for line in file:
+        offset += len(line)
+        chunk_rows += 1
+        if chunk_rows >= rows_per_chunk:
+            yield chunk_start, offset, ""
+            chunk_start = offset
+            chunk_rows = 0
+    if offset > chunk_start:
+        yield chunk_start, offset, ""
+
+XML_READ_BLOCK_SIZE = 64 * 1024
+
+def split_xml_file(
+        file_path: str,
+        rows_per_chunk: int,
+        storage: Storage = default_storage
+) -> list[FileChunk]:
+    """Describe chunks of `rows_per_chunk` <movie> elements of an XML catalog.
+    expat reports the byte offset of every tag without building a tree, so
+    a range runs from the start of its first <movie> to the start of the
+    next chunk's first one (or the root's closing tag)."""
+    with storage.open(file_path, "rb") as file:
+        return _stored_chunks(file_path, file, _xml_ranges, rows_per_chunk)
+
+def _xml_ranges(file: IO[bytes], rows_per_chunk: int) -> Iterator[tuple[int, int, str]]:
+    ranges = []
+    parser = expat.ParserCreate()
+    depth = 0
+    chunk_start = None
+    chunk_rows = 0
+
+    def start_element(name: str, attrs: dict[str, str]) -> None:
+        nonlocal depth, chunk_start, chunk_rows
+        depth += 1
+        if depth != 2 or name != XML_RECORD_TAG:
+            return
+        offset = parser.CurrentByteIndex
+        if chunk_start is None:
+            chunk_start = offset
+        elif chunk_rows >= rows_per_chunk:
+            ranges.append((chunk_start, offset, ""))
+            chunk_start = offset
+            chunk_rows = 0
+        chunk_rows += 1
+
+    def end_element(name: str) -> None:
+        nonlocal depth, chunk_start
+        depth -= 1
+        if depth == 0 and chunk_start is not None:
+            ranges.append((chunk_start, parser.CurrentByteIndex, ""))
+            chunk_start = None
+
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    try:
+        while block := file.read(XML_READ_BLOCK_SIZE):
+            parser.Parse(block, False)
+            yield from ranges
+            ranges.clear()
+        parser.Parse(b"", True)
+    except expat.ExpatError as e:
+        raise ValidationError(f"Invalid XML: {e}")
+    yield from ranges
+
+CHUNKS_DIR = "chunks"
+CHUNK_EXTENSIONS = {"gzip": "gz", "zstd": "zst"}
+
+BINARY_CHUNK_FORMAT = "binary"
+
+def split_compressed_file(
+        file_name: str,
+        file_type: str,
+        rows_per_chunk: int,
+        compression: str,
+        storage: Storage = default_storage
+) -> list[FileChunk]:
+    """
+    Split a gzip or zstd upload while decompressing it as a stream. A
+    compressed file cannot be read from an arbitrary offset, so each chunk
+    is cut out of the stream as soon as its range is known and stored,
+    compressed again, as an object of its own under CHUNKS_DIR; workers
+    then fetch compressed bytes as well.
+    """
+    extension = CHUNK_EXTENSIONS[compression]
+
+    def store(index: int, data: bytes, start: int, end: int, header: str, line: int) -> FileChunk:
+        name = storage.save(f"{CHUNKS_DIR}/{file_name}/{index:05d}.{extension}",
+                            ContentFile(compress(data, compression)))
+        return FileChunk(name, start, end, header, compression, line)
+
+    return _cut_chunk_files(file_name, file_type, rows_per_chunk, store, storage)
+
+def split_binary_file(
+        file_name: str,
+        file_type: str,
+        rows_per_chunk: int,
+        storage: Storage = default_storage
+) -> list[FileChunk]:
+    """
+    Split an upload, compressed or not, into binary movie chunks stored
+    under CHUNKS_DIR: the splitter parses and validates every record once
+    (see encode_movie_chunk) and workers only decode fixed-layout fields.
+    This moves the parsing into the one splitting task, so it pays off
+    when workers, not the splitter, are the bottleneck.
+    """
+    def store(index: int, data: bytes, start: int, end: int, header: str, line: int) -> FileChunk:
+        content = encode_movie_chunk(chunk_records(data, header, file_type), data.count(b"\n"))
+        name = storage.save(f"{CHUNKS_DIR}/{file_name}/{index:05d}.bin", ContentFile(content))
+        return FileChunk(name, start, end, line=line, format=BINARY_CHUNK_FORMAT)
+
+    return _cut_chunk_files(file_name, file_type, rows_per_chunk, store, storage)
+
+def _cut_chunk_files(
+        file_name: str,
+        file_type: str,
+        rows_per_chunk: int,
+        store: Callable[[int, bytes, int, int, str, int], FileChunk],
+        storage: Storage
+) -> list[FileChunk]:
+    """Stream the decompressed upload, cutting it into chunks of whole
+    records and passing each one's data to `store` as soon as it is known."""
+    ranges = {
+        "text/csv": _csv_ranges,
+        "application/json": _json_ranges,
+        "application/x-ndjson": _ndjson_ranges,
+        "application/xml": _xml_ranges,
+    }[file_type]
+    chunks = []
+    with storage.open(file_name, "rb") as file:
+        stream = _RetainingReader(open_decompressed(file))
+        for start, end, header in ranges(stream, rows_per_chunk):
+            data, line = stream.take(start, end)
+            chunks.append(store(len(chunks), data, start, end, header, line))
+    return chunks
+
+class _RetainingReader:
+    """
+    A binary stream that keeps what has been read from it, so that the
+    ranges a splitter finds can still be cut out of a stream that cannot
+    be read twice, and numbered by line. `take` hands over a range and
+    forgets everything up to its end; the memory held is about one chunk.
+    """
+
+    def __init__(self, file: IO[bytes]) -> None:
+        self._file = file
+        self._buffer = bytearray()
+        self._buffer_start = 0
+        self._buffer_line = 1
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._file.read(size)
+        self._buffer += data
+        return data
+
+    def readline(self) -> bytes:
+        line = self._file.readline()
+        self._buffer += line
+        return line
+
+    def __iter__(self) -> Iterator[bytes]:
+        while line := self.readline():
+            yield line
+
+    def take(self, start: int, end: int) -> tuple[bytes, int]:
+        """The bytes of [start, end) and the line `start` is on."""
+        data = bytes(self._buffer[start - self._buffer_start:end - self._buffer_start])
+        return data, self.discard(start, end)
 
-def split_csv_file(file_path: str, chunk_size_mb: int = 1) -> list[Any] | None:
-    chunk_paths = []
-    part = 1
-    current_chunk_size = 0
-    chunk_lines = []
-
-    with default_storage.open(file_path, "r") as file:
-        for index, line in enumerate(file):
-            if index == 0:
-                header = line
-            line_size = len(line.encode("utf-8"))
-            if current_chunk_size + line_size > chunk_size_mb * 1024 * 1024:
-                chunk_file_name = f"{file_path}_part_{part}.csv"
-                default_storage.save(
-                    chunk_file_name, ContentFile(header + "".join(chunk_lines))
-                )
-                chunk_paths.append(chunk_file_name)
-                chunk_lines = [line]
-                current_chunk_size = line_size
-                part += 1
-            else:
-                chunk_lines.append(line)
-                current_chunk_size += line_size
-
-        if chunk_lines:  # Save the last chunk if there is any
-            chunk_file_name = f"{file_path}_part_{part}.csv"
-            default_storage.save(
-                chunk_file_name, ContentFile(header + "".join(chunk_lines))
-            )
-            chunk_paths.append(chunk_file_name)
-
-    return chunk_paths
-
-def split_json_file(file_path: str, chunk_size_mb: int = 100) -> list[str]:
-    chunk_paths = []
-    part = 1
-    current_chunk_size = 0
-    chunk_objects = []
-
-    with default_storage.open(file_path, "r") as file:
-        objects = json.load(file)
-
-        for obj in objects:
-            obj_str = json.dumps(obj)
-            obj_size = len(obj_str.encode("utf-8"))
-            if current_chunk_size + obj_size > chunk_size_mb * 1024 * 1024:
-                chunk_file_name = f"{file_path}_part_{part}.json"
-                default_storage.save(
-                    chunk_file_name, ContentFile(json.dumps(chunk_objects))
-                )
-                chunk_paths.append(chunk_file_name)
-                chunk_objects = [obj]
-                current_chunk_size = obj_size
-                part += 1
-            else:
-                chunk_objects.append(obj)
-                current_chunk_size += obj_size
-
-            if chunk_objects:  # Save the last chunk if there is any
-                chunk_file_name = f"{file_path}_part_{part}.json"
-                default_storage.save(
-                    chunk_file_name, ContentFile(json.dumps(chunk_objects))
-                )
-                chunk_paths.append(chunk_file_name)
-
-    return chunk_paths
\ No newline at end of file
+    def discard(self, start: int, end: int) -> int:
+        """Forget everything before `end`, returning the line `start` is on."""
+        line = self._buffer_line + self._buffer.count(b"\n", 0, start - self._buffer_start)
+        self._buffer_line = line + self._buffer.count(b"\n", start - self._buffer_start, end - self._buffer_start)
+        del self._buffer[:end - self._buffer_start]
+        self._buffer_start = end
+        return line
@@ -0,0 +1,18 @@
+import pytest
+from django.db import connections
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    # Uploads and chunk files would otherwise land in the working directory
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.fixture(scope="session")
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix, tmp_path_factory):
+    # On disk rather than in memory, so that the worker processes of
+    # import_movies --workers share the test database, and under this run's
+    # temporary directory, so that runs side by side do not share it
+    test_settings = connections["default"].settings_dict["TEST"]
+    test_settings["NAME"] = str(tmp_path_factory.mktemp("db") / "movies_test.sqlite3")
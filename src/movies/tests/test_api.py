@@ -1,14 +1,22 @@
+import gzip
+import json
+import math
+from datetime import timedelta
+
 import pytest
+from django.core.files.storage import FileSystemStorage
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import override_settings
 from django.urls import reverse
+from django.utils import timezone
 from movies.api import GeneralUploadView
-from movies.models import Movie, Book
+from movies.models import Movie, Book, IngestionChunk, IngestionJob
 from movies.serializers import GeneralFileUploadSerializer
-from movies.services import FileProcessor
+from movies.services import FileProcessor, bulk_upsert_movies
 from pytest_django.fixtures import client
 from rest_framework import status
 from rest_framework.test import APIClient
+from storages.utils import is_seekable
 
 from .factories import MovieFactory, BookFactory, UserFactory
 
@@ -27,6 +35,10 @@ def test_create_movie(client):
     response = client.post(url, data=data, content_type='application/json')
     assert response.status_code == status.HTTP_201_CREATED, response.json()
     assert Movie.objects.count() == 1
+    # The catalog links are maintained without changing the representation
+    assert response.json() == {"id": response.json()["id"], **data}
+    assert Movie.objects.filter(tagged_genres__name="Sci-Fi", people__name="George Lucas",
+                                countries__name="USA").count() == 1
 
 
 @pytest.mark.django_db
@@ -70,7 +82,8 @@ def test_list_movies_with_paginations(client):
     movies = MovieFactory.create_batch(10)
     url = reverse('movies:movie-list')
 
-    response = client.get(url)
+    # Numbered pages, still served to clients asking for them
+    response = client.get(url, {'page': 1})
 
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
@@ -95,6 +108,75 @@ def test_list_movies_with_paginations(client):
                                      "country", "extra_data"}
 
 
+def walk_pages(client, url, link="next"):
+    pages = []
+    while url:
+        data = client.get(url).json()
+        assert "count" not in data
+        pages.append([movie["id"] for movie in data["results"]])
+        url = data[link]
+    return pages
+
+
+@pytest.fixture
+def movies_with_year_ties(db):
+    # Many movies share a year and some have none, so pages split ties
+    bulk_upsert_movies([{"title": f"Movie {i}", "release_year": None if i % 5 == 0 else 1990 + i % 3}
+                        for i in range(23)])
+
+
+@pytest.mark.parametrize("ordering, order_by", [
+    (None, ["id"]),
+    ("-id", ["-id"]),
+    ("release_year", ["release_year", "id"]),
+    ("-release_year", ["-release_year", "-id"]),
+])
+@override_settings(REST_FRAMEWORK={'PAGE_SIZE': 4})
+def test_movie_list_cursor_pages(client, movies_with_year_ties, ordering, order_by):
+    url = reverse("movies:movie-list") + (f"?ordering={ordering}" if ordering else "")
+    expected = list(Movie.objects.order_by(*order_by).values_list("id", flat=True))
+
+    pages = walk_pages(client, url)
+    assert [movie_id for page in pages for movie_id in page] == expected
+    assert [len(page) for page in pages] == [4, 4, 4, 4, 4, 3]
+
+    last_page = client.get(url).json()
+    for _ in pages[1:]:
+        last_page = client.get(last_page["next"]).json()
+    assert walk_pages(client, last_page["previous"], link="previous") == pages[-2::-1]
+
+
+@override_settings(REST_FRAMEWORK={'PAGE_SIZE': 4})
+def test_movie_list_cursor_page_is_one_query(client, movies_with_year_ties, django_assert_num_queries):
+    url = client.get(reverse("movies:movie-list"), {"ordering": "release_year"}).json()["next"]
+    for _ in range(2):
+        url = client.get(url).json()["next"]
+
+    # No COUNT(*), and no OFFSET: the page starts at the cursor's key
+    with django_assert_num_queries(1) as queries:
+        client.get(url)
+    assert "OFFSET" not in queries.captured_queries[0]["sql"]
+
+
+@pytest.mark.parametrize("params, status_code", [
+    ({"cursor": "not-a-cursor"}, status.HTTP_404_NOT_FOUND),
+    ({"cursor": "eyJwIjpbImEiXX0="}, status.HTTP_404_NOT_FOUND),
+    ({"cursor": "eyJwIjpbbnVsbF19"}, status.HTTP_404_NOT_FOUND),
+    ({"ordering": "title"}, status.HTTP_400_BAD_REQUEST),
+])
+def test_movie_list_rejects_bad_pagination(client, db, params, status_code):
+    assert client.get(reverse("movies:movie-list"), params).status_code == status_code
+
+
+@pytest.mark.django_db
+@override_settings(REST_FRAMEWORK={'PAGE_SIZE': 2})
+def test_list_books_with_cursor_pages(client):
+    books = BookFactory.create_batch(5)
+
+    assert walk_pages(client, reverse('movies:book-list')) == [
+        [books[0].id, books[1].id], [books[2].id, books[3].id], [books[4].id]]
+
+
 @pytest.mark.django_db
 def test_create_book(client):
     url = reverse('movies:book-list')
@@ -153,7 +235,7 @@ def test_list_books_with_paginations(client):
     books = BookFactory.create_batch(10)
     url = reverse('movies:book-list')
 
-    response = client.get(url)
+    response = client.get(url, {'page': 1})
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
     assert 'count' in data
@@ -248,6 +330,22 @@ def test_add_and_retrieve_watch_history_with_movie_id() -> None:
     for movie_title in [movie_1.title, movie_2.title]:
         assert movie_title in retrieved_movie_ids
 
+@pytest.mark.django_db
+def test_watch_history_in_a_period() -> None:
+    user = UserFactory()
+    movie = MovieFactory()
+    client = APIClient()
+    watch_history_url = reverse("movies:user-watch-history", kwargs={"user_id": user.id})
+    client.post(watch_history_url, {"movie_id": movie.id}, format="json")
+    now = timezone.now()
+
+    response = client.get(watch_history_url, {"since": (now - timedelta(hours=1)).isoformat()})
+    assert [item["movie_id"] for item in response.data["watch_history"]] == [movie.id]
+    response = client.get(watch_history_url, {"until": (now - timedelta(hours=1)).isoformat()})
+    assert response.data["watch_history"] == []
+    response = client.get(watch_history_url, {"since": now.isoformat(), "until": (now - timedelta(hours=1)).isoformat()})
+    assert response.status_code == 400
+
 @pytest.mark.django_db
 def test_add_invalid_movie_id_to_watch_history() -> None:
     user = UserFactory()
@@ -272,6 +370,18 @@ test_data = [
         b'[{"title": "test", "genres": ["comedy"], "extra_data": {"directors": ["name"]}}]',
         202,
     ),
+    (
+        "file.ndjson",
+        "application/x-ndjson",
+        b'{"title": "test", "genres": ["comedy"]}\n{"title": "test 2", "genres": []}\n',
+        202,
+    ),
+    (
+        "file.xml",
+        "application/xml",
+        b"<movies><movie><title>test</title><genres>comedy</genres></movie></movies>",
+        202,
+    ),
     (
         "file.txt",
         "text/plain",
@@ -326,4 +436,449 @@ def test_general_upload_view_unsupported_file_type(client):
 
     response = client.post(url, {"file": unsupported_file}, format="multipart")
     assert response.status_code == 400
-    assert "Unsupported file type" in str(response.data)
\ No newline at end of file
+    assert "Unsupported file type" in str(response.data)
+
+@pytest.mark.django_db
+def test_upload_returns_job_with_progress(client, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    upload_file = SimpleUploadedFile(name="file.csv",
+                                     content=b"title,genres\nHeat,Crime\nRonin,Action\n",
+                                     content_type="text/csv")
+    response = client.post(reverse("movies:file-upload"), {"file": upload_file})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    response = client.get(reverse("movies:ingestion-job-status", kwargs={"job_id": job_id}))
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "completed"
+    assert data["rows_processed"] == 2
+    assert data["chunks_completed"] == data["chunks_total"] == 1
+    assert data["eta_seconds"] == 0
+    assert data["chunks"][0]["rows_created"] == 2
+
+
+@pytest.mark.django_db
+def test_ingestion_job_status_not_found(client):
+    response = client.get(reverse("movies:ingestion-job-status", kwargs={"job_id": 999}))
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_upload_rows_per_chunk_override(client, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    upload_file = SimpleUploadedFile(name="file.csv",
+                                     content=b"title,genres\nHeat,Crime\nRonin,Action\nAlien,Horror\n",
+                                     content_type="text/csv")
+    response = client.post(reverse("movies:file-upload"), {"file": upload_file, "rows_per_chunk": 2})
+    job_id = response.json()["job_id"]
+
+    data = client.get(reverse("movies:ingestion-job-status", kwargs={"job_id": job_id})).json()
+
+    assert [chunk["rows_created"] for chunk in data["chunks"]] == [2, 1]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("query, titles", [
+    ("genre=Sci-Fi", ["Inception", "Tenet", "Dune"]),
+    ("genre=Sci-Fi&genre=Crime", ["Heat", "Inception", "Tenet", "Dune"]),
+    ("director=Christopher+Nolan&release_year_min=2015", ["Tenet"]),
+    ("country=US&release_year_max=2000", ["Heat"]),
+    ("release_year=2021", ["Dune"]),
+    ("genre=Sci-Fi&country=UK&release_year_min=2000&release_year_max=2015", ["Inception"]),
+])
+def test_movie_list_filters(client, query, titles):
+    bulk_upsert_movies([
+        {"title": "Heat", "genres": ["Crime"], "country": "US", "release_year": 1995,
+         "extra_data": {"director": "Michael Mann"}},
+        {"title": "Inception", "genres": ["Sci-Fi"], "country": "UK", "release_year": 2010,
+         "extra_data": {"director": "Christopher Nolan"}},
+        {"title": "Tenet", "genres": ["Sci-Fi"], "country": "UK", "release_year": 2020,
+         "extra_data": {"director": "Christopher Nolan"}},
+        {"title": "Dune", "genres": ["Sci-Fi"], "country": "US", "release_year": 2021},
+    ])
+
+    response = client.get(f"{reverse('movies:movie-list')}?{query}")
+
+    assert response.status_code == 200
+    assert [movie["title"] for movie in response.json()["results"]] == titles
+
+
+@pytest.mark.django_db
+def test_movie_list_rejects_inverted_year_range(client):
+    response = client.get(reverse("movies:movie-list"), {"release_year_min": 2000, "release_year_max": 1990})
+
+    assert response.status_code == 400
+
+
+@pytest.fixture
+def searchable_catalog(db):
+    bulk_upsert_movies([
+        {"title": "The Matrix", "release_year": 1999, "extra_data": {"director": "Lana Wachowski"}},
+        {"title": "The Matrix Reloaded", "release_year": 2003},
+        {"title": "Matrimony", "release_year": 1950},
+        {"title": "Heat", "release_year": 1995, "extra_data": {"director": "Michael Mann"}},
+        {"title": "The Insider", "release_year": 1999, "extra_data": {"director": "Michael Mann"}},
+        {"title": "Amélie", "release_year": 2001},
+        {"title": "A Mann Apart", "release_year": 2003},
+        {"title": "Inception", "release_year": 2010, "extra_data": {"directors": ["Christopher Nolan"]}},
+    ])
+
+
+@pytest.mark.parametrize("query, titles", [
+    ("MATRIX reloaded", ["The Matrix Reloaded"]),
+    ("mann", ["A Mann Apart", "Heat", "The Insider"]),
+    ("amelie", ["Amélie"]),
+    ("nolan", ["Inception"]),
+    ('"the" OR heat*', []),
+])
+def test_movie_search_ranks_title_matches(client, searchable_catalog, query, titles):
+    response = client.get(reverse("movies:movie-search"), {"q": query})
+
+    assert response.status_code == 200
+    assert [movie["title"] for movie in response.json()["results"]] == titles
+
+
+def test_movie_search_keeps_the_index_in_step_with_edits(client, searchable_catalog):
+    movie = Movie.objects.get(title="Heat")
+    movie.title = "Heat (Director's Cut)"
+    movie.save()
+    Movie.objects.filter(title="The Insider").delete()
+
+    titles = [movie["title"] for movie in client.get(reverse("movies:movie-search"), {"q": "mann"}).json()["results"]]
+
+    assert titles == ["A Mann Apart", "Heat (Director's Cut)"]
+
+
+def test_movie_search_indexes_directors_lists(client, searchable_catalog):
+    Movie.objects.filter(title="Heat").update(extra_data={"directors": "Greta Gerwig, Noah Baumbach"})
+
+    titles = [movie["title"] for movie in client.get(reverse("movies:movie-search"), {"q": "baumbach"}).json()["results"]]
+
+    assert titles == ["Heat"]
+
+
+@pytest.mark.parametrize("prefix, titles", [
+    ("mat", ["Matrimony", "The Matrix", "The Matrix Reloaded"]),
+    ("the matrix r", ["The Matrix Reloaded"]),
+    ("ins", ["The Insider"]),
+    ("zz", []),
+])
+def test_movie_autocomplete_completes_words(client, searchable_catalog, prefix, titles):
+    response = client.get(reverse("movies:movie-autocomplete"), {"prefix": prefix})
+
+    assert response.status_code == 200
+    assert [movie["title"] for movie in response.json()["results"]] == titles
+
+
+def test_movie_search_requires_a_query(client, db):
+    assert client.get(reverse("movies:movie-search")).status_code == 400
+
+
+@pytest.mark.django_db
+def test_export_movies_as_ndjson(client):
+    MovieFactory(title="Heat", genres=["Crime"], release_year=1995, country="USA",
+                 extra_data={"director": "Michael Mann"})
+    MovieFactory(title="Ronin", genres=["Action"], release_year=1998)
+
+    response = client.get(reverse("movies:movie-export"))
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/x-ndjson"
+    lines = b"".join(response.streaming_content).splitlines()
+    assert [json.loads(line)["title"] for line in lines] == ["Heat", "Ronin"]
+    assert json.loads(lines[0]) == {"title": "Heat", "genres": ["Crime"], "country": "USA",
+                                    "extra_data": {"director": "Michael Mann"}, "release_year": 1995}
+
+
+@pytest.mark.django_db
+def test_staged_upload_merges_after_last_chunk(client, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    MovieFactory(title="Heat", genres=["Drama"], release_year=1995)
+    upload_file = SimpleUploadedFile(name="file.csv",
+                                     content=b"title,genres,release_year\nHeat,Crime,1995\nRonin,Action,1998\n",
+                                     content_type="text/csv")
+    response = client.post(reverse("movies:file-upload"),
+                           {"file": upload_file, "mode": "staged", "rows_per_chunk": 1})
+    job_id = response.json()["job_id"]
+
+    data = client.get(reverse("movies:ingestion-job-status", kwargs={"job_id": job_id})).json()
+
+    assert data["mode"] == "staged"
+    assert data["status"] == "completed"
+    assert [chunk["rows_staged"] for chunk in data["chunks"]] == [1, 1]
+    assert (data["rows_created"], data["rows_updated"], data["rows_unchanged"]) == (1, 1, 0)
+    assert Movie.objects.get(title="Heat").genres == ["Crime"]
+
+
+@pytest.mark.django_db
+def test_upload_is_streamed_to_storage(client, settings, tmp_path, monkeypatch):
+    settings.MEDIA_ROOT = tmp_path / "media"
+    settings.FILE_UPLOAD_TEMP_DIR = tmp_path
+    settings.FILE_UPLOAD_MAX_MEMORY_SIZE = 16
+    enqueued = []
+    monkeypatch.setattr("movies.api.process_file.delay", lambda *args: enqueued.append(args))
+    content = b"title,genres\n" + b"".join(b"Movie %d,Drama\n" % i for i in range(1000))
+    upload_file = SimpleUploadedFile(name="file.csv", content=content, content_type="text/csv")
+
+    response = client.post(reverse("movies:file-upload"), {"file": upload_file})
+
+    assert response.status_code == 202
+    file_name = enqueued[0][0]
+    assert (tmp_path / "media" / file_name).read_bytes() == content
+
+
+def put_part(client, upload_id, number, content):
+    url = reverse("movies:upload-part", kwargs={"upload_id": upload_id, "number": number})
+    return client.put(url, data=content, content_type="application/octet-stream")
+
+
+@pytest.mark.django_db
+def test_resumable_upload_assembles_parts_and_enqueues_job(client, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    content = b"title,genres,release_year\nHeat,Crime,1995\nRonin,Action,1998\n"
+    response = client.post(reverse("movies:upload-session-create"),
+                           {"file_name": "catalog.csv", "file_type": "text/csv", "size": len(content)})
+    assert response.status_code == 201
+    upload_id = response.json()["id"]
+
+    # Parts may arrive in any order, and an interrupted part is sent again
+    assert put_part(client, upload_id, 2, content[30:]).status_code == 200
+    assert put_part(client, upload_id, 1, b"garbage").status_code == 200
+    assert put_part(client, upload_id, 1, content[:30]).json() == {"number": 1, "size": 30}
+
+    data = client.get(reverse("movies:upload-session", kwargs={"upload_id": upload_id})).json()
+    assert data["parts"] == [{"number": 1, "size": 30}, {"number": 2, "size": len(content) - 30}]
+    assert data["bytes_received"] == len(content)
+
+    response = client.post(reverse("movies:upload-session-complete", kwargs={"upload_id": upload_id}))
+    assert response.status_code == 202
+
+    job = client.get(reverse("movies:ingestion-job-status",
+                             kwargs={"job_id": response.json()["job_id"]})).json()
+    assert job["status"] == "completed"
+    assert (tmp_path / job["file_name"]).read_bytes() == content
+    assert not [path for path in (tmp_path / "upload-parts").rglob("*") if path.is_file()]
+    assert set(Movie.objects.values_list("title", flat=True)) == {"Heat", "Ronin"}
+    data = client.get(reverse("movies:upload-session", kwargs={"upload_id": upload_id})).json()
+    assert data["status"] == "completed"
+
+
+class S3LikeStorage(FileSystemStorage):
+    """Rewinds what it saves as S3Storage._save does before uploading it."""
+
+    def _save(self, name, content):
+        if is_seekable(content):
+            content.seek(0)
+        return super()._save(name, content)
+
+
+@pytest.mark.django_db
+def test_resumable_upload_parts_save_to_a_storage_that_rewinds(client, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.STORAGES = {**settings.STORAGES,
+                         "default": {"BACKEND": f"{__name__}.S3LikeStorage"}}
+    upload_id = client.post(reverse("movies:upload-session-create"),
+                            {"file_name": "catalog.csv", "file_type": "text/csv"}).json()["id"]
+
+    response = put_part(client, upload_id, 1, b"title\nHeat\n")
+
+    assert response.status_code == 200
+    assert response.json() == {"number": 1, "size": 11}
+    assert (tmp_path / "upload-parts" / str(upload_id) / "00001").read_bytes() == b"title\nHeat\n"
+
+
+@pytest.mark.django_db
+def test_resumable_upload_complete_reports_missing_parts(client, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    upload_id = client.post(reverse("movies:upload-session-create"),
+                            {"file_name": "catalog.csv", "file_type": "text/csv"}).json()["id"]
+    put_part(client, upload_id, 1, b"title\n")
+    put_part(client, upload_id, 3, b"Heat\n")
+
+    response = client.post(reverse("movies:upload-session-complete", kwargs={"upload_id": upload_id}))
+
+    assert response.status_code == 400
+    assert response.json() == {"missing_parts": ["2"]}
+
+
+@pytest.mark.django_db
+def test_upload_over_pending_bytes_is_refused_with_retry_after(client, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.MOVIE_INGEST_MAX_PENDING_BYTES = 100
+    finished_at = timezone.now()
+    # 1000 bytes in 10 seconds
+    IngestionJob.objects.create(file_name="done.csv", file_type="text/csv", size=1000,
+                                status=IngestionJob.Status.COMPLETED,
+                                started_at=finished_at - timedelta(seconds=10), finished_at=finished_at)
+    running = IngestionJob.objects.create(file_name="running.csv", file_type="text/csv", size=1000,
+                                          status=IngestionJob.Status.PROCESSING)
+    for index in range(4):
+        IngestionChunk.objects.create(job=running, index=index, start=0, end=0,
+                                      status="completed" if index < 2 else "pending")
+    content = b"title,genres\nHeat,Crime\nRonin,Action\n"
+    upload_file = SimpleUploadedFile(name="file.csv", content=content, content_type="text/csv")
+
+    response = client.post(reverse("movies:file-upload"), {"file": upload_file})
+
+    assert response.status_code == 429
+    # 500 bytes left of the running job, plus the upload, less the limit
+    assert response["Retry-After"] == str(math.ceil((500 + len(content) - 100) / 100))
+    assert IngestionJob.objects.count() == 2
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.django_db
+def test_resumable_upload_complete_waits_for_a_free_job_slot(client, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.MOVIE_INGEST_MAX_PENDING_JOBS = 1
+    running = IngestionJob.objects.create(file_name="running.csv", file_type="text/csv", size=4096,
+                                          status=IngestionJob.Status.PROCESSING)
+    upload_id = client.post(reverse("movies:upload-session-create"),
+                            {"file_name": "catalog.csv", "file_type": "text/csv"}).json()["id"]
+    put_part(client, upload_id, 1, b"title\nHeat\n")
+    url = reverse("movies:upload-session-complete", kwargs={"upload_id": upload_id})
+
+    response = client.post(url)
+
+    assert response.status_code == 429
+    assert int(response["Retry-After"]) >= 1
+    running.status = IngestionJob.Status.COMPLETED
+    running.save()
+    assert client.post(url).status_code == 202
+
+
+@pytest.mark.django_db
+def test_stuck_jobs_stop_holding_admission(client, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.MOVIE_INGEST_MAX_PENDING_JOBS = 1
+    settings.MOVIE_INGEST_STALE_SECONDS = 3600
+    stuck = IngestionJob.objects.create(file_name="stuck.csv", file_type="text/csv", size=4096,
+                                        status=IngestionJob.Status.PROCESSING)
+    IngestionJob.objects.filter(pk=stuck.pk).update(created_at=timezone.now() - timedelta(hours=2))
+    IngestionChunk.objects.create(job=stuck, index=0, start=0, end=0,
+                                  started_at=timezone.now() - timedelta(minutes=90))
+    upload_file = SimpleUploadedFile(name="file.csv", content=b"title\nHeat\n", content_type="text/csv")
+
+    response = client.post(reverse("movies:file-upload"), {"file": upload_file})
+
+    assert response.status_code == 202
+
+
+@pytest.mark.django_db
+def test_recently_active_jobs_still_hold_admission(client, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.MOVIE_INGEST_MAX_PENDING_JOBS = 1
+    settings.MOVIE_INGEST_STALE_SECONDS = 3600
+    running = IngestionJob.objects.create(file_name="running.csv", file_type="text/csv", size=4096,
+                                          status=IngestionJob.Status.PROCESSING)
+    IngestionJob.objects.filter(pk=running.pk).update(created_at=timezone.now() - timedelta(hours=2))
+    IngestionChunk.objects.create(job=running, index=0, start=0, end=0,
+                                  started_at=timezone.now() - timedelta(minutes=5))
+    upload_file = SimpleUploadedFile(name="file.csv", content=b"title\nHeat\n", content_type="text/csv")
+
+    response = client.post(reverse("movies:file-upload"), {"file": upload_file})
+
+    assert response.status_code == 429
+
+
+@pytest.mark.django_db
+def test_upload_that_cannot_be_queued_fails_its_job(settings, tmp_path, monkeypatch):
+    settings.MEDIA_ROOT = tmp_path
+    settings.MOVIE_INGEST_MAX_PENDING_JOBS = 1
+
+    def broker_down(*args, **kwargs):
+        raise ConnectionError("broker down")
+
+    monkeypatch.setattr("movies.api.process_file.delay", broker_down)
+    client = APIClient(raise_request_exception=False)
+    upload_file = SimpleUploadedFile(name="file.csv", content=b"title\nHeat\n", content_type="text/csv")
+
+    response = client.post(reverse("movies:file-upload"), {"file": upload_file})
+
+    assert response.status_code == 500
+    job = IngestionJob.objects.get()
+    assert job.status == IngestionJob.Status.FAILED
+    assert "broker down" in job.error
+    monkeypatch.undo()
+    upload_file = SimpleUploadedFile(name="file.csv", content=b"title\nHeat\n", content_type="text/csv")
+    assert client.post(reverse("movies:file-upload"), {"file": upload_file}).status_code == 202
+
+
+@pytest.mark.django_db
+def test_resumable_upload_part_size_limit(client, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.MOVIE_UPLOAD_PART_MAX_SIZE = 4
+    upload_id = client.post(reverse("movies:upload-session-create"),
+                            {"file_name": "catalog.csv", "file_type": "text/csv"}).json()["id"]
+
+    assert put_part(client, upload_id, 1, b"title\n").status_code == 413
+
+
+@pytest.mark.django_db
+def test_general_upload_view_gzip_file(client, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    content = b"title,genres,release_year\nHeat,Crime,1995\nRonin,Action,1998\n"
+    upload_file = SimpleUploadedFile(name="catalog.csv.gz", content=gzip.compress(content),
+                                     content_type="application/gzip")
+
+    response = client.post(reverse("movies:file-upload"), {"file": upload_file, "rows_per_chunk": 1})
+
+    assert response.status_code == 202
+    job = client.get(reverse("movies:ingestion-job-status", kwargs={"job_id": response.json()["job_id"]})).json()
+    assert job["file_name"].endswith(".csv.gz")
+    assert job["status"] == "completed"
+    assert job["chunks_total"] == 2
+    assert set(Movie.objects.values_list("title", flat=True)) == {"Heat", "Ronin"}
+
+
+@pytest.mark.django_db
+def test_general_upload_view_compressed_file_needs_record_extension(client):
+    upload_file = SimpleUploadedFile(name="catalog.gz", content=gzip.compress(b"title\nHeat\n"),
+                                     content_type="application/gzip")
+
+    response = client.post(reverse("movies:file-upload"), {"file": upload_file})
+
+    assert response.status_code == 400
+    assert "Unsupported file type" in str(response.data)
+
+
+@pytest.mark.django_db
+def test_general_upload_view_refuses_zstd_without_zstandard(client, monkeypatch):
+    monkeypatch.setattr("movies.serializers.zstandard", None)
+    upload_file = SimpleUploadedFile(name="catalog.csv.zst", content=b"\x28\xb5\x2f\xfd",
+                                     content_type="application/zstd")
+
+    response = client.post(reverse("movies:file-upload"), {"file": upload_file})
+
+    assert response.status_code == 400
+    assert "zstd" in str(response.data)
+    assert not IngestionJob.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("file_name, content_type, content, rejected_lines", [
+    ("file.csv", "text/csv",
+     b'title,release_year,extra_data\nHeat,1995,{}\nBad,19x5,{}\n"Multi\nLine",1998,{}\n,2000,{}\nRonin,1998,{}\n',
+     [3, 6]),
+    ("file.ndjson", "application/x-ndjson",
+     b'{"title": "Heat"}\n{"title": "Bad", "release_year": 1000}\n{"title": "Ronin"}\n{not json}\n',
+     [2, 4]),
+])
+def test_upload_reports_rejected_rows_by_line(client, settings, tmp_path, file_name, content_type, content,
+                                              rejected_lines):
+    settings.MEDIA_ROOT = tmp_path
+    upload_file = SimpleUploadedFile(name=file_name, content=content, content_type=content_type)
+
+    response = client.post(reverse("movies:file-upload"), {"file": upload_file, "rows_per_chunk": 2})
+    job = client.get(reverse("movies:ingestion-job-status", kwargs={"job_id": response.json()["job_id"]})).json()
+
+    assert job["status"] == "completed"
+    assert job["chunks_total"] > 1
+    assert job["rows_rejected"] == 2
+    assert job["rows_created"] == Movie.objects.count() == (3 if content_type == "text/csv" else 2)
+    response = client.get(reverse("movies:ingestion-job-rejects", kwargs={"job_id": job["id"]}))
+    report = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+    assert [row["line"] for row in report] == rejected_lines
+    assert all(row["reason"] for row in report)
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from movies.models import Movie
+from movies.tasks import RECORD_SAMPLE_SIZE
+
+
+@pytest.mark.django_db
+def test_import_movies_csv(tmp_path, capsys):
+    path = tmp_path / "movies.csv"
+    path.write_text("title,genres,release_year\nHeat,Crime,1995\nRonin,Action,1998\n")
+
+    call_command("import_movies", str(path), "--workers", "1")
+
+    assert set(Movie.objects.values_list("title", flat=True)) == {"Heat", "Ronin"}
+    assert "Imported 2 rows from 1 chunks" in capsys.readouterr().out
+
+
+@pytest.mark.django_db
+def test_import_movies_explicit_format(tmp_path):
+    path = tmp_path / "catalog.dump"
+    path.write_text('[{"title": "Heat", "genres": ["Crime"]}]')
+
+    call_command("import_movies", str(path), "--workers", "1", "--format", "json")
+
+    assert Movie.objects.get().title == "Heat"
+
+
+@pytest.mark.django_db
+def test_import_movies_json_array_larger_than_the_sample(tmp_path):
+    # The planner's sample of the file then ends in the middle of an object
+    path = tmp_path / "movies.json"
+    movies = [{"title": f"Movie {i}", "genres": ["Drama"], "extra_data": {"plot": "x" * 200}}
+              for i in range(RECORD_SAMPLE_SIZE // 200 + 100)]
+    path.write_text(json.dumps(movies))
+    assert path.stat().st_size > RECORD_SAMPLE_SIZE
+
+    call_command("import_movies", str(path), "--workers", "1")
+
+    assert Movie.objects.count() == len(movies)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_import_movies_with_concurrent_workers(tmp_path):
+    path = tmp_path / "movies.csv"
+    path.write_text("title,genres,country,release_year,extra_data\n" + "".join(
+        f'Movie {i},"Drama, G{i % 40}","UK, C{i % 30}",{1950 + i % 70},"{{""directors"": ""D{i % 500}""}}"\n'
+        for i in range(8000)))
+
+    call_command("import_movies", str(path), "--workers", "4", "--rows-per-chunk", "500")
+
+    assert Movie.objects.count() == 8000
+    assert Movie.objects.filter(people__name="D7", countries__name="UK").count() == 16
+
+
+def test_import_movies_unknown_format(tmp_path):
+    path = tmp_path / "catalog.dump"
+    path.write_text("")
+
+    with pytest.raises(CommandError):
+        call_command("import_movies", str(path))
+
+
+@pytest.mark.django_db
+def test_import_movies_writes_rejects_report(tmp_path, capsys):
+    path = tmp_path / "movies.csv"
+    path.write_text("title,release_year\nHeat,1995\nBad,year\nRonin,1998\n")
+
+    call_command("import_movies", str(path), "--workers", "1", "--rows-per-chunk", "1")
+
+    assert set(Movie.objects.values_list("title", flat=True)) == {"Heat", "Ronin"}
+    assert "1 rows failed validation" in capsys.readouterr().out
+    report = (tmp_path / "movies.csv.rejects.ndjson").read_text()
+    assert '"line": 3' in report and "Invalid release year" in report
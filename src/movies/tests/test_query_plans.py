@@ -0,0 +1,170 @@
+import os
+import random
+import time
+
+import pytest
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.test.utils import CaptureQueriesContext
+
+from movies.models import Movie
+from movies.pagination import keyset_after
+from movies.services import (
+    AUTOCOMPLETE_CANDIDATES,
+    SEARCH_CANDIDATES,
+    analyze_movie_table,
+    autocomplete_titles,
+    bulk_upsert_movies,
+    filter_movies,
+    search_movies,
+)
+
+SUPPORTED_FILTERS = [
+    {"genre": ["Sci-Fi"]},
+    {"genre": ["Sci-Fi", "Drama"]},
+    {"director": ["Christopher Nolan"]},
+    {"country": ["UK"]},
+    {"release_year": 2010},
+    {"release_year_min": 2000},
+    {"release_year_max": 2000},
+    {"release_year_min": 2000, "release_year_max": 2010},
+    {"genre": ["Sci-Fi"], "director": ["Christopher Nolan"], "release_year_min": 2015},
+    {"genre": ["Drama"], "country": ["US"], "release_year_min": 1990, "release_year_max": 2000},
+]
+
+
+def query_plan(queryset: QuerySet) -> list[str]:
+    """The backend's plan for a queryset, one line per step."""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [row[-1] for row in cursor.fetchall()]
+        # Any index path then beats a sequential scan of the test's few rows
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute(f"EXPLAIN {sql}", params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def full_scans(plan: list[str]) -> list[str]:
+    if connection.vendor == "sqlite":
+        # SEARCH steps use an index key; SCAN steps read a whole table or index
+        return [step for step in plan if step.startswith("SCAN")]
+    return [step for step in plan if "Seq Scan" in step]
+
+
+@pytest.fixture(params=[False, True], ids=["without-statistics", "analyzed"])
+def catalog(request, db):
+    if connection.vendor not in ("sqlite", "postgresql"):
+        pytest.skip("query plans are only checked on SQLite and PostgreSQL")
+    bulk_upsert_movies([
+        {"title": f"Movie {i}", "genres": ["Sci-Fi" if i % 2 else "Drama"], "country": "UK" if i % 3 else "US",
+         "release_year": 1950 + i % 70, "extra_data": {"director": f"Director {i % 7}"}}
+        for i in range(200)
+    ])
+    if request.param:
+        # As after a large import, see post_process_ingestion
+        analyze_movie_table()
+
+
+@pytest.mark.parametrize("filters", SUPPORTED_FILTERS)
+def test_filtered_movie_list_uses_indexes(catalog, filters):
+    movies = filter_movies(Movie.objects.order_by("id"), filters)
+
+    with transaction.atomic():
+        page_plan = query_plan(movies[:10])
+        count_plan = query_plan(movies.values("id"))
+
+    assert full_scans(page_plan) == [], page_plan
+    assert full_scans(count_plan) == [], count_plan
+
+
+def test_unfiltered_movie_list_is_a_scan(catalog):
+    # Guards the check above against a plan format it no longer recognises
+    with transaction.atomic():
+        assert full_scans(query_plan(Movie.objects.order_by("id").values("title")))
+
+
+@pytest.mark.parametrize("keys, position", [
+    ([("id", False)], [150]),
+    ([("id", True)], [50]),
+    ([("release_year", False), ("id", False)], [1990, 40]),
+    ([("release_year", True), ("id", True)], [1990, 40]),
+    ([("release_year", False), ("id", False)], [None, 40]),
+    ([("release_year", True), ("id", True)], [None, 40]),
+])
+def test_cursor_page_seeks_the_sort_index(catalog, keys, position):
+    movies = Movie.objects.order_by(*[f"-{field}" if descending else field for field, descending in keys])
+
+    for segment in keyset_after(keys, position, connection.features.nulls_order_largest):
+        with transaction.atomic():
+            plan = query_plan(movies.filter(segment)[:10])
+
+        assert full_scans(plan) == [], plan
+        # Rows come off the index in order, rather than all matches being sorted
+        assert not [step for step in plan if "TEMP B-TREE" in step or step.lstrip(" ->").startswith("Sort")], plan
+
+
+@pytest.mark.parametrize("search, text", [(search_movies, "Movie 7"), (autocomplete_titles, "movie 1")])
+def test_search_reads_titles_through_the_title_index(catalog, search, text):
+    if connection.vendor != "sqlite":
+        pytest.skip("the search index is SQLite's FTS5")
+    with CaptureQueriesContext(connection) as captured:
+        search(text)
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {captured[0]['sql']}")
+        plan = [row[-1] for row in cursor.fetchall()]
+
+    assert [step for step in plan if step.startswith("SEARCH movies_movie USING INDEX movie_title_lower_idx")], plan
+    assert not [step for step in plan if step.split()[:2] == ["SCAN", "movies_movie"]], plan
+
+
+SEARCH_BENCHMARK_TITLES = 1_000_000
+SEARCH_P99_SECONDS = 0.05
+
+
+def p99(function, arguments) -> float:
+    timings = []
+    for argument in arguments:
+        start = time.perf_counter()
+        function(argument)
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[int(len(timings) * 0.99)]
+
+
+@pytest.mark.skipif(not os.environ.get("MOVIE_SEARCH_BENCHMARK"), reason="set MOVIE_SEARCH_BENCHMARK to run")
+@pytest.mark.django_db
+def test_search_latency_over_a_million_titles():
+    if connection.vendor != "sqlite":
+        pytest.skip("the search index is SQLite's FTS5")
+    # Titles drawn from a Zipf-like vocabulary, so that common words match
+    # hundreds of thousands of rows as they would in a real catalog
+    rng = random.Random(1)
+    syllables = ["ka", "ri", "to", "mon", "the", "lan", "dor", "vel", "sa", "mi", "nor", "eth", "ar", "is"]
+    vocabulary = sorted({"".join(rng.choices(syllables, k=rng.randint(1, 4))) for _ in range(20000)})
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    with connection.cursor() as cursor:
+        for start in range(0, SEARCH_BENCHMARK_TITLES, 50000):
+            cursor.executemany(
+                "INSERT INTO movies_movie (title, genres, extra_data, content_hash) VALUES (%s, '[]', %s, '')",
+                [(" ".join(rng.choices(vocabulary, weights, k=rng.randint(1, 5))).title(),
+                  f'{{"director": "{rng.choice(vocabulary)}"}}')
+                 for _ in range(start, start + 50000)],
+            )
+        # An exact title after more longer matches than any tier ranks
+        cursor.executemany(
+            "INSERT INTO movies_movie (title, genres, extra_data, content_hash) VALUES (%s, '[]', '{}', '')",
+            [(f"Love Story Part {part}",) for part in range(SEARCH_CANDIDATES + AUTOCOMPLETE_CANDIDATES)]
+            + [("Love",)],
+        )
+    queries = [" ".join(rng.choices(vocabulary, weights, k=rng.randint(1, 3))) for _ in range(300)]
+
+    assert p99(search_movies, queries) < SEARCH_P99_SECONDS
+    assert p99(autocomplete_titles, [query[:rng.randint(2, len(query))] for query in queries]) < SEARCH_P99_SECONDS
+    assert p99(autocomplete_titles, [query[:2] for query in queries]) < SEARCH_P99_SECONDS
+
+    assert search_movies("love")[0].title == "Love"
+    assert autocomplete_titles("lov")[0]["title"] == "Love"
+    # The commonest word is the whole title of thousands of the movies matching it
+    assert {movie.title for movie in search_movies(vocabulary[0])} == {vocabulary[0].title()}
+    assert autocomplete_titles(vocabulary[0])[0]["title"] == vocabulary[0].title()
@@ -1,8 +1,34 @@
+import io
+from datetime import timedelta
+
 import pytest
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from movies import services
 from movies.services import add_preference
-from movies.models import Movie, UserMoviePreferences
-from movies.services import add_watch_history
+from movies.models import Genre, Movie, MovieStaging, UserMoviePreferences, WatchEvent
+from movies.services import (
+    ChunkRejects,
+    MovieLookupCache,
+    add_watch_history,
+    bulk_upsert_movies,
+    decode_movie_chunk,
+    encode_movie_chunk,
+    iter_csv_records,
+    iter_json_array,
+    iter_json_records,
+    merge_staged_movies,
+    parse_csv,
+    parse_xml,
+    resolve_reject_lines,
+    stage_movies,
+    user_watch_history,
+    validate_movie_rows,
+)
 
 @pytest.mark.django_db
 def test_add_preference_creates_new_preferences():
@@ -92,10 +118,11 @@ class TestAddWatchHistory:
         """Test adding a movie to watch history for the first time."""
         add_watch_history(user.id, movie.id)
 
-        user_preferences = UserMoviePreferences.objects.get(user_id=user.id)
-        assert len(user_preferences.watch_history) == 1
+        watch_history = user_watch_history(user.id)["watch_history"]
+        assert len(watch_history) == 1
 
-        movie_info = user_preferences.watch_history[0]
+        movie_info = watch_history[0]
+        assert movie_info['movie_id'] == movie.id
         assert movie_info['title'] == 'Test Movie'
         assert movie_info['year'] == 2023
         assert movie_info['director'] == ['Test Director']
@@ -115,9 +142,9 @@ class TestAddWatchHistory:
         )
         add_watch_history(user.id, movie2.id)
 
-        user_preferences = UserMoviePreferences.objects.get(user_id=user.id)
-        assert len(user_preferences.watch_history) == 2
-        assert user_preferences.watch_history[1]['title'] == 'Test Movie 2'
+        watch_history = user_watch_history(user.id)["watch_history"]
+        assert len(watch_history) == 2
+        assert watch_history[1]['title'] == 'Test Movie 2'
 
     def test_add_movie_with_missing_optional_fields(self, user):
         """Test adding a movie with missing optional fields."""
@@ -129,8 +156,7 @@ class TestAddWatchHistory:
 
         add_watch_history(user.id, movie.id)
 
-        user_preferences = UserMoviePreferences.objects.get(user_id=user.id)
-        movie_info = user_preferences.watch_history[0]
+        movie_info = user_watch_history(user.id)["watch_history"][0]
         assert movie_info['title'] == 'Minimal Movie'
         assert movie_info['year'] is None
         assert movie_info['director'] == []
@@ -141,9 +167,9 @@ class TestAddWatchHistory:
         add_watch_history(user.id, movie.id)
         add_watch_history(user.id, movie.id)
 
-        user_preferences = UserMoviePreferences.objects.get(user_id=user.id)
-        assert len(user_preferences.watch_history) == 2
-        assert user_preferences.watch_history[0] == user_preferences.watch_history[1]
+        first, second = user_watch_history(user.id)["watch_history"]
+        assert first['movie_id'] == second['movie_id'] == movie.id
+        assert first['watched_at'] <= second['watched_at']
 
     def test_nonexistent_movie(self, user):
         """Test adding a non-existent movie."""
@@ -161,11 +187,564 @@ class TestAddWatchHistory:
 
     def test_concurrent_access(self, user, movie):
         """Test handling of concurrent access to watch history."""
-        # Simulate a race condition by creating preferences first
+        # Preferences created by another request leave the history alone
         UserMoviePreferences.objects.create(user=user, watch_history=[])
 
         add_watch_history(user.id, movie.id)
 
-        user_preferences = UserMoviePreferences.objects.get(user_id=user.id)
-        assert len(user_preferences.watch_history) == 1
-        assert user_preferences.watch_history[0]['title'] == movie.title
\ No newline at end of file
+        watch_history = user_watch_history(user.id)["watch_history"]
+        assert len(watch_history) == 1
+        assert watch_history[0]['title'] == movie.title
+
+    def test_adding_does_not_read_the_history(self, user, movie, django_assert_num_queries):
+        """Test that the cost of adding a movie does not grow with the history."""
+        WatchEvent.objects.bulk_create([WatchEvent(user=user, movie=movie) for _ in range(100)])
+
+        # The user, the movie and the insert
+        with django_assert_num_queries(3):
+            add_watch_history(user.id, movie.id)
+
+        assert WatchEvent.objects.filter(user=user).count() == 101
+
+    def test_history_in_a_period(self, user, movie):
+        """Test reading the movies watched between two times."""
+        start = timezone.now()
+        for days in range(5):
+            WatchEvent.objects.create(user=user, movie=movie, watched_at=start + timedelta(days=days))
+
+        watch_history = user_watch_history(user.id, since=start + timedelta(days=1),
+                                           until=start + timedelta(days=3))["watch_history"]
+
+        assert [event['watched_at'] for event in watch_history] == [start + timedelta(days=1),
+                                                                    start + timedelta(days=2)]
+
+
+@pytest.mark.django_db
+class TestBulkUpsertMovies:
+    def test_creates_and_updates_on_natural_key(self):
+        Movie.objects.create(title="Alien", country="UK", release_year=1979, genres=["Horror"])
+
+        stats = bulk_upsert_movies([
+            {"title": "Alien", "country": "UK", "release_year": 1979, "genres": ["Sci-Fi"]},
+            {"title": "Alien", "country": "USA", "release_year": 1979, "genres": ["Sci-Fi"]},
+            {"title": "Heat", "genres": ["Crime"]},
+        ], batch_size=2)
+
+        assert (stats.created, stats.updated) == (2, 1)
+        assert Movie.objects.count() == 3
+        assert Movie.objects.get(title="Alien", country="UK").genres == ["Sci-Fi"]
+
+    def test_duplicate_keys_in_batch_count_as_updates(self):
+        stats = bulk_upsert_movies([
+            {"title": "Heat", "genres": ["Crime"]},
+            {"title": "Heat", "genres": ["Drama"]},
+        ])
+
+        assert (stats.created, stats.updated) == (1, 1)
+        assert Movie.objects.get(title="Heat").genres == ["Drama"]
+
+    def test_rows_without_year_or_country_are_updated(self):
+        bulk_upsert_movies([{"title": "Heat", "genres": ["Crime"]}])
+        stats = bulk_upsert_movies([{"title": "Heat", "genres": ["Drama"]}])
+
+        assert (stats.created, stats.updated) == (0, 1)
+        assert Movie.objects.count() == 1
+
+    def test_unchanged_rows_are_skipped(self, django_assert_max_num_queries):
+        rows = [
+            {"title": "Heat", "genres": ["Crime"], "extra_data": {"director": "Michael Mann"}},
+            {"title": "Ronin", "genres": ["Action"]},
+        ]
+        bulk_upsert_movies(rows)
+
+        with django_assert_max_num_queries(3) as captured:
+            stats = bulk_upsert_movies(rows)
+
+        # Only the lookup of the stored fingerprints, no writes
+        statements = [query["sql"].split()[0] for query in captured.captured_queries]
+        assert "INSERT" not in statements and "UPDATE" not in statements
+
+        assert stats.as_dict() == {"created": 0, "updated": 0, "unchanged": 2, "staged": 0, "rejected": 0}
+
+    def test_changed_rows_are_rewritten(self):
+        bulk_upsert_movies([{"title": "Heat", "genres": ["Crime"]}])
+        stats = bulk_upsert_movies([{"title": "Heat", "genres": ["Crime"], "extra_data": {"a": 1}}])
+
+        assert stats.as_dict() == {"created": 0, "updated": 1, "unchanged": 0, "staged": 0, "rejected": 0}
+        assert Movie.objects.get(title="Heat").extra_data == {"a": 1}
+
+    def test_edits_outside_ingestion_refresh_the_fingerprint(self):
+        bulk_upsert_movies([{"title": "Heat", "genres": ["Crime"]}])
+        movie = Movie.objects.get(title="Heat")
+        movie.genres = ["Drama"]
+        movie.save()
+
+        stats = bulk_upsert_movies([{"title": "Heat", "genres": ["Crime"]}])
+
+        assert stats.updated == 1
+        assert Movie.objects.get(title="Heat").genres == ["Crime"]
+
+    def test_deferred_movies_can_be_saved(self):
+        bulk_upsert_movies([{"title": "Heat", "genres": ["Crime"], "release_year": 1995}])
+        movie = Movie.objects.only("id", "title").get()
+        movie.title = "Heat (1995)"
+        movie.save(update_fields=["title"])
+
+        stats = bulk_upsert_movies([{"title": "Heat (1995)", "genres": ["Crime"], "release_year": 1995}])
+
+        assert stats.unchanged == 1
+        Movie.objects.only("id").get().save(update_fields=[])
+
+    def test_invalid_release_year(self):
+        with pytest.raises(ValidationError):
+            bulk_upsert_movies([{"title": "Heat", "release_year": 1700}])
+
+    def test_batches_use_constant_number_of_queries(self, django_assert_max_num_queries):
+        rows = [{"title": f"Movie {i}", "release_year": 2000} for i in range(200)]
+        with django_assert_max_num_queries(4 * 2):
+            stats = bulk_upsert_movies(rows, batch_size=100)
+        assert stats.created == 200
+
+
+@pytest.mark.django_db
+def test_parse_csv_coerces_text_cells():
+    file = io.StringIO(
+        'title,genres,country,release_year,extra_data\n'
+        'Heat,"Crime, Drama",USA,1995,"{\'directors\': \'Michael Mann\'}"\n'
+        'Ronin,"[""Action""]",,,{}\n'
+    )
+
+    stats = parse_csv(file)
+
+    assert stats.as_dict() == {"created": 2, "updated": 0, "unchanged": 0, "staged": 0, "rejected": 0}
+    heat = Movie.objects.get(title="Heat")
+    assert heat.genres == ["Crime", "Drama"]
+    assert heat.release_year == 1995
+    assert heat.extra_data == {"directors": "Michael Mann"}
+    assert Movie.objects.get(title="Ronin").country is None
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 64 * 1024])
+def test_iter_json_array_yields_raw_objects(block_size):
+    content = b' [{"title": "A \\"}[,", "genres": ["x"]},\n {"title": "B", "extra_data": {"a": [1, {}]}}] '
+
+    objects = list(iter_json_array(io.BytesIO(content), block_size=block_size))
+
+    assert objects == [
+        b'{"title": "A \\"}[,", "genres": ["x"]}',
+        b'{"title": "B", "extra_data": {"a": [1, {}]}}',
+    ]
+
+
+@pytest.mark.parametrize("content", [b'{"title": "A"}', b'[{"title": "A"}', b'[1, 2]', b''])
+def test_iter_json_array_rejects_invalid_documents(content):
+    with pytest.raises(ValidationError):
+        list(iter_json_array(io.BytesIO(content), block_size=4))
+
+
+@pytest.mark.django_db
+def test_parse_xml_streams_downloader_output():
+    file = io.BytesIO(
+        b"<?xml version='1.0' encoding='utf-8'?>\n"
+        b"<movies>\n"
+        b"  <movie><title>Inception</title><genres>Sci-Fi, Thriller</genres>"
+        b"<countries>USA</countries><directors>Christopher Nolan</directors></movie>\n"
+        b"  <movie><title>Heat</title><genres><genre>Crime</genre></genres>"
+        b"<release_year>1995</release_year></movie>\n"
+        b"</movies>\n"
+    )
+
+    stats = parse_xml(file)
+
+    assert stats.as_dict() == {"created": 2, "updated": 0, "unchanged": 0, "staged": 0, "rejected": 0}
+    inception = Movie.objects.get(title="Inception")
+    assert inception.genres == ["Sci-Fi", "Thriller"]
+    assert inception.country == "USA"
+    assert inception.extra_data == {"directors": "Christopher Nolan"}
+    heat = Movie.objects.get(title="Heat")
+    assert heat.genres == ["Crime"]
+    assert heat.release_year == 1995
+
+
+def test_parse_xml_rejects_malformed_documents():
+    with pytest.raises(ValidationError):
+        parse_xml(io.BytesIO(b"<movies><movie><title>Heat</movie>"))
+
+
+def _selects(captured):
+    return [query["sql"] for query in captured.captured_queries if query["sql"].startswith("SELECT")]
+
+
+@pytest.mark.django_db
+class TestMovieLookupCache:
+    def test_evicts_least_recently_used_keys(self):
+        cache = MovieLookupCache(max_size=2)
+        cache.put(("A", None, None), 1, "a")
+        cache.put(("B", None, None), 2, "b")
+        cache.get(("A", None, None))
+        cache.put(("C", None, None), 3, "c")
+
+        assert ("A", None, None) in cache
+        assert ("B", None, None) not in cache
+        assert len(cache) == 2
+
+    def test_chunk_keys_are_prefetched_once(self, django_assert_max_num_queries):
+        Movie.objects.create(title="Movie 0", release_year=2000)
+        rows = [{"title": f"Movie {i}", "release_year": 2000} for i in range(30)]
+
+        with django_assert_max_num_queries(20) as captured:
+            stats = bulk_upsert_movies(rows, batch_size=10)
+
+        assert len(_selects(captured)) == 1
+        assert stats.as_dict() == {"created": 29, "updated": 0, "unchanged": 1, "staged": 0, "rejected": 0}
+
+    def test_shared_cache_skips_lookups_of_known_keys(self, django_assert_max_num_queries):
+        cache = MovieLookupCache()
+        rows = [{"title": f"Movie {i}", "genres": ["Drama"]} for i in range(5)]
+        bulk_upsert_movies(rows, cache=cache)
+
+        with django_assert_max_num_queries(3) as captured:
+            stats = bulk_upsert_movies(rows, cache=cache)
+
+        assert _selects(captured) == []
+        assert stats.unchanged == 5
+
+
+@pytest.mark.django_db
+def test_search_finds_exact_titles_past_the_ranked_matches(monkeypatch):
+    monkeypatch.setattr(services, "SEARCH_CANDIDATES", 50)
+    monkeypatch.setattr(services, "AUTOCOMPLETE_CANDIDATES", 50)
+    bulk_upsert_movies([{"title": f"Love story part {part}"} for part in range(60)]
+                       + [{"title": "A love story"}, {"title": "Love"}])
+
+    assert [movie.title for movie in services.search_movies("love story")[:2]] == [
+        "Love story part 0", "Love story part 1"]
+    assert services.search_movies("LOVE")[0].title == "Love"
+    assert services.autocomplete_titles("lov")[0]["title"] == "Love"
+
+
+@pytest.mark.django_db
+def test_search_finds_exact_titles_with_letters_sqlite_does_not_fold(monkeypatch):
+    monkeypatch.setattr(services, "SEARCH_CANDIDATES", 5)
+    bulk_upsert_movies([{"title": f"Élan part {part}"} for part in range(10)] + [{"title": "Élan"}])
+
+    assert services.search_movies("ÉLAN")[0].title == "Élan"
+    assert services.autocomplete_titles("Éla")[0]["title"] == "Élan"
+
+
+@pytest.mark.django_db
+def test_merge_staged_movies():
+    Movie.objects.create(title="Heat", genres=["Crime"], release_year=1995)
+    Movie.objects.create(title="Alien", genres=["Horror"], release_year=1979)
+    Movie.objects.create(title="Other job", genres=[])
+    stage_movies([
+        {"title": "Heat", "genres": ["Crime"], "release_year": 1995},
+        {"title": "Alien", "genres": ["Horror"], "release_year": 1979},
+        {"title": "Alien", "genres": ["Sci-Fi"], "release_year": 1979},
+        {"title": "Ronin", "genres": ["Action"]},
+    ], job_id=1)
+    stage_movies([{"title": "Other job", "genres": ["Drama"]}], job_id=2)
+
+    stats = merge_staged_movies(job_id=1)
+
+    assert stats.as_dict() == {"created": 1, "updated": 2, "unchanged": 1, "staged": 0, "rejected": 0}
+    assert Movie.objects.get(title="Alien").genres == ["Sci-Fi"]
+    assert Movie.objects.get(title="Ronin").genres == ["Action"]
+    assert Movie.objects.get(title="Other job").genres == []
+    assert list(MovieStaging.objects.values_list("job_id", flat=True)) == [2]
+    # the merged rows carry fingerprints, so a re-import skips them
+    assert bulk_upsert_movies([{"title": "Ronin", "genres": ["Action"]}]).unchanged == 1
+
+
+@pytest.mark.django_db
+def test_merge_staged_movies_counts_duplicates_as_direct_imports_do():
+    rows = [
+        {"title": "Heat", "genres": ["Crime"]},
+        {"title": "Heat", "genres": ["Crime"]},
+        {"title": "Alien", "genres": ["Horror"]},
+        {"title": "Alien", "genres": ["Sci-Fi"]},
+        {"title": "Alien", "genres": ["Horror"]},
+    ]
+    stage_movies([dict(row) for row in rows], job_id=1)
+
+    staged = merge_staged_movies(job_id=1)
+
+    Movie.objects.all().delete()
+    assert staged.as_dict() == bulk_upsert_movies(rows).as_dict() == {
+        "created": 2, "updated": 2, "unchanged": 1, "staged": 0, "rejected": 0}
+
+
+
+@pytest.mark.django_db
+def test_merge_staged_movies_relinks_only_written_movies(monkeypatch):
+    bulk_upsert_movies([{"title": f"Movie {i}", "genres": ["Drama"]} for i in range(50)])
+    stage_movies([{"title": f"Movie {i}", "genres": ["Drama"]} for i in range(50)]
+                 + [{"title": "Movie 7", "genres": ["Crime"]}, {"title": "New", "genres": ["Crime"]}], job_id=1)
+    relinked = []
+    monkeypatch.setattr(services, "link_movie_catalog",
+                        lambda movies, created=False: relinked.extend(values["title"] for _, values in movies))
+
+    stats = merge_staged_movies(job_id=1)
+
+    assert (stats.created, stats.updated, stats.unchanged) == (1, 2, 49)
+    assert sorted(relinked) == ["Movie 7", "New"]
+
+
+def test_validate_movie_rows_sets_bad_rows_aside():
+    records = [
+        (1, {"title": "Heat", "release_year": "1995"}),
+        (2, {"title": "Future", "release_year": "3000"}),
+        (3, {"title": "", "genres": "Drama"}),
+        (4, ValidationError("Expecting value")),
+        (5, {"title": "Alien", "genres": '{"not": "a list"}'}),
+        (6, {"title": "Ronin"}),
+    ]
+    rejects = ChunkRejects()
+
+    rows = list(validate_movie_rows(records, rejects))
+
+    assert [row["title"] for row in rows] == ["Heat", "Ronin"]
+    assert [(row["line"], row["reason"]) for row in rejects.rows] == [
+        (2, "The release year must be between 1888 and the current year."),
+        (3, "A movie title is required."),
+        (4, "Expecting value"),
+        (5, "Genres must be a list of names."),
+    ]
+    assert rejects.rows[0]["record"] == {"title": "Future", "release_year": "3000"}
+
+
+@pytest.fixture
+def poisoned_writes(monkeypatch):
+    """Make the database refuse every insert that contains a "Poison" row."""
+    written_batches = []
+
+    def refusing(manager):
+        bulk_create = manager.bulk_create
+
+        def write(objs, *args, **kwargs):
+            objs = list(objs)
+            written_batches.append(len(objs))
+            if any(obj.title.startswith("Poison") for obj in objs):
+                raise IntegrityError("poisoned")
+            return bulk_create(objs, *args, **kwargs)
+        monkeypatch.setattr(manager, "bulk_create", write)
+
+    refusing(Movie.objects)
+    refusing(MovieStaging.objects)
+    return written_batches
+
+
+@pytest.mark.django_db
+def test_bulk_upsert_movies_bisects_batches_to_quarantine_poison_rows(poisoned_writes):
+    titles = [f"Movie {i}" for i in range(16)]
+    titles[5] = "Poison A"
+    titles[12] = "Poison B"
+    rejects = ChunkRejects()
+    rows = validate_movie_rows(((i + 1, {"title": title}) for i, title in enumerate(titles)), rejects)
+
+    stats = bulk_upsert_movies(rows, batch_size=8, validated=True, rejects=rejects)
+
+    assert stats.created == 14
+    assert set(Movie.objects.values_list("title", flat=True)) == set(titles) - {"Poison A", "Poison B"}
+    assert [(row["line"], row["record"]["title"]) for row in rejects.rows] == [(6, "Poison A"), (13, "Poison B")]
+    assert rejects.rows[0]["reason"] == "Could not be stored: poisoned"
+    # a batch of 8 with one poison row takes 8 writes to isolate it,
+    # including the single row's retry
+    assert len(poisoned_writes) == 16
+
+
+@pytest.mark.django_db
+def test_bulk_upsert_movies_raises_database_errors_without_rejects(poisoned_writes):
+    with pytest.raises(IntegrityError):
+        bulk_upsert_movies([{"title": "Movie"}, {"title": "Poison"}])
+
+    assert not Movie.objects.exists()
+
+
+@pytest.mark.django_db
+def test_bulk_upsert_movies_recovers_keys_created_concurrently(monkeypatch):
+    cache = MovieLookupCache()
+    prefetch = cache.prefetch
+
+    def racing_prefetch(keys):
+        prefetch(keys)
+        # another chunk inserts the key after this one looked it up
+        monkeypatch.setattr(cache, "prefetch", prefetch)
+        Movie.objects.create(title="Heat", country="US", release_year=1995, genres=["Crime"])
+    monkeypatch.setattr(cache, "prefetch", racing_prefetch)
+    rejects = ChunkRejects()
+    rows = [{"title": "Heat", "country": "US", "release_year": 1995, "genres": ["Drama"]}, {"title": "Ronin"}]
+
+    stats = bulk_upsert_movies(rows, cache=cache, rejects=rejects)
+
+    assert rejects.rows == []
+    assert (stats.created, stats.updated) == (1, 1)
+    assert Movie.objects.get(title="Heat").genres == ["Drama"]
+
+
+@pytest.mark.django_db
+def test_stage_movies_quarantines_poison_rows(poisoned_writes):
+    rejects = ChunkRejects()
+    rows = validate_movie_rows(enumerate([{"title": "Heat"}, {"title": "Poison"}, {"title": "Ronin"}], 1), rejects)
+
+    stats = stage_movies(rows, job_id=1, validated=True, rejects=rejects)
+
+    assert stats.staged == 2
+    assert [row["line"] for row in rejects.rows] == [2]
+
+
+def test_resolve_reject_lines_places_chunks_in_the_file():
+    chunks = [
+        ChunkRejects(first_line=0, lines=10, rows=[{"line": 3, "reason": "a"}]),
+        ChunkRejects(first_line=0, lines=10, rows=[{"line": 1, "reason": "b"}]),
+        ChunkRejects(first_line=40, lines=5, rows=[{"line": 5, "reason": "c"}]),
+    ]
+
+    assert [row["line"] for row in resolve_reject_lines(chunks)] == [3, 11, 44]
+
+
+def test_iter_csv_records_counts_lines_of_quoted_newlines():
+    data = b'Heat,"line one\nline two"\nRonin,x\n'
+
+    records = list(iter_csv_records(data, "title,note\n"))
+
+    assert [line for line, _ in records] == [1, 3]
+    assert records[1][1] == {"title": "Ronin", "note": "x"}
+
+
+def test_iter_json_records_isolates_undecodable_objects():
+    data = b'{"title": "A"},\n{"title": tru},\n\n{"title": "C"}'
+
+    records = list(iter_json_records(data))
+
+    assert records[0] == (1, {"title": "A"})
+    assert records[1][0] == 2 and isinstance(records[1][1], ValidationError)
+    assert records[2] == (4, {"title": "C"})
+
+
+def test_binary_movie_chunk_round_trip():
+    records = [
+        (1, {"title": "Heat", "genres": "Crime, Drama", "country": "US", "release_year": "1995",
+             "extra_data": '{"director": "Michael Mann"}'}),
+        (2, {"title": ""}),
+        (4, {"title": "Ronin", "genres": [1, "Action"]}),
+        (5, ValidationError("Expecting value")),
+    ]
+    rejects = ChunkRejects()
+
+    rows = list(decode_movie_chunk(encode_movie_chunk(records, lines=5), rejects))
+
+    assert rows == list(validate_movie_rows(records, ChunkRejects()))
+    assert rows[1] == {"title": "Ronin", "genres": [1, "Action"], "country": None,
+                       "extra_data": {}, "release_year": None}
+    assert rejects.lines == 5
+    assert rejects.valid_lines == [1, 4]
+    assert rejects.rows == [
+        {"line": 2, "reason": "A movie title is required.", "record": {"title": ""}},
+        {"line": 5, "reason": "Expecting value", "record": None},
+    ]
+
+
+def test_binary_movie_chunk_rejects_a_genre_too_long_to_pack():
+    records = [
+        (1, {"title": "Heat", "genres": ["x" * 70000]}),
+        (2, {"title": "Ronin", "genres": ["Action"]}),
+    ]
+    rejects = ChunkRejects()
+
+    rows = list(decode_movie_chunk(encode_movie_chunk(records, lines=2), rejects))
+
+    assert [row["title"] for row in rows] == ["Ronin"]
+    assert rows[0]["genres"] == ["Action"]
+    assert [reject["line"] for reject in rejects.rows] == [1]
+    assert "genre" in rejects.rows[0]["reason"]
+
+
+@pytest.mark.django_db
+def test_ingestion_links_movies_to_the_catalog_tables():
+    bulk_upsert_movies([
+        {"title": "Inception", "genres": ["Sci-Fi", "Action"], "country": "UK", "release_year": 2010,
+         "extra_data": {"director": "Christopher Nolan"}},
+        {"title": "Tenet", "genres": ["Sci-Fi"], "country": "UK", "release_year": 2020,
+         "extra_data": {"director": "Christopher Nolan"}},
+        {"title": "Heat", "genres": ["Crime"], "country": "US", "release_year": 1995},
+    ])
+    stage_movies([{"title": "Dune", "genres": ["Sci-Fi"], "release_year": 2021,
+                   "extra_data": {"director": ["Denis Villeneuve"]}}], job_id=1)
+    merge_staged_movies(job_id=1)
+
+    sci_fi = Movie.objects.filter(tagged_genres__name="Sci-Fi")
+    assert sorted(sci_fi.values_list("title", flat=True)) == ["Dune", "Inception", "Tenet"]
+    assert list(sci_fi.filter(people__name="Christopher Nolan", release_year__gt=2015)
+                .values_list("title", flat=True)) == ["Tenet"]
+    assert list(Movie.objects.filter(countries__name="US").values_list("title", flat=True)) == ["Heat"]
+    assert Genre.objects.count() == 3
+
+    # an update replaces the links
+    bulk_upsert_movies([{"title": "Tenet", "genres": ["Thriller"], "country": "UK", "release_year": 2020}])
+    tenet = Movie.objects.get(title="Tenet")
+    assert [genre.name for genre in tenet.tagged_genres.all()] == ["Thriller"]
+    assert not tenet.people.exists()
+
+
+@pytest.mark.django_db
+def test_ingestion_links_comma_separated_directors_and_countries():
+    # As data/download_movies.py writes them
+    bulk_upsert_movies([{"title": "Monty Python and the Holy Grail", "country": "UK, US", "release_year": 1975,
+                         "extra_data": {"directors": "Terry Gilliam, Terry Jones"}},
+                        {"title": "Brazil", "country": "UK", "release_year": 1985,
+                         "extra_data": {"director": "Terry Gilliam", "directors": "Terry Gilliam"}}])
+
+    grail = Movie.objects.get(release_year=1975)
+    assert sorted(grail.people.values_list("name", flat=True)) == ["Terry Gilliam", "Terry Jones"]
+    assert sorted(grail.countries.values_list("name", flat=True)) == ["UK", "US"]
+    assert list(Movie.objects.get(title="Brazil").people.values_list("name", flat=True)) == ["Terry Gilliam"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_backfill_migration_links_existing_movies():
+    executor = MigrationExecutor(connection)
+    executor.migrate([("movies", "0015_catalog_tables")])
+    old_apps = executor.loader.project_state([("movies", "0015_catalog_tables")]).apps
+    old_apps.get_model("movies", "Movie").objects.create(
+        title="Heat", genres=["Crime", "Drama", "Crime"], country="US", extra_data={"director": "Michael Mann"})
+    old_apps.get_model("movies", "Movie").objects.create(
+        title="Brazil", country="UK, US", extra_data={"directors": "Terry Gilliam, Terry Jones"})
+
+    executor = MigrationExecutor(connection)
+    executor.migrate(executor.loader.graph.leaf_nodes())
+
+    heat = Movie.objects.get(title="Heat")
+    assert sorted(heat.tagged_genres.values_list("name", flat=True)) == ["Crime", "Drama"]
+    assert list(heat.people.values_list("name", flat=True)) == ["Michael Mann"]
+    assert list(heat.countries.values_list("name", flat=True)) == ["US"]
+    brazil = Movie.objects.get(title="Brazil")
+    assert sorted(brazil.people.values_list("name", flat=True)) == ["Terry Gilliam", "Terry Jones"]
+    assert sorted(brazil.countries.values_list("name", flat=True)) == ["UK", "US"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_watch_history_migration_moves_json_histories():
+    executor = MigrationExecutor(connection)
+    executor.migrate([("movies", "0019_watch_event")])
+    old_apps = executor.loader.project_state([("movies", "0019_watch_event")]).apps
+    Movie_ = old_apps.get_model("movies", "Movie")
+    heat = Movie_.objects.create(title="Heat", release_year=1995, country="US")
+    Movie_.objects.create(title="Heat", release_year=1995, country="UK")
+    alien = Movie_.objects.create(title="Alien", release_year=1979)
+    user = old_apps.get_model("auth", "User").objects.create(username="viewer")
+    lost = {"title": "Lost Movie", "year": 2001, "director": [], "genres": []}
+    old_apps.get_model("movies", "UserMoviePreferences").objects.create(user_id=user.id, watch_history=[
+        {"title": "Heat", "year": 1995, "director": [], "genres": []},
+        lost,
+        {"title": "Alien", "year": 1979, "director": [], "genres": []},
+        {"title": "Heat", "year": 1995, "director": [], "genres": []},
+    ])
+
+    executor = MigrationExecutor(connection)
+    executor.migrate(executor.loader.graph.leaf_nodes())
+
+    watch_history = user_watch_history(user.id)["watch_history"]
+    assert [event["movie_id"] for event in watch_history] == [heat.id, alien.id, heat.id]
+    # Entries with no movie in the catalog are left where they were
+    assert UserMoviePreferences.objects.get(user_id=user.id).watch_history == [lost]
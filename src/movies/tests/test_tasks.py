@@ -0,0 +1,358 @@
+import gzip
+import json
+
+import pytest
+from celery import Celery, _state
+from celery.app.trace import reset_worker_optimizations
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from django.db import OperationalError, connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from movies.models import IngestionJob, Movie
+from movies.services import compress, zstandard
+from movies.tasks import (
+    FileChunk,
+    finalise_ingestion,
+    lookup_cache,
+    process_file,
+    process_chunk,
+    process_chunks,
+    read_chunk,
+    plan_rows_per_chunk,
+    split_csv_file,
+    split_file,
+    split_json_file,
+    split_ndjson_file,
+    split_xml_file,
+)
+from recommendation_system.celery import app as celery_app, queue_profile
+
+
+def test_split_json_file_cuts_chunks_on_row_count():
+    movies = [{"title": f"Movie {i}", "genres": ["Drama"]} for i in range(10)]
+    file_name = default_storage.save("movies.json", ContentFile(json.dumps(movies).encode()))
+
+    chunks = split_json_file(file_name, rows_per_chunk=4)
+
+    decoded = [json.loads(b"[" + read_chunk(chunk) + b"]") for chunk in chunks]
+    assert [len(chunk) for chunk in decoded] == [4, 4, 2]
+    assert [movie for chunk in decoded for movie in chunk] == movies
+
+
+def test_split_json_file_single_chunk():
+    movies = [{"title": "Heat", "genres": ["Crime"]}]
+    content = json.dumps(movies).encode()
+    file_name = default_storage.save("movies.json", ContentFile(content))
+
+    chunks = split_json_file(file_name, rows_per_chunk=10)
+
+    assert chunks == [FileChunk(file_name, 1, len(content) - 1, line=1)]
+
+
+def test_split_csv_file_aligns_ranges_to_records():
+    content = (
+        b'title,genres,extra_data\n'
+        b'Heat,Crime,"{""note"": ""line one\nline two""}"\n'
+        + b"".join(b"Movie %d,Drama,{}\n" % i for i in range(20))
+    )
+    file_name = default_storage.save("movies.csv", ContentFile(content))
+
+    chunks = split_csv_file(file_name, rows_per_chunk=5)
+
+    assert len(chunks) == 5
+    assert {chunk.header for chunk in chunks} == {"title,genres,extra_data\n"}
+    assert chunks[0].start == len(b"title,genres,extra_data\n")
+    assert b"".join(read_chunk(chunk) for chunk in chunks) == content[chunks[0].start:]
+    # The quoted newline does not count as a record boundary
+    assert read_chunk(chunks[0]).endswith(b"Movie 3,Drama,{}\n")
+    assert default_storage.listdir("")[1] == [file_name]
+
+
+@pytest.mark.django_db
+def test_process_chunk_reads_only_its_range():
+    content = b"title,genres\nHeat,Crime\nRonin,Action\nAlien,Horror\n"
+    file_name = default_storage.save("movies.csv", ContentFile(content))
+    start = content.index(b"Ronin")
+    chunk = FileChunk(file_name, start, content.index(b"Alien"), "title,genres\n")
+
+    assert process_chunk(list(chunk), "text/csv") == {"created": 1, "updated": 0, "unchanged": 0, "staged": 0, "rejected": 0}
+    assert list(Movie.objects.values_list("title", flat=True)) == ["Ronin"]
+
+
+@pytest.mark.django_db
+def test_process_chunk_retries_connection_errors(monkeypatch):
+    from movies import tasks
+
+    content = b"title,genres\nHeat,Crime\nRonin,Action\n"
+    file_name = default_storage.save("movies.csv", ContentFile(content))
+    chunk = FileChunk(file_name, len(b"title,genres\n"), len(content), "title,genres\n")
+    import_chunk = tasks.import_chunk
+    attempts = []
+
+    def flaky_import_chunk(*args, **kwargs):
+        attempts.append(1)
+        stats = import_chunk(*args, **kwargs)
+        if len(attempts) == 1:
+            raise OperationalError("server closed the connection unexpectedly")
+        return stats
+    monkeypatch.setattr(tasks, "import_chunk", flaky_import_chunk)
+
+    result = process_chunk.apply(args=(list(chunk), "text/csv"), throw=False)
+
+    assert len(attempts) == 2
+    # the rows written before the failure come out unchanged
+    assert result.get() == {"created": 0, "updated": 0, "unchanged": 2, "staged": 0, "rejected": 0}
+    assert Movie.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_split_xml_file_and_process_chunks():
+    content = (
+        b"<?xml version='1.0' encoding='utf-8'?>\n<movies>\n"
+        + b"".join(b"  <movie><title>Movie %d</title><genres>Drama</genres></movie>\n" % i for i in range(10))
+        + b"</movies>\n"
+    )
+    file_name = default_storage.save("movies.xml", ContentFile(content))
+
+    chunks = split_xml_file(file_name, rows_per_chunk=3)
+
+    assert len(chunks) == 4
+    assert read_chunk(chunks[0]).startswith(b"<movie>")
+    assert chunks[-1].end == content.index(b"</movies>")
+    created = sum(process_chunk(list(chunk), "application/xml")["created"] for chunk in chunks)
+    assert created == 10
+    assert Movie.objects.filter(genres=["Drama"]).count() == 10
+
+
+@pytest.mark.django_db
+def test_plan_rows_per_chunk_spreads_rows_over_workers(settings):
+    settings.MOVIE_CHUNK_TARGET_ROWS = 10000
+    settings.MOVIE_ROW_COST_SECONDS = 0.001
+    settings.MOVIE_CHUNK_MIN_SECONDS = 0.1
+    settings.MOVIE_CHUNK_MAX_SECONDS = 60
+    content = b"title,genres\n" + b"".join(b"Movie %05d,Drama\n" % i for i in range(8000))
+    file_name = default_storage.save("movies.csv", ContentFile(content))
+
+    # 8000 rows over 4 workers, 4 chunks each
+    assert plan_rows_per_chunk(file_name, "text/csv", workers=4) == 500
+    # 500-row chunks would run below the minimum task duration
+    settings.MOVIE_CHUNK_MIN_SECONDS = 1
+    assert plan_rows_per_chunk(file_name, "text/csv", workers=4) == 1000
+    assert plan_rows_per_chunk(file_name, "text/csv", workers=1) == 2000
+    # ... or above the maximum one
+    settings.MOVIE_CHUNK_MAX_SECONDS = 1.5
+    assert plan_rows_per_chunk(file_name, "text/csv", workers=1) == 1500
+
+
+@pytest.mark.django_db
+def test_split_ndjson_file_cuts_on_newlines():
+    lines = [json.dumps({"title": f"Movie {i}", "genres": ["Drama"] * (i % 3)}).encode() + b"\n" for i in range(50)]
+    content = b"".join(lines)
+    file_name = default_storage.save("movies.ndjson", ContentFile(content))
+
+    chunks = split_ndjson_file(file_name, rows_per_chunk=7)
+
+    assert len(chunks) > 1
+    assert chunks[0].start == 0 and chunks[-1].end == len(content)
+    assert all(read_chunk(chunk).endswith(b"\n") for chunk in chunks)
+    assert b"".join(read_chunk(chunk) for chunk in chunks) == content
+    created = sum(process_chunk(list(chunk), "application/x-ndjson")["created"] for chunk in chunks)
+    assert created == 50
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("compression", [
+    "gzip",
+    pytest.param("zstd", marks=pytest.mark.skipif(zstandard is None, reason="zstandard is not installed")),
+])
+@pytest.mark.parametrize("file_type, content", [
+    ("text/csv", b"title,genres\n" + b"".join(b"Movie %d,Drama\n" % i for i in range(10))),
+    ("application/x-ndjson", b"".join(b'{"title": "Movie %d", "genres": ["Drama"]}\n' % i for i in range(10))),
+    ("application/json", json.dumps([{"title": f"Movie {i}", "genres": ["Drama"]} for i in range(10)]).encode()),
+    ("application/xml", b"<movies>" + b"".join(b"<movie><title>Movie %d</title></movie>" % i for i in range(10))
+     + b"</movies>"),
+])
+def test_split_compressed_file_stores_compressed_chunks(compression, file_type, content):
+    file_name = default_storage.save("movies.gz", ContentFile(compress(content, compression)))
+
+    chunks = split_file(file_name, file_type, rows_per_chunk=4)
+
+    assert len(chunks) == 3
+    assert all(chunk.file_name.startswith(f"chunks/{file_name}/") for chunk in chunks)
+    assert [read_chunk(chunk) for chunk in chunks] == [content[chunk.start:chunk.end] for chunk in chunks]
+    with default_storage.open(chunks[0].file_name, "rb") as file:
+        assert file.read(2) in (b"\x1f\x8b", b"\x28\xb5")
+    process_chunks([list(chunk) for chunk in chunks], file_type)
+    assert Movie.objects.count() == 10
+    # The chord's callback removes the chunk objects
+    assert not any(default_storage.exists(chunk.file_name) for chunk in chunks)
+
+
+@pytest.mark.django_db
+def test_split_file_into_binary_chunks(settings):
+    settings.MOVIE_CHUNK_FORMAT = "binary"
+    content = (b"title,genres,release_year\n"
+               + b"".join(b'Movie %d,"Drama,Crime",1999\n' % i for i in range(9))
+               + b"Future,Drama,3000\n")
+    file_name = default_storage.save("movies.csv", ContentFile(content))
+
+    chunks = split_file(file_name, "text/csv", rows_per_chunk=4)
+
+    assert [(chunk.format, chunk.line) for chunk in chunks] == [("binary", 2), ("binary", 6), ("binary", 10)]
+    with default_storage.open(chunks[0].file_name, "rb") as file:
+        assert file.read(4) == b"MVC1"
+    process_chunks([list(chunk) for chunk in chunks], "text/csv")
+    assert Movie.objects.get(title="Movie 3").genres == ["Drama", "Crime"]
+    assert Movie.objects.count() == 9
+    assert not any(default_storage.exists(chunk.file_name) for chunk in chunks)
+
+    job = IngestionJob.objects.create(file_name=file_name, file_type="text/csv")
+    process_file(file_name, "text/csv", job.id, rows_per_chunk=4)
+    job.refresh_from_db()
+    assert (job.status, job.rows_unchanged, job.rows_rejected) == ("completed", 9, 1)
+    with default_storage.open(job.rejects_file) as file:
+        assert json.loads(file.read())["line"] == 11
+
+
+@pytest.mark.django_db
+def test_plan_rows_per_chunk_estimates_decompressed_size(settings):
+    settings.MOVIE_CHUNK_TARGET_ROWS = 100000
+    settings.MOVIE_ROW_COST_SECONDS = 0.0001
+    settings.MOVIE_CHUNK_MIN_SECONDS = 0.01
+    settings.MOVIE_CHUNK_MAX_SECONDS = 60
+    content = b"title,genres\n" + b"".join(b"Movie %05d,Drama\n" % i for i in range(40000))
+    file_name = default_storage.save("movies.csv.gz", ContentFile(gzip.compress(content)))
+
+    # 40000 rows over 2 workers, 4 chunks each, from a file a tenth that size
+    assert 4000 <= plan_rows_per_chunk(file_name, "text/csv", workers=2) <= 6500
+
+
+@pytest.mark.django_db
+def test_process_file_returns_serialisable_id_and_finalises_job(settings):
+    settings.MOVIE_ANALYZE_AFTER_ROWS = 1
+    content = b"title,genres\n" + b"".join(b"Movie %d,Drama\n" % i for i in range(10))
+    file_name = default_storage.save("movies.csv", ContentFile(content))
+    job = IngestionJob.objects.create(file_name=file_name, file_type="text/csv")
+
+    with CaptureQueriesContext(connection) as captured:
+        result = process_file(file_name, "text/csv", job.id, rows_per_chunk=3)
+
+    assert isinstance(result, str)
+    job.refresh_from_db()
+    assert job.status == IngestionJob.Status.COMPLETED
+    assert (job.rows_created, job.rows_updated, job.rows_unchanged) == (10, 0, 0)
+    assert job.chunks.count() == 4
+    assert any(query["sql"].startswith("ANALYZE") for query in captured.captured_queries)
+
+
+@pytest.mark.django_db
+def test_finalise_ingestion_aggregates_chunk_counts_once():
+    job = IngestionJob.objects.create(file_name="movies.csv", file_type="text/csv",
+                                      status=IngestionJob.Status.PROCESSING, started_at=timezone.now())
+    results = [
+        {"created": 2, "updated": 1, "unchanged": 0, "staged": 0, "rejected": 1},
+        {"created": 3, "updated": 0, "unchanged": 4, "staged": 0, "rejected": 0},
+    ]
+
+    summary = finalise_ingestion(results, job.id)
+
+    assert summary["status"] == "completed"
+    assert (summary["rows_created"], summary["rows_updated"], summary["rows_unchanged"],
+            summary["rows_rejected"]) == (5, 1, 4, 1)
+    assert summary["elapsed_seconds"] >= 0
+    # A redelivered callback does not count the job again
+    assert finalise_ingestion(results + results, job.id)["rows_created"] == 5
+
+
+@pytest.mark.django_db
+def test_shared_lookup_cache_is_dropped_when_a_job_finishes(settings):
+    settings.MOVIE_LOOKUP_CACHE_PER_WORKER = True
+    cache = lookup_cache()
+    assert lookup_cache() is cache
+
+    IngestionJob.objects.create(file_name="movies.csv", file_type="text/csv",
+                                status=IngestionJob.Status.COMPLETED, finished_at=timezone.now())
+
+    assert lookup_cache() is not cache
+
+
+@pytest.fixture
+def memory_broker(monkeypatch):
+    """Publish tasks to an in-memory broker instead of running them eagerly;
+    yields a function returning the names of the tasks waiting on a queue."""
+    monkeypatch.setitem(celery_app.conf, "CELERY_TASK_ALWAYS_EAGER", False)
+    with celery_app.connection_for_write("memory://") as broker:
+        def waiting(queue: str) -> list[str]:
+            with broker.SimpleQueue(queue) as messages:
+                tasks = []
+                while messages.qsize():
+                    message = messages.get(timeout=1)
+                    message.ack()
+                    tasks.append(message.headers["task"])
+                return tasks
+        yield broker, waiting
+
+
+def test_ingestion_tasks_are_routed_by_workload(memory_broker):
+    broker, waiting = memory_broker
+    options = {"connection": broker, "ignore_result": True}
+
+    process_file.apply_async(("movies.csv", "text/csv"), **options)
+    process_chunks.apply_async(([], "text/csv"), **options)
+    process_chunk.apply_async((["movies.csv", 0, 10], "text/csv"), **options)
+    finalise_ingestion.apply_async(([],), **options)
+    celery_app.send_task("recommendations.tasks.refresh", **options)
+
+    assert waiting("bulk") == ["movies.tasks.process_file", "movies.tasks.process_chunks",
+                               "movies.tasks.process_chunk"]
+    assert waiting("maintenance") == ["movies.tasks.finalise_ingestion"]
+    assert waiting("interactive") == ["recommendations.tasks.refresh"]
+
+
+@pytest.fixture
+def worker_app():
+    """A copy of the app for workers to configure, so that their profile
+    does not leak into the other tests."""
+    current, default = _state.get_current_app(), _state.default_app
+    app = Celery("movies", set_as_current=False)
+    app.config_from_object("django.conf:settings", namespace="CELERY")
+    yield app
+    # A worker makes its app the current and default one
+    reset_worker_optimizations(app)
+    _state.set_default_app(default)
+    current.set_current()
+
+
+def command_line_worker(app, queues, **options):
+    """A worker built as the worker command builds it, with the options the
+    command fills in from the configuration when they are not given."""
+    options.setdefault("concurrency", app.conf.worker_concurrency)
+    options.setdefault("prefetch_multiplier", app.conf.worker_prefetch_multiplier)
+    return app.Worker(queues=queues, quiet=True, redirect_stdouts=False, **options)
+
+
+def test_workers_of_a_single_queue_get_its_profile(worker_app, settings):
+    worker = command_line_worker(worker_app, ["bulk"])
+
+    profile = settings.CELERY_QUEUE_PROFILES["bulk"]
+    assert worker.prefetch_multiplier == 1
+    assert worker.concurrency == profile["worker_concurrency"]
+    assert worker.time_limit == profile["task_time_limit"]
+    assert worker.consumer.initial_prefetch_count == worker.concurrency
+
+
+def test_worker_command_line_options_override_the_profile(worker_app):
+    worker = command_line_worker(worker_app, ["bulk"], concurrency=3, prefetch_multiplier=8)
+
+    assert (worker.concurrency, worker.prefetch_multiplier) == (3, 8)
+
+
+def test_workers_of_several_queues_keep_the_configuration(worker_app):
+    worker = command_line_worker(worker_app, ["bulk", "interactive"])
+
+    assert worker.prefetch_multiplier == worker_app.conf.worker_prefetch_multiplier
+    assert queue_profile(["bulk", "interactive"]) == {}
+    assert queue_profile(None) == {}
@@ -2,11 +2,20 @@ from django.urls import path
 from movies.api import (
     MovieListCreateAPIView,
     MovieDetailAPIView,
+    MovieExportView,
+    MovieSearchView,
+    MovieAutocompleteView,
     BookListCreateAPIView,
     BookDetailAPIView,
     UserPreferencesView,
     WatchHistoryView,
-    GeneralUploadView
+    GeneralUploadView,
+    IngestionJobStatusView,
+    IngestionJobRejectsView,
+    UploadSessionCreateView,
+    UploadSessionView,
+    UploadPartView,
+    UploadSessionCompleteView
 )
 
 app_name = "movies"
@@ -14,9 +23,18 @@ app_name = "movies"
 urlpatterns = [
     path("movies/", MovieListCreateAPIView.as_view(), name="movie-list"),
     path("movies/<int:pk>/", MovieDetailAPIView.as_view(), name="movie-detail"),
+    path("movies/export/", MovieExportView.as_view(), name="movie-export"),
+    path("movies/search/", MovieSearchView.as_view(), name="movie-search"),
+    path("movies/autocomplete/", MovieAutocompleteView.as_view(), name="movie-autocomplete"),
     path("user/<int:user_id>/preferences/", UserPreferencesView.as_view(), name="user-preferences"),
     path("user/<int:user_id>/watch-history/", WatchHistoryView.as_view(), name="user-watch-history"),
     path("upload/", GeneralUploadView.as_view(), name="file-upload"),
+    path("uploads/", UploadSessionCreateView.as_view(), name="upload-session-create"),
+    path("uploads/<int:upload_id>/", UploadSessionView.as_view(), name="upload-session"),
+    path("uploads/<int:upload_id>/parts/<int:number>/", UploadPartView.as_view(), name="upload-part"),
+    path("uploads/<int:upload_id>/complete/", UploadSessionCompleteView.as_view(), name="upload-session-complete"),
+    path("jobs/<int:job_id>/", IngestionJobStatusView.as_view(), name="ingestion-job-status"),
+    path("jobs/<int:job_id>/rejects/", IngestionJobRejectsView.as_view(), name="ingestion-job-rejects"),
     path("books/", BookListCreateAPIView.as_view(), name="book-list"),
     path("books/<int:pk>/", BookDetailAPIView.as_view(), name="book-detail"),
 ]
\ No newline at end of file
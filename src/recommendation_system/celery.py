@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.signals import celeryd_init, worker_init
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE",
                       "recommendation_system.settings")
@@ -7,4 +8,41 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE",
 app = Celery("movies")
 app.config_from_object("django.conf:settings",
                        namespace="CELERY")
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+
+def queue_profile(queues: list[str] | None) -> dict:
+    """The worker settings of the queue profile for a worker consuming
+    `queues`, or nothing unless it consumes exactly one profiled queue."""
+    profiles = app.conf.queue_profiles or {}
+    if not queues or len(queues) != 1:
+        return {}
+    return dict(profiles.get(queues[0], {}))
+
+
+# Settings the worker command fills in from the configuration while parsing
+# its options, before celeryd_init is sent, and passes on as if given on the
+# command line: the profile is applied to the worker's attributes instead.
+RESOLVED_OPTIONS = {"worker_concurrency": "concurrency", "worker_prefetch_multiplier": "prefetch_multiplier"}
+
+
+@celeryd_init.connect
+def apply_queue_profile(instance=None, conf=None, options=None, **kwargs):
+    # Sent before the worker reads its settings, so command line options
+    # still override the profile
+    options = options or {}
+    profile = queue_profile(options.get("queues"))
+    # An option still holding the configured value was not given
+    instance.queue_profile_options = {
+        option: profile[setting] for setting, option in RESOLVED_OPTIONS.items()
+        if setting in profile and options.get(option) in (None, conf[setting])
+    }
+    conf.update(profile)
+
+
+@worker_init.connect
+def apply_queue_profile_options(sender=None, **kwargs):
+    # Sent once the worker has read its settings, before its pool and
+    # consumer are made from them
+    for option, value in getattr(sender, "queue_profile_options", {}).items():
+        setattr(sender, option, value)
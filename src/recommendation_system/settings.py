@@ -80,6 +80,14 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            # Concurrent importers (Celery workers, import_movies --workers)
+            # wait for the write lock: transactions take it when they begin,
+            # where the busy timeout applies, rather than failing on upgrade.
+            "timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", 30)),
+            "transaction_mode": "IMMEDIATE",
+            "init_command": "PRAGMA journal_mode=WAL;",
+        },
     }
 }
 
@@ -126,13 +134,101 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    # Cursor pages by default; ?page= still gets numbered pages with a count
+    "DEFAULT_PAGINATION_CLASS": "movies.pagination.KeysetPagination",
     "PAGE_SIZE": 10,
 }
 
+# Uploads above this size are spooled to a temporary file by Django rather
+# than kept in memory, and are then streamed from there to the storage.
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv("FILE_UPLOAD_MAX_MEMORY_SIZE", 2621440))
+# Largest file accepted by a single POST to /api/upload/; bigger catalogs go
+# through the resumable upload API, in parts of at most MOVIE_UPLOAD_PART_MAX_SIZE
+MOVIE_UPLOAD_MAX_SIZE = int(os.getenv("MOVIE_UPLOAD_MAX_SIZE", 10 * 1024 * 1024))
+MOVIE_UPLOAD_PART_MAX_SIZE = int(os.getenv("MOVIE_UPLOAD_PART_MAX_SIZE", 64 * 1024 * 1024))
+
+# Number of rows validated and written per transaction by the movie importers.
+MOVIE_IMPORT_BATCH_SIZE = int(os.getenv("MOVIE_IMPORT_BATCH_SIZE", 1000))
+# Retries of a chunk that failed on a connection or locking error.
+MOVIE_CHUNK_MAX_RETRIES = int(os.getenv("MOVIE_CHUNK_MAX_RETRIES", 3))
+# Natural keys resolved ahead of the writes and remembered while importing.
+# Sharing the cache across the chunks of a worker saves more lookups, but it
+# may then miss edits made by other processes in the meantime.
+MOVIE_LOOKUP_CACHE_SIZE = int(os.getenv("MOVIE_LOOKUP_CACHE_SIZE", 10000))
+MOVIE_LOOKUP_CACHE_PER_WORKER = os.getenv("MOVIE_LOOKUP_CACHE_PER_WORKER", "False") == "True"
+
+# Chunk planning for imports: records per chunk are capped by the target,
+# spread over the workers and kept within the min/max task duration at the
+# per-row cost measured on recent chunks (or the default cost below).
+MOVIE_CHUNK_TARGET_ROWS = int(os.getenv("MOVIE_CHUNK_TARGET_ROWS", 20000))
+MOVIE_IMPORT_WORKERS = int(os.getenv("MOVIE_IMPORT_WORKERS", os.cpu_count() or 1))
+MOVIE_CHUNK_MIN_SECONDS = float(os.getenv("MOVIE_CHUNK_MIN_SECONDS", 2))
+MOVIE_CHUNK_MAX_SECONDS = float(os.getenv("MOVIE_CHUNK_MAX_SECONDS", 60))
+MOVIE_ROW_COST_SECONDS = float(os.getenv("MOVIE_ROW_COST_SECONDS", 0.0002))
+# "binary" has the splitter parse and validate every record into compact
+# binary chunk files, which workers decode without parsing text again;
+# "source" chunks are ranges of the upload itself.
+MOVIE_CHUNK_FORMAT = os.getenv("MOVIE_CHUNK_FORMAT", "source")
+# Imports writing at least this many rows refresh the movie table's planner
+# statistics (ANALYZE) when they finish.
+MOVIE_ANALYZE_AFTER_ROWS = int(os.getenv("MOVIE_ANALYZE_AFTER_ROWS", 10000))
+# Admission control of new ingestion jobs: uploads are refused with 429 while
+# unfinished jobs hold this many slots or bytes still to ingest. Retry-After
+# is estimated from the throughput of recent jobs, or this one at first.
+MOVIE_INGEST_MAX_PENDING_JOBS = int(os.getenv("MOVIE_INGEST_MAX_PENDING_JOBS", 20))
+MOVIE_INGEST_MAX_PENDING_BYTES = int(os.getenv("MOVIE_INGEST_MAX_PENDING_BYTES", 2 * 1024 * 1024 * 1024))
+MOVIE_INGEST_BYTES_PER_SECOND = float(os.getenv("MOVIE_INGEST_BYTES_PER_SECOND", 2 * 1024 * 1024))
+# Unfinished jobs with no progress for this long (a lost enqueue, a dead
+# worker) stop counting against the limits above.
+MOVIE_INGEST_STALE_SECONDS = int(os.getenv("MOVIE_INGEST_STALE_SECONDS", 3600))
+
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
 
+# Tasks run on three queues so that thousands of ingestion chunks never
+# starve short tasks: "bulk" for splitting files, fanning their chunks out
+# and importing them, "maintenance" for finishing jobs (merge, ANALYZE,
+# cleanup; one at a time, so no dispatch may queue behind them) and
+# "interactive" for everything else, including any task not routed here.
+CELERY_TASK_DEFAULT_QUEUE = "interactive"
+CELERY_TASK_QUEUES = {
+    queue: {"exchange": queue, "routing_key": queue}
+    for queue in ("interactive", "bulk", "maintenance")
+}
+CELERY_TASK_ROUTES = {
+    "movies.tasks.process_file": {"queue": "bulk"},
+    "movies.tasks.assemble_upload_task": {"queue": "bulk"},
+    "movies.tasks.split_file_task": {"queue": "bulk"},
+    "movies.tasks.process_chunk": {"queue": "bulk"},
+    "movies.tasks.process_chunks": {"queue": "bulk"},
+    "movies.tasks.finalise_ingestion": {"queue": "maintenance"},
+    "movies.tasks.abort_ingestion": {"queue": "maintenance"},
+}
+# Worker settings applied to a worker consuming a single queue
+# (`celery -A recommendation_system worker -Q bulk`); options given on the
+# command line take precedence. Bulk workers reserve one long task at a
+# time, interactive ones prefetch and are stopped quickly when stuck.
+CELERY_QUEUE_PROFILES = {
+    "bulk": {
+        "worker_concurrency": int(os.getenv("CELERY_BULK_CONCURRENCY", MOVIE_IMPORT_WORKERS)),
+        "worker_prefetch_multiplier": 1,
+        "task_soft_time_limit": int(os.getenv("CELERY_BULK_SOFT_TIME_LIMIT", 30 * 60)),
+        "task_time_limit": int(os.getenv("CELERY_BULK_TIME_LIMIT", 35 * 60)),
+    },
+    "interactive": {
+        "worker_concurrency": int(os.getenv("CELERY_INTERACTIVE_CONCURRENCY", 2 * (os.cpu_count() or 1))),
+        "worker_prefetch_multiplier": 4,
+        "task_soft_time_limit": int(os.getenv("CELERY_INTERACTIVE_SOFT_TIME_LIMIT", 30)),
+        "task_time_limit": int(os.getenv("CELERY_INTERACTIVE_TIME_LIMIT", 60)),
+    },
+    "maintenance": {
+        "worker_concurrency": int(os.getenv("CELERY_MAINTENANCE_CONCURRENCY", 1)),
+        "worker_prefetch_multiplier": 1,
+        "task_soft_time_limit": int(os.getenv("CELERY_MAINTENANCE_SOFT_TIME_LIMIT", 2 * 60 * 60)),
+        "task_time_limit": int(os.getenv("CELERY_MAINTENANCE_TIME_LIMIT", 2 * 60 * 60 + 5 * 60)),
+    },
+}
+
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID", "minioadmin")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY", "minioadmin")
 AWS_STORAGE_BUCKET_NAME = os.getenv("AWS_STORAGE_BUCKET_NAME", "mybucket")
@@ -1,4 +1,4 @@
 from .settings import *
 
 CELERY_TASK_ALWAYS_EAGER = True
-CELERY_TASK_EAGER_PROPAGATES = True
\ No newline at end of file
+CELERY_TASK_EAGER_PROPAGATES = True